@@ -1,59 +1,115 @@
-from flask import Flask, jsonify, request, send_from_directory, url_for
-from flask_cors import CORS
-from flask_jwt_extended import JWTManager
-from werkzeug.utils import secure_filename
-from flask_migrate import Migrate
-from flask_mail import Mail
-from flask_caching import Cache
+from flask import Flask, jsonify, request
 from functools import wraps
 from cache import cache
-from flask import Flask
-from controllers.auth_controller import auth_bp
-from controllers.admin_controller import admin_bp
-from controllers.sponsor_controller import sponsor_bp
-from controllers.influencer_controller import influencer_bp
+from config import Config
 from db import db
+from mail import mail
 
 
-# Initialize Flask app
-application = Flask(__name__)
-
-# CORS Configuration
-CORS(application)
-CORS(application, resources={r"/*": {"origins": "http://192.168.1.44:8080"}})
-
-# Database Configuration
-application.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///database.db"
-application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-application.config['JWT_SECRET_KEY'] = 'b65e69d8907c4b98a541c3e6eb2db78d'
-application.config['WTF_CSRF_ENABLED'] = False
-
-# Redis Cache Configuration
-application.config['CACHE_TYPE'] = 'redis'
-application.config['CACHE_REDIS_URL'] = 'redis://localhost:6379/0'
-application.config['CACHE_DEFAULT_TIMEOUT'] = 300
-
-# Mail Configuration
-application.config['MAIL_SERVER'] = 'smtp.gmail.com'
-application.config['MAIL_PORT'] = 587
-application.config['MAIL_USE_TLS'] = True
-application.config['MAIL_USERNAME'] = ''  # Replace with your email
-application.config['MAIL_PASSWORD'] = ''    # Replace with your app password
-
-# Initialize extensions
-db.init_app(application)
-jwt = JWTManager(application)
-migrate = Migrate(application, db)
-mail = Mail(application)
-# mail.init_app(application)
-# cache = Cache(app)
-cache.init_app(application)
-
-# Register blueprints
-application.register_blueprint(auth_bp, url_prefix='/auth')
-application.register_blueprint(admin_bp, url_prefix='/admin')
-application.register_blueprint(sponsor_bp, url_prefix='/sponsor')
-application.register_blueprint(influencer_bp, url_prefix='/influencer')
+# Blueprints and their URL prefixes, imported only when an app is built
+BLUEPRINTS = [
+    ('controllers.auth_controller', 'auth_bp', '/auth'),
+    ('controllers.admin_controller', 'admin_bp', '/admin'),
+    ('controllers.sponsor_controller', 'sponsor_bp', '/sponsor'),
+    ('controllers.influencer_controller', 'influencer_bp', '/influencer'),
+]
+
+
+def create_app(config=Config):
+    """Build the web application.
+
+    Web-only dependencies (CORS, JWT, migrations, the controllers) are
+    imported here rather than at module level, so importing this module
+    stays cheap for workers and scripts.
+    """
+    from importlib import import_module
+    from flask_cors import CORS
+    from flask_jwt_extended import JWTManager
+    from flask_migrate import Migrate
+    from pagination import CursorError
+    from routing import pin_to_primary
+    from metrics import init_metrics
+    from compression import init_compression
+    from json_provider import init_json
+    from passwords import HashingBusy
+    from user_import import import_users_command
+    import campaign_state
+
+    # Initialize Flask app
+    application = Flask(__name__)
+
+    # Keeps Campaign.is_open in sync with ad request status (flush listener)
+    campaign_state.register()
+
+    # Configuration (environment driven, see config.py)
+    application.config.from_object(config)
+    init_json(application)  # orjson-backed jsonify when installed
+
+    # CORS Configuration
+    CORS(application, expose_headers=["X-Next-Cursor", "ETag"])
+    CORS(application, resources={r"/*": {"origins": "http://192.168.1.44:8080"}})
+
+    # Initialize extensions
+    db.init_app(application)
+    JWTManager(application)
+    Migrate(application, db)
+    mail.init_app(application)
+    cache.init_app(application)
+
+    # Register blueprints
+    for module, name, url_prefix in BLUEPRINTS:
+        application.register_blueprint(getattr(import_module(module), name), url_prefix=url_prefix)
+
+    # Keep a user's reads on the primary right after their own writes
+    application.after_request(pin_to_primary)
+
+    # `flask import-users users.csv [--approve]`
+    application.cli.add_command(import_users_command)
+
+    # Per-route latency, SQL and cache metrics on /metrics
+    init_metrics(application)
+
+    # gzip/brotli for large bodies; registered last so it runs first and
+    # the metrics above record the compressed size
+    init_compression(application)
+
+    # Malformed pagination cursors are a client error
+    @application.errorhandler(CursorError)
+    def handle_cursor_error(error):
+        return jsonify({'error': str(error)}), 400
+
+    # Password hashing is saturated; clients should retry shortly
+    @application.errorhandler(HashingBusy)
+    def handle_hashing_busy(error):
+        return jsonify({'error': 'Server busy, please try again.'}), 503
+
+    return application
+
+
+def create_worker_app(config=Config):
+    """Minimal app for Celery workers: configuration, database, mail and cache only."""
+    import campaign_state
+
+    campaign_state.register()  # Keeps Campaign.is_open in sync with ad request status
+    application = Flask(__name__)
+    application.config.from_object(config)
+    db.init_app(application)
+    mail.init_app(application)
+    cache.init_app(application)
+    return application
+
+
+def __getattr__(name):
+    """Build the module-level `application` on first use.
+
+    WSGI servers pointed at `app:application` keep working, while workers
+    and scripts that only need create_worker_app do not pay for the web app.
+    """
+    if name == 'application':
+        globals()['application'] = create_app()
+        return globals()['application']
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 
 # Cache decorator for general use
 def cached_response(timeout=5 * 60, key_prefix='view/%s'):
@@ -71,6 +127,11 @@ def cached_response(timeout=5 * 60, key_prefix='view/%s'):
     return decorator
 
 if __name__ == '__main__':
+    from search import create_search_index
+
+    application = create_app()
     with application.app_context():
         db.create_all()
-    application.run(debug=True, port=5000)
\ No newline at end of file
+        create_search_index(db.session.connection())
+        db.session.commit()
+    application.run(debug=True, port=5000)
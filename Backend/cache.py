@@ -1,3 +1,190 @@
 # cache.py
+import hashlib
+import time
+import uuid
+from contextlib import nullcontext
+from functools import wraps
+
+from flask import Response, current_app, g, make_response, request
 from flask_caching import Cache
-cache = Cache()
\ No newline at end of file
+from flask_jwt_extended import get_jwt_identity
+
+cache = Cache()
+
+# Hit/miss counters for cached_view, kept per worker process
+cache_stats = {'hits': 0, 'misses': 0}
+
+# Tag versions outlive every view entry built on them (a few minutes) by far;
+# an expired version is simply recreated with a fresh token, orphaning those entries
+TAG_VERSION_TIMEOUT = 7 * 24 * 60 * 60
+
+
+def _tag_key(tag):
+    return f'tag-version:{tag}'
+
+
+def _new_version():
+    # Prefixed with the rotation time, so readers can tell a recent write (see recently_written)
+    return f'{time.time():.3f}:{uuid.uuid4().hex}'
+
+
+def tag_versions(tags):
+    """Current version token of each tag, creating tokens for unseen tags."""
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(*keys) if keys else []
+
+    resolved = []
+    for key, version in zip(keys, versions):
+        if version is None:
+            # Unknown (or evicted): counted as just written, the write may well be recent
+            cache.add(key, _new_version(), timeout=TAG_VERSION_TIMEOUT)
+            version = cache.get(key)
+        resolved.append(version)
+    return resolved
+
+
+def recently_written(versions):
+    """Whether any of the tag `versions` was rotated within REPLICA_STICKY_SECONDS.
+
+    Replicas may not have applied such a write yet, so a view cached under
+    these versions has to be built from the primary.
+    """
+    window = current_app.config.get('REPLICA_STICKY_SECONDS', 0)
+    if not window or not current_app.config.get('REPLICA_BINDS'):
+        return False
+    now = time.time()
+    for version in versions:
+        rotated_at, _, _ = str(version).partition(':')
+        try:
+            if now - float(rotated_at) < window:
+                return True
+        except ValueError:  # Token from before versions carried a time: an old write
+            continue
+    return False
+
+
+def invalidate_tags(*tags):
+    """Orphan every cached view tagged with one of `tags`.
+
+    Entries are never deleted directly: their keys embed the tag versions
+    they were built against, so rotating a version makes them unreachable
+    and they simply age out.
+    """
+    if tags:
+        cache.set_many({_tag_key(tag): _new_version() for tag in set(tags)}, timeout=TAG_VERSION_TIMEOUT)
+
+
+def view_cache_key(tags, versions=None):
+    """Cache key for the current request: route, JWT identity, query args and tag versions."""
+    identity = get_jwt_identity()
+    args = sorted(request.args.items(multi=True))
+    raw = repr((request.endpoint, identity, args, versions if versions is not None else tag_versions(tags)))
+    return 'view:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _miss_reads(versions):
+    """Where a view miss reads from: the primary right after a write to its tags, else as routed."""
+    from routing import use_primary  # routing imports this module
+
+    return use_primary() if recently_written(versions) else nullcontext()
+
+
+def _etag(cache_key):
+    # The key already embeds route, identity, query args and tag versions
+    return cache_key.split(':', 1)[1]
+
+
+def _with_validators(response, etag):
+    response.set_etag(etag, weak=True)
+    # Let clients keep the body but revalidate on every poll
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cached_view(timeout=300, tags=()):
+    """Cache successful responses of an authenticated view.
+
+    `tags` may contain an `{identity}` placeholder, filled in with the
+    caller's JWT identity, e.g. `'sponsor:{identity}'`. Must be applied
+    below `jwt_required()`.
+
+    Responses carry a weak ETag derived from the cache key, so from the
+    tag versions rather than the body. A matching `If-None-Match` is
+    answered 304 without running the view, for as long as the cached
+    entry it validates is still live.
+
+    Misses read from a replica like any GET, except within
+    REPLICA_STICKY_SECONDS of a write to one of the tags: the entry (and its
+    ETag) is keyed on the newest versions, so it must not hold replica rows
+    that predate the write which rotated them.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            identity = get_jwt_identity()
+            versions = tag_versions([tag.format(identity=identity) for tag in tags])
+            cache_key = view_cache_key(tags, versions)
+            etag = _etag(cache_key)
+
+            if request.if_none_match.contains_weak(etag) and cache.has(cache_key):
+                cache_stats['hits'] += 1
+                g.view_cache = 'hit'
+                return _with_validators(Response(status=304), etag)
+
+            cached = cache.get(cache_key)
+            if cached is not None:
+                cache_stats['hits'] += 1
+                g.view_cache = 'hit'
+                body, status, headers = cached
+                return _with_validators(Response(body, status=status, headers=headers), etag)
+
+            cache_stats['misses'] += 1
+            g.view_cache = 'miss'
+            with _miss_reads(versions):
+                response = make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                cache.set(cache_key, (response.get_data(), response.status_code, list(response.headers)), timeout=timeout)
+                _with_validators(response, etag)
+            return response
+        return decorated_function
+    return decorator
+
+
+def etag_view(tags=()):
+    """Answer unchanged polls of a view with 304, without caching its body.
+
+    For views whose bodies are too large or too varied (admin lists, pages)
+    to be worth caching: the weak ETag is derived like cached_view's, from
+    the route, identity, query args and `tags` versions, so any write that
+    rotates one of the tags changes it. A matching `If-None-Match` costs
+    one cache lookup; otherwise the view runs, reading from a replica
+    unless one of the tags was just written (as cached_view misses do).
+    Must be applied below `jwt_required()`.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            identity = get_jwt_identity()
+            versions = tag_versions([tag.format(identity=identity) for tag in tags])
+            etag = _etag(view_cache_key(tags, versions))
+            if request.if_none_match.contains_weak(etag):
+                return _with_validators(Response(status=304), etag)
+
+            with _miss_reads(versions):
+                response = make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                _with_validators(response, etag)
+            return response
+        return decorated_function
+    return decorator
+
+
+def campaign_tags(campaign):
+    return ['campaigns', f'campaign:{campaign.id}', f'sponsor:{campaign.sponsor_id}']
+
+
+def ad_request_tags(ad_request, campaign=None):
+    # The public catalog depends on ad-request status (accepted campaigns drop out)
+    campaign = campaign or ad_request.campaign
+    return ['campaigns', f'campaign:{campaign.id}',
+            f'sponsor:{campaign.sponsor_id}', f'influencer:{ad_request.influencer_id}']
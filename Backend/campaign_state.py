@@ -0,0 +1,85 @@
+# campaign_state.py
+from sqlalchemy import event, exists, func, inspect, select, update
+from sqlalchemy.orm import Session, aliased
+
+from db import db
+from models import Campaign, AdRequest
+
+
+def _accepted_request_id(campaign_id_column):
+    return (
+        select(func.min(AdRequest.id))
+        .where(AdRequest.campaign_id == campaign_id_column, AdRequest.status == 'Accepted')
+        .scalar_subquery()
+    )
+
+
+def _has_accepted_request(campaign_id_column):
+    return exists().where(AdRequest.campaign_id == campaign_id_column, AdRequest.status == 'Accepted')
+
+
+def refresh_open_state(connection, campaign_ids):
+    """Recompute accepted_ad_request_id/is_open for `campaign_ids` from ad_requests."""
+    campaign = Campaign.__table__
+    connection.execute(
+        update(campaign)
+        .where(campaign.c.id.in_(campaign_ids))
+        .values(
+            accepted_ad_request_id=_accepted_request_id(campaign.c.id),
+            is_open=~_has_accepted_request(campaign.c.id)
+        )
+    )
+
+
+def _touches_accepted(ad_request, is_new_or_deleted):
+    if is_new_or_deleted:
+        return ad_request.status == 'Accepted'
+    history = inspect(ad_request).attrs.status.history
+    return 'Accepted' in (history.added or ()) or 'Accepted' in (history.deleted or ())
+
+
+def maintain_open_state(session, flush_context):
+    campaign_ids = set()
+    for obj in session.new | session.deleted:
+        if isinstance(obj, AdRequest) and _touches_accepted(obj, True):
+            campaign_ids.add(obj.campaign_id)
+    for obj in session.dirty:
+        if isinstance(obj, AdRequest) and _touches_accepted(obj, False):
+            campaign_ids.add(obj.campaign_id)
+
+    if campaign_ids:
+        refresh_open_state(session.connection(), campaign_ids)
+        # Loaded campaigns would otherwise keep their pre-flush state
+        for obj in list(session.identity_map.values()):
+            if isinstance(obj, Campaign) and obj.id in campaign_ids:
+                session.expire(obj, ['accepted_ad_request_id', 'is_open'])
+
+
+def register():
+    """Attach maintain_open_state to every session; safe to call once per app built."""
+    if not event.contains(Session, 'after_flush', maintain_open_state):
+        event.listen(Session, 'after_flush', maintain_open_state)
+
+
+def check_open_state(fix=True):
+    """Find campaigns whose stored open state disagrees with their ad requests.
+
+    Returns the ids of the inconsistent campaigns, repairing them when `fix`.
+    """
+    accepted = aliased(AdRequest)
+    expected_id = (
+        select(func.min(accepted.id))
+        .where(accepted.campaign_id == Campaign.id, accepted.status == 'Accepted')
+        .scalar_subquery()
+    )
+    stale = [
+        campaign_id for (campaign_id,) in db.session.query(Campaign.id).filter(
+            (Campaign.is_open != expected_id.is_(None))
+            | (func.coalesce(Campaign.accepted_ad_request_id, 0) != func.coalesce(expected_id, 0))
+        )
+    ]
+
+    if stale and fix:
+        refresh_open_state(db.session.connection(), stale)
+        db.session.commit()
+    return stale
@@ -0,0 +1,53 @@
+# compression.py
+import gzip
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+# Bodies worth compressing; images and exports are already compressed
+COMPRESSIBLE_TYPES = ('application/json', 'text/plain', 'text/csv', 'text/html')
+
+
+def _encoding():
+    """Preferred encoding the client accepts, or None."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """Compress large, non-streamed text bodies with brotli or gzip.
+
+    Registered as an `after_request` hook by init_compression.
+    """
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES
+            or (response.calculate_content_length() or 0) < current_app.config['COMPRESS_MIN_SIZE']):
+        return response
+
+    encoding = _encoding()
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if encoding == 'br':
+        body = brotli.compress(body, quality=current_app.config['COMPRESS_BROTLI_QUALITY'])
+    else:
+        body = gzip.compress(body, compresslevel=current_app.config['COMPRESS_GZIP_LEVEL'], mtime=0)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    if app.config.get('COMPRESS_ENABLED', True):
+        app.after_request(compress_response)
@@ -0,0 +1,104 @@
+# config.py
+import os
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _normalize_url(url):
+    # Some hosts still hand out the pre-SQLAlchemy-1.4 scheme
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def database_url():
+    return _normalize_url(os.environ.get('DATABASE_URL', 'sqlite:///database.db'))
+
+
+def replica_binds():
+    """Bind name -> URL for each read replica in the comma-separated REPLICA_DATABASE_URLS."""
+    urls = [url.strip() for url in os.environ.get('REPLICA_DATABASE_URLS', '').split(',') if url.strip()]
+    return {f'replica_{i}': _normalize_url(url) for i, url in enumerate(urls)}
+
+
+def engine_options(url):
+    """Pool settings for the configured backend.
+
+    SQLite connections are cheap and writes serialize on the file lock
+    anyway (see the pragmas in db.py), so only server databases get a
+    sized, pre-pinged and recycled pool.
+    """
+    if url.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': _env_int('DB_POOL_SIZE', 10),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': True,
+    }
+
+
+class Config:
+    # Database
+    SQLALCHEMY_DATABASE_URI = database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Read replicas serving GET requests and reporting tasks (see routing.py)
+    SQLALCHEMY_BINDS = replica_binds()
+    REPLICA_BINDS = list(SQLALCHEMY_BINDS)
+    # How long a user's reads stay on the primary after they write
+    REPLICA_STICKY_SECONDS = _env_int('REPLICA_STICKY_SECONDS', 10)
+    # Milliseconds a SQLite connection waits on a locked database before failing
+    SQLITE_BUSY_TIMEOUT = _env_int('SQLITE_BUSY_TIMEOUT', 5000)
+
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'b65e69d8907c4b98a541c3e6eb2db78d')
+    WTF_CSRF_ENABLED = False
+
+    # Keep admin dashboard counters up to date on every write (see stats.py)
+    STATS_COUNTERS_ENABLED = _env_bool('STATS_COUNTERS_ENABLED', True)
+
+    # Password hashing (see passwords.py). The method is a werkzeug method, e.g.
+    # 'pbkdf2:sha256:1000000' or 'scrypt:32768:8:1'; stored hashes made with another
+    # algorithm or a lower cost are upgraded on login. Defaults to werkzeug's
+    # current pbkdf2 cost, which is what signup used before it was configurable.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}')
+    # Hashing processes per worker (0 hashes on the request thread)
+    PASSWORD_HASH_WORKERS = _env_int('PASSWORD_HASH_WORKERS', 2)
+    # Seconds to wait for a free hashing slot before answering 503
+    PASSWORD_HASH_TIMEOUT = _env_int('PASSWORD_HASH_TIMEOUT', 10)
+
+    # Request instrumentation (see metrics.py); requests slower than this are logged
+    METRICS_ENABLED = _env_bool('METRICS_ENABLED', True)
+    # Bearer token Prometheus scrapes /metrics with; without one the endpoint is not served
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+    SLOW_REQUEST_MS = _env_int('SLOW_REQUEST_MS', 500)
+
+    # Encode JSON responses with orjson when it is installed (see json_provider.py)
+    FAST_JSON = _env_bool('FAST_JSON', True)
+
+    # Response compression (see compression.py); brotli is used when installed
+    COMPRESS_ENABLED = _env_bool('COMPRESS_ENABLED', True)
+    COMPRESS_MIN_SIZE = _env_int('COMPRESS_MIN_SIZE', 1024)
+    COMPRESS_GZIP_LEVEL = _env_int('COMPRESS_GZIP_LEVEL', 6)
+    COMPRESS_BROTLI_QUALITY = _env_int('COMPRESS_BROTLI_QUALITY', 4)
+
+    # Redis Cache Configuration
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'redis')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_DEFAULT_TIMEOUT = _env_int('CACHE_DEFAULT_TIMEOUT', 300)
+
+    # Mail Configuration
+    MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+    MAIL_PORT = _env_int('MAIL_PORT', 587)
+    MAIL_USE_TLS = _env_bool('MAIL_USE_TLS', True)
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME', '')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD', '')
@@ -1,72 +1,52 @@
+import io
+
 from flask import Blueprint, jsonify, request
 from models import User, Campaign, AdRequest , Influencer
-from flask_jwt_extended import jwt_required, get_jwt
+from flask_jwt_extended import jwt_required
 from db import db
-from sqlalchemy import or_
+from sqlalchemy import or_, update
 # from app import export_cache as cache
-from cache import cache
+from cache import cached_view, etag_view, invalidate_tags, campaign_tags, cache_stats
+from pagination import list_response
+from identity import role_required, invalidate_identity
+from stats import dashboard_stats, adjust_counters, counters_enabled
+from read_models import ad_request_query, ad_request_serializer
+from user_import import import_users
 
 
 admin_bp = Blueprint('admin', __name__)
 
 
-def is_admin():
-    jwt_claims = get_jwt()  # Get the JWT claims (payload)
-    return jwt_claims.get('role') == 'Admin'  # Check if the role in the token is 'Admin'
-
-
 @admin_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
-@cache.cached(timeout=10, key_prefix='admin_dashboard')  
+@role_required('Admin')
+@cached_view(timeout=10, tags=['stats'])
 def dashboard():
-    # Check if the user is an admin
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
-
-    # Fetch statistics from the database
-    total_sponsors = User.query.filter_by(role='Sponsor').count()
-    flagged_sponsors = User.query.filter_by(role='Sponsor', flagged='Flagged').count()
-    
-    total_influencers = User.query.filter_by(role='Influencer').count()
-    flagged_influencers = User.query.filter_by(role='Influencer', flagged='Flagged').count()
-    
-    total_campaigns = Campaign.query.count()
-    public_campaigns = Campaign.query.filter_by(visibility="public").count()
-    private_campaigns = Campaign.query.filter_by(visibility="private").count()
-    flagged_campaigns = Campaign.query.filter_by(flagged="Flagged").count()
-    
-    total_ad_requests = AdRequest.query.count()
-    pending_ad_requests = AdRequest.query.filter_by(status='Pending').count()
-    accepted_ad_requests = AdRequest.query.filter_by(status='Accepted').count()
-    rejected_ad_requests = AdRequest.query.filter_by(status='Rejected').count()
+    # Fetch statistics (maintained counters, or one grouped query per table)
+    return jsonify(dashboard_stats()), 200
 
+# View cache hit/miss counters (per worker process)
+@admin_bp.route('/cache-stats', methods=['GET'])
+@jwt_required()
+@role_required('Admin')
+def get_cache_stats():
+    lookups = cache_stats['hits'] + cache_stats['misses']
     return jsonify({
-        'total_sponsors': total_sponsors,
-        'flagged_sponsors': flagged_sponsors,
-        'total_influencers': total_influencers,
-        'flagged_influencers': flagged_influencers,
-        'total_campaigns': total_campaigns,
-        'public_campaigns': public_campaigns,
-        'private_campaigns': private_campaigns,
-        'flagged_campaigns': flagged_campaigns,
-        'total_ad_requests': total_ad_requests,
-        'pending_ad_requests': pending_ad_requests,
-        'accepted_ad_requests': accepted_ad_requests,
-        'rejected_ad_requests': rejected_ad_requests
+        'hits': cache_stats['hits'],
+        'misses': cache_stats['misses'],
+        'hit_ratio': cache_stats['hits'] / lookups if lookups else None
     }), 200
 
 # Approve a Sponsor 
 @admin_bp.route('/approve-sponsor/<int:sponsor_id>', methods=['POST'])
 @jwt_required()
+@role_required('Admin')
 def approve_sponsor(sponsor_id):
-    # Check if the user is an admin
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
-
     sponsor = User.query.get(sponsor_id)
     if sponsor and sponsor.role == 'Sponsor':
         sponsor.flagged = "Active" 
         db.session.commit()
+        invalidate_user_status(sponsor_id, f'sponsor:{sponsor_id}')
         return jsonify({'message': 'Sponsor approved successfully!'}), 200
     return jsonify({'error': 'Sponsor not found or invalid'}), 404
 
@@ -74,111 +54,187 @@ def approve_sponsor(sponsor_id):
 # Get flagged sponsors for approval , when a new sponsor logs in (flagged has null )
 @admin_bp.route('/flagged-sponsors', methods=['GET'])
 @jwt_required()
+@role_required('Admin')
+@etag_view(tags=['stats'])  # Revalidated by ETag; user and campaign writes rotate the tags
 def get_flagged_sponsors():
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
-
     # Fetch sponsors where flagged is either NULL or "Flagged"
-    sponsors = User.query.filter_by(role='Sponsor').filter(or_(User.flagged == None, User.flagged == 'Flagged')).all()
-    #sponsors = User.query.filter_by(role='Sponsor').filter(User.flagged == 'Flagged').all()
-    return jsonify([{'id': sponsor.id, 'username': sponsor.username, 'email': sponsor.email, 'flagged': sponsor.flagged or 'Active'} for sponsor in sponsors]), 200
+    sponsors = (db.session.query(User.id, User.username, User.email, User.flagged)
+                .filter(User.role == 'Sponsor', or_(User.flagged == None, User.flagged == 'Flagged')))
+    return list_response(
+        sponsors, [User.id], key=lambda sponsor: [sponsor.id],
+        serialize=lambda sponsor: {'id': sponsor.id, 'username': sponsor.username, 'email': sponsor.email, 'flagged': sponsor.flagged or 'Active'}
+    ), 200
 
 
 # Get all active sponsors (flagged as 'Active')
 @admin_bp.route('/active-sponsors', methods=['GET'])
 @jwt_required()
+@role_required('Admin')
+@etag_view(tags=['stats'])  # Revalidated by ETag; user and campaign writes rotate the tags
 def get_active_sponsors():
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
-
     # Fetch sponsors where flagged is 'Active'
-    sponsors = User.query.filter_by(role='Sponsor', flagged='Active').all()
-    return jsonify([{'id': sponsor.id, 'username': sponsor.username, 'email': sponsor.email, 'flagged': sponsor.flagged} for sponsor in sponsors]), 200
+    sponsors = (db.session.query(User.id, User.username, User.email, User.flagged)
+                .filter(User.role == 'Sponsor', User.flagged == 'Active'))
+    return list_response(
+        sponsors, [User.id], key=lambda sponsor: [sponsor.id],
+        serialize=lambda sponsor: {'id': sponsor.id, 'username': sponsor.username, 'email': sponsor.email, 'flagged': sponsor.flagged}
+    ), 200
 
 
 # Get all sponsors with their flagged status
 @admin_bp.route('/sponsors', methods=['GET'])
 @jwt_required()
+@role_required('Admin')
+@etag_view(tags=['stats'])  # Revalidated by ETag; user and campaign writes rotate the tags
 def get_sponsors():
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
+    # Fetch sponsors and their flagged status from User, one page at a time
+    sponsors = db.session.query(User.id, User.username, User.email, User.flagged).filter(User.role == 'Sponsor')
+    return list_response(
+        sponsors, [User.id], key=lambda sponsor: [sponsor.id],
+        serialize=lambda sponsor: {'id': sponsor.id, 'username': sponsor.username, 'email': sponsor.email, 'flagged': sponsor.flagged}
+    ), 200
+
 
-    # Fetch all sponsors and their flagged status from User
-    sponsors = User.query.filter_by(role='Sponsor').all()
-    return jsonify([
-        {'id': sponsor.id, 'username': sponsor.username, 'email': sponsor.email, 'flagged': sponsor.flagged}
-        for sponsor in sponsors
-    ]), 200
+# Invalidate dashboard cache (and any views of the affected rows) when status changes
+def invalidate_dashboard_cache(*tags):
+    invalidate_tags('stats', *tags)
 
 
-# Invalidate dashboard cache when status changes
-def invalidate_dashboard_cache():
-    cache.delete('admin_dashboard')
+# Drop the cached identity snapshot of a user whose flag status changed
+def invalidate_user_status(user_id, *tags):
+    invalidate_identity(user_id)
+    invalidate_dashboard_cache(*tags)
     
 
 # Flag a Sponsor (Admin Action)
 @admin_bp.route('/flag-sponsor/<int:sponsor_id>', methods=['PUT'])
 @jwt_required()
+@role_required('Admin')
 def flag_sponsor(sponsor_id):
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
-
     sponsor = User.query.get(sponsor_id)
     if sponsor and sponsor.role == 'Sponsor':
         sponsor.flagged = "Flagged"  # Set the sponsor as flagged
         db.session.commit()
-        invalidate_dashboard_cache()
+        invalidate_user_status(sponsor_id, f'sponsor:{sponsor_id}')
         return jsonify({'message': 'Sponsor flagged successfully!'}), 200
     return jsonify({'error': 'Sponsor not found'}), 404
 
 # Unflag a Sponsor (Admin Action)
 @admin_bp.route('/unflag-sponsor/<int:sponsor_id>', methods=['PUT'])
 @jwt_required()
+@role_required('Admin')
 def unflag_sponsor(sponsor_id):
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
-
     sponsor = User.query.get(sponsor_id)
     if sponsor and sponsor.role == 'Sponsor':
         sponsor.flagged = "Active"  # Set the sponsor as active (unflagged)
         db.session.commit()
+        invalidate_user_status(sponsor_id, f'sponsor:{sponsor_id}')
         return jsonify({'message': 'Sponsor unflagged successfully!'}), 200
     return jsonify({'error': 'Sponsor not found'}), 404
 
 
 
 
+# Most users accepted by one bulk status call
+MAX_BULK_USERS = 1000
+
+# Flag, unflag or approve many sponsors/influencers at once (Admin Action)
+@admin_bp.route('/users/status', methods=['PUT'])
+@jwt_required()
+@role_required('Admin')
+def update_users_status():
+    data = request.json or {}
+    user_ids = data.get('user_ids')
+    status = data.get('status')
+
+    if status not in ('Active', 'Flagged'):
+        return jsonify({'error': 'Invalid status value. Must be "Active" or "Flagged".'}), 400
+    if not isinstance(user_ids, list) or not user_ids or not all(isinstance(i, int) for i in user_ids):
+        return jsonify({'error': 'user_ids must be a non-empty list of ids.'}), 400
+    if len(user_ids) > MAX_BULK_USERS:
+        return jsonify({'error': f'At most {MAX_BULK_USERS} users per call.'}), 400
+
+    # Current role and status of every requested user, in one query
+    users = {
+        user_id: (role, flagged) for user_id, role, flagged in db.session.query(User.id, User.role, User.flagged)
+        .filter(User.id.in_(user_ids), User.role.in_(['Sponsor', 'Influencer']))
+    }
+    found = list(users)
+
+    if found:
+        db.session.execute(update(User).where(User.id.in_(found)).values(flagged=status))
+
+        # The UPDATE bypasses the flush, so dashboard counters are adjusted here
+        if counters_enabled():
+            deltas = {}
+            for role, flagged in users.values():
+                name = f'flagged_{role.lower()}s'
+                if status == 'Flagged' and flagged != 'Flagged':
+                    deltas[name] = deltas.get(name, 0) + 1
+                elif status == 'Active' and flagged == 'Flagged':
+                    deltas[name] = deltas.get(name, 0) - 1
+            adjust_counters(db.session, deltas)
+        db.session.commit()
+
+        invalidate_identity(*found)
+        tags = [f'{role.lower()}:{user_id}' for user_id, (role, _) in users.items()]
+        if any(role == 'Influencer' for role, _ in users.values()):
+            tags.append('influencers')
+        invalidate_dashboard_cache(*tags)
+
+    return jsonify({
+        'updated': len(found),
+        'failed': sum(1 for user_id in user_ids if user_id not in users),
+        'results': [
+            {'id': user_id, 'status': status} if user_id in users
+            else {'id': user_id, 'error': 'User not found or invalid'}
+            for user_id in user_ids
+        ]
+    }), 200 if found else 404
+
+
+# Bulk-create sponsors and influencers from an uploaded CSV (see user_import.py)
+@admin_bp.route('/users/import', methods=['POST'])
+@jwt_required()
+@role_required('Admin')
+def import_users_csv():
+    upload = request.files.get('file')
+    if upload is not None:
+        lines = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    elif request.mimetype == 'text/csv':
+        lines = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+    else:
+        return jsonify({'error': 'Send the CSV as a "file" upload or a text/csv body.'}), 400
+
+    approve = request.args.get('approve', 'false').lower() in ('1', 'true', 'yes')
+    try:
+        report = import_users(lines, approve=approve)
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    return jsonify(report), 200
+
+
 # Get recent ad requests for the dashboard
 @admin_bp.route('/recent-ad-requests', methods=['GET'])
 @jwt_required()
+@role_required('Admin')
 def get_recent_ad_requests():
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
-
-    requests = AdRequest.query.order_by(AdRequest.created_at.desc()).limit(10).all()
-    return jsonify([{
-        'id': req.id,
-        'campaign_name': req.campaign.name,
-        'sponsor_name': req.campaign.sponsor.user.username,
-        'influencer_name': req.influencer.user.username,
-        'requirements': req.requirements,
-        'status': req.status
-    } for req in requests]), 200
+    fields = ['id', 'campaign_name', 'sponsor_name', 'influencer_name', 'requirements', 'status']
+    requests = ad_request_query(fields).order_by(AdRequest.created_at.desc()).limit(10).all()
+    return jsonify([ad_request_serializer(fields)(req) for req in requests]), 200
 
 
 # Flag an Influencer (Admin Action)
 @admin_bp.route('/flag-influencer/<int:influencer_id>', methods=['PUT'])
 @jwt_required()
+@role_required('Admin')
 def flag_influencer(influencer_id):
-    # Check if the user is an admin
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
-
     # Fetch the user associated with the influencer
     influencer = Influencer.query.get(influencer_id)
     if influencer:
         influencer.user.flagged = "Flagged"  # Set the user (influencer) as flagged
         db.session.commit()
+        invalidate_user_status(influencer_id, f'influencer:{influencer_id}', 'influencers')
         return jsonify({'message': 'Influencer flagged successfully!'}), 200
     return jsonify({'error': 'Influencer not found'}), 404
 
@@ -186,16 +242,14 @@ def flag_influencer(influencer_id):
 # Unflag an Influencer (Admin Action)
 @admin_bp.route('/unflag-influencer/<int:influencer_id>', methods=['PUT'])
 @jwt_required()
+@role_required('Admin')
 def unflag_influencer(influencer_id):
-    # Check if the user is an admin
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
-
     # Fetch the user associated with the influencer
     influencer = Influencer.query.get(influencer_id)
     if influencer:
         influencer.user.flagged = "Active"  # Set the user (influencer) as active
         db.session.commit()
+        invalidate_user_status(influencer_id, f'influencer:{influencer_id}', 'influencers')
         return jsonify({'message': 'Influencer unflagged successfully!'}), 200
     return jsonify({'error': 'Influencer not found'}), 404
 
@@ -203,16 +257,14 @@ def unflag_influencer(influencer_id):
 # Unflag an Influencer (Admin Action)
 @admin_bp.route('/approve-influencer/<int:influencer_id>', methods=['POST'])
 @jwt_required()
+@role_required('Admin')
 def approve_influencer(influencer_id):
-    # Check if the user is an admin
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
-
     # Fetch the user associated with the influencer
     influencer = Influencer.query.get(influencer_id)
     if influencer:
         influencer.user.flagged = "Active"  # Set the user (influencer) as active
         db.session.commit()
+        invalidate_user_status(influencer_id, f'influencer:{influencer_id}', 'influencers')
         return jsonify({'message': 'Influencer approved successfully!'}), 200
     return jsonify({'error': 'Influencer not found'}), 404
 
@@ -221,70 +273,66 @@ def approve_influencer(influencer_id):
 # Get all influencers with their flagged status
 @admin_bp.route('/influencers', methods=['GET'])
 @jwt_required()
+@role_required('Admin')
+@etag_view(tags=['stats', 'influencers'])  # Revalidated by ETag; user and campaign writes rotate the tags
 def get_influencers():
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
-
-    # Fetch all influencers and their flagged status from User
-    influencers = Influencer.query.join(User).all()
-    return jsonify([
-        {'id': influencer.id, 'username': influencer.user.username, 'email': influencer.user.email, 'flagged': influencer.user.flagged}
-        for influencer in influencers
-    ]), 200
+    # Fetch influencers and their flagged status from User, one page at a time
+    influencers = db.session.query(Influencer.id, User.username, User.email, User.flagged).join(User, User.id == Influencer.id)
+    return list_response(
+        influencers, [Influencer.id], key=lambda influencer: [influencer.id],
+        serialize=lambda influencer: {'id': influencer.id, 'username': influencer.username, 'email': influencer.email, 'flagged': influencer.flagged}
+    ), 200
 
 
 
 # Get all campaigns with their flagged status
 @admin_bp.route('/campaigns', methods=['GET'])
 @jwt_required()
+@role_required('Admin')
+@etag_view(tags=['campaigns', 'stats'])  # Revalidated by ETag; user and campaign writes rotate the tags
 def get_campaigns():
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
-
-    # Fetch all campaigns and their flagged status
-    campaigns = Campaign.query.all()
-    return jsonify([
-        {
+    # Fetch campaigns and their flagged status, one page at a time
+    campaigns = db.session.query(Campaign.id, Campaign.name, Campaign.description, Campaign.visibility, Campaign.flagged)
+    return list_response(
+        campaigns, [Campaign.id], key=lambda campaign: [campaign.id],
+        serialize=lambda campaign: {
             'id': campaign.id,
             'name': campaign.name,
             'description': campaign.description,
             'visibility': campaign.visibility,
             'flagged': campaign.flagged
         }
-        for campaign in campaigns
-    ]), 200
+    ), 200
 
 
 
 # Flag a Campaign (Admin Action)
 @admin_bp.route('/flag-campaign/<int:campaign_id>', methods=['PUT'])
 @jwt_required()
+@role_required('Admin')
 def flag_campaign(campaign_id):
-    # Check if the user is an admin
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
-
     # Fetch the campaign by ID
     campaign = Campaign.query.get(campaign_id)
     if campaign:
         campaign.flagged = "Flagged"  # Set the campaign as flagged
+        tags = campaign_tags(campaign)
         db.session.commit()
+        invalidate_dashboard_cache(*tags)
         return jsonify({'message': 'Campaign flagged successfully!'}), 200
     return jsonify({'error': 'Campaign not found'}), 404
 
 # Unflag a Campaign (Admin Action)
 @admin_bp.route('/unflag-campaign/<int:campaign_id>', methods=['PUT'])
 @jwt_required()
+@role_required('Admin')
 def unflag_campaign(campaign_id):
-    # Check if the user is an admin
-    if not is_admin():
-        return jsonify({'error': 'Access forbidden: Admins only!'}), 403
-
     # Fetch the campaign by ID
     campaign = Campaign.query.get(campaign_id)
     if campaign:
         campaign.flagged = "Active"  # Set the campaign as active (unflagged)
+        tags = campaign_tags(campaign)
         db.session.commit()
+        invalidate_dashboard_cache(*tags)
         return jsonify({'message': 'Campaign unflagged successfully!'}), 200
     return jsonify({'error': 'Campaign not found'}), 404
 
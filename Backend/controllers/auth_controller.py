@@ -1,12 +1,14 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import hash_password, verify_password, needs_rehash
 from flask_jwt_extended import create_access_token
 from models import User  # Import User model and database
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField
 from wtforms.validators import DataRequired
 from db import db
+from sqlalchemy.exc import IntegrityError
 from models import Sponsor, Influencer
+from cache import invalidate_tags
 
 # Create a Blueprint for authentication
 auth_bp = Blueprint('auth', __name__)
@@ -38,33 +40,31 @@ def signup():
         if existing_admin:
             return jsonify({'error': 'An Admin already exists. Only one Admin is allowed.'}), 403
 
-    # Check if user with the same email already exists
-    existing_user = User.query.filter_by(email=data['email']).first()
-    if existing_user:
-        return jsonify({'error': 'User already exists!'}), 409
-
     # Validate form data (if you're submitting via a form)
     if not form.validate_on_submit():
         return jsonify({'error': 'Invalid form data'}), 400
 
     # Hash the password for security
-    hashed_password = generate_password_hash(data['password'], method='pbkdf2:sha256')
+    hashed_password = hash_password(data['password'])
 
-    # Create a new user with the specified role
+    # Create the user and its role profile in one transaction
     new_user = User(username=data['username'], email=data['email'], password=hashed_password, role=role)
-    db.session.add(new_user)
-    db.session.commit()
-    
     if role == 'Sponsor':
-        new_sponsor = Sponsor(id=new_user.id)
-        db.session.add(new_sponsor)
-        db.session.commit()
-
+        new_user.sponsor = Sponsor()
     if role == 'Influencer':
-        new_influencer = Influencer(id=new_user.id)
-        db.session.add(new_influencer)
+        new_user.influencer = Influencer()
+    db.session.add(new_user)
+
+    # Email/username uniqueness is enforced by the constraints, race-free
+    try:
         db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'User already exists!'}), 409
 
+    if role == 'Influencer':
+        invalidate_tags('influencers')
+    invalidate_tags('stats')
     return jsonify({'message': 'User created successfully!'}), 201
 
 # Login Route (POST)
@@ -82,9 +82,14 @@ def login():
         return jsonify({'error': f"Wrong role. You are registered with {user.role}."}), 403
 
     # Check if the password is correct
-    if not check_password_hash(user.password, data['password']):
+    if not verify_password(user.password, data['password']):
         return jsonify({'error': 'Invalid credentials'}), 401
 
+    # Upgrade hashes made with older parameters while we have the plaintext
+    if needs_rehash(user.password):
+        user.password = hash_password(data['password'])
+        db.session.commit()
+
     # Check if the user is a Sponsor and if they are approved
     if user.role == 'Sponsor' and user.flagged != 'Active':
         return jsonify({'error': 'Your account is pending approval by the admin.'}), 403
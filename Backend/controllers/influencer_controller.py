@@ -1,33 +1,24 @@
 from flask import Blueprint, jsonify, request
-from models import User, Influencer, Campaign , AdRequest
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import User, Campaign , AdRequest, NegotiationMessage
+from flask_jwt_extended import jwt_required
 from db import db
 from datetime import datetime
-from cache import cache
+from cache import cached_view, invalidate_tags, ad_request_tags
+from pagination import list_response
+from read_models import ad_request_query, ad_request_serializer, negotiation_thread_query, serialize_message
+from sqlalchemy import func
+from search import search_terms, match_subquery
+from identity import role_required, current_user, current_user_id, current_profile, invalidate_identity
 # from app import export_cache as cache
 
 # Create the Blueprint for influencer-related routes
 influencer_bp = Blueprint('influencer', __name__)
 
-# Function to check if the current user is an influencer
-def is_influencer():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    #print("i am inside is influencer , user iss", user)
-    # <User inf3 - Influencer>
-    return user and user.role == 'Influencer'  # Check if the user is an influencer
-
-# Function to check if the influencer's profile is complete
-def is_profile_complete(influencer):
-    return influencer and influencer.expertise and influencer.category and influencer.reach
-
 # Influencer Profile Completion API
 @influencer_bp.route('/profile-setup', methods=['POST'])
 @jwt_required()
+@role_required('Influencer')
 def complete_profile():
-    if not is_influencer():
-        return jsonify({'error': 'Access forbidden: Influencers only!'}), 403
-
     data = request.json
     category = data.get('category')
     expertise = data.get('expertise')
@@ -37,12 +28,8 @@ def complete_profile():
     if not category or not expertise or not reach:
         return jsonify({'error': 'Category, expertise, and reach are required.'}), 400
 
-    user_id = get_jwt_identity()
-    #print("here is the user id",user_id)
-
-    influencer = Influencer.query.get(user_id)    # influencer = user.influencer
-    #print("here is the influencer",influencer)
-
+    user_id = current_user_id()
+    influencer = current_profile()
 
     # If the influencer exists, update their profile
     if influencer:
@@ -50,17 +37,17 @@ def complete_profile():
         influencer.expertise = expertise
         influencer.reach = reach
         db.session.commit()
+        invalidate_profile_cache(user_id)
         return jsonify({'message': 'Profile completed successfully!'}), 200
     else:
         return jsonify({'error': 'Influencer not found.'}), 404
 
 @influencer_bp.route('/profile', methods=['GET'])
 @jwt_required()
-@cache.memoize(timeout=10)
+@cached_view(timeout=300, tags=['influencer:{identity}'])
 def get_influencer_details():
-    # Fetch user details from the User table
-    user_id = get_jwt_identity()  # Get the user ID from the JWT
-    user = User.query.get(user_id)  # Fetch the user from the User table
+    # Fetch user details (with the influencer profile joined in) for the JWT identity
+    user = current_user()
 
     if not user:
         return jsonify({'error': 'User not found.'}), 404
@@ -87,13 +74,14 @@ def get_influencer_details():
 
 # Add cache invalidation when profile is updated
 def invalidate_profile_cache(user_id):
-    cache.delete_memoized(get_influencer_details, user_id)
+    invalidate_tags(f'influencer:{user_id}', 'influencers')
+    invalidate_identity(user_id)
 
 @influencer_bp.route('/profile', methods=['PUT'])
 @jwt_required()
 def update_influencer_profile():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user_id = current_user_id()
+    user = current_user()
     
     if not user or not user.influencer:
         return jsonify({'error': 'Influencer profile not found.'}), 404
@@ -116,25 +104,35 @@ def update_influencer_profile():
 
 @influencer_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
-@cache.memoize(timeout=10)  # Cache based on query parameters
+@role_required('Influencer', profile_complete=True)
+@cached_view(timeout=300, tags=['campaigns', 'influencer:{identity}'])  # Keyed on identity and query parameters
 def influencer_dashboard():
-    if not is_influencer():
-        return jsonify({'error': 'Access forbidden: Influencers only!'}), 403
-
-    user_id = get_jwt_identity()
-    influencer = Influencer.query.get(user_id)
-
-    # Check if the profile is complete
-    if not is_profile_complete(influencer):
-        return jsonify({'error': 'Profile incomplete. Please complete your profile first.'}), 403
+    user_id = current_user_id()
 
     # Fetch filter parameters from query
     category = request.args.get('category')
     min_budget = request.args.get('min_budget', type=float)
     max_budget = request.args.get('max_budget', type=float)
 
-    # Base query for public campaigns
-    query = Campaign.query.filter_by(visibility='public')
+    # The influencer's own application per campaign (left outer joined below)
+    own_request = (
+        db.session.query(AdRequest.campaign_id, func.min(AdRequest.status).label('status'))
+        .filter(AdRequest.influencer_id == user_id)
+        .group_by(AdRequest.campaign_id)
+        .subquery()
+    )
+
+    # Open public campaigns (none accepted yet), with the sponsor username joined in
+    query = (
+        db.session.query(
+            Campaign.id, Campaign.name, Campaign.description, Campaign.start_date,
+            Campaign.end_date, Campaign.budget, Campaign.visibility, Campaign.category,
+            User.username.label('sponsor_name'), own_request.c.status
+        )
+        .join(User, User.id == Campaign.sponsor_id)
+        .outerjoin(own_request, own_request.c.campaign_id == Campaign.id)
+        .filter(Campaign.visibility == 'public', Campaign.is_open)
+    )
 
     # Apply category filter
     if category:
@@ -146,16 +144,9 @@ def influencer_dashboard():
     if max_budget is not None:
         query = query.filter(Campaign.budget <= max_budget)
 
-    # Filter out campaigns that have already been accepted by other influencers
-    campaigns = query.all()
-    campaign_list = []
-    for campaign in campaigns:
-        accepted_ad_request = AdRequest.query.filter_by(campaign_id=campaign.id, status='Accepted').first()
-        if accepted_ad_request:
-            continue
-
-        # Prepare campaign details for display
-        campaign_info = {
+    return list_response(
+        query, [Campaign.id], key=lambda campaign: [campaign.id],
+        serialize=lambda campaign: {
             'id': campaign.id,
             'name': campaign.name,
             'description': campaign.description,
@@ -163,59 +154,75 @@ def influencer_dashboard():
             'end_date': campaign.end_date,
             'budget': campaign.budget,
             'visibility': campaign.visibility,
-            'sponsor_name': campaign.sponsor.user.username,
-            'category': campaign.category
+            'sponsor_name': campaign.sponsor_name,
+            'category': campaign.category,
+            'status': campaign.status or 'Not Applied'
         }
+    ), 200
 
-        # Check if the influencer has already applied for this campaign
-        ad_request = AdRequest.query.filter_by(campaign_id=campaign.id, influencer_id=influencer.id).first()
-        campaign_info['status'] = ad_request.status if ad_request else 'Not Applied'
 
-        campaign_list.append(campaign_info)
 
-    return jsonify(campaign_list), 200
 
 
 
 
 
+# API to fetch private ad requests made to the specific influencer
+@influencer_bp.route('/search/campaigns', methods=['GET'])
+@jwt_required()
+@role_required('Influencer')
+@cached_view(timeout=300, tags=['campaigns'])  # Keyed on identity and query parameters
+def search_campaigns():
+    terms = search_terms(request.args.get('q'))
+    if not terms:
+        return jsonify({'error': 'Search query is required.'}), 400
+
+    # Public campaigns matching every term (prefix match), best match first
+    match = match_subquery(Campaign, terms)
+    query = (
+        db.session.query(
+            Campaign.id, Campaign.name, Campaign.description, Campaign.budget,
+            Campaign.category, Campaign.is_open, User.username.label('sponsor_name'), match.c.rank
+        )
+        .join(match, match.c.id == Campaign.id)
+        .join(User, User.id == Campaign.sponsor_id)
+        .filter(Campaign.visibility == 'public')
+    )
 
+    return list_response(
+        query, [match.c.rank, Campaign.id], key=lambda campaign: [campaign.rank, campaign.id],
+        serialize=lambda campaign: {
+            'id': campaign.id,
+            'name': campaign.name,
+            'description': campaign.description,
+            'budget': campaign.budget,
+            'category': campaign.category,
+            'sponsor_name': campaign.sponsor_name,
+            'is_open': campaign.is_open
+        }
+    ), 200
 
 
-# API to fetch private ad requests made to the specific influencer
 @influencer_bp.route('/ad-requests', methods=['GET'])
 @jwt_required()
+@role_required('Influencer', profile_complete=True)
 def get_private_ad_requests():
-    if not is_influencer():
-        return jsonify({'error': 'Access forbidden: Influencers only!'}), 403
-
-    user_id = get_jwt_identity()
-    influencer = Influencer.query.get(user_id)
+    user_id = current_user_id()
 
-    # Check if the profile is complete
-    if not is_profile_complete(influencer):
-        return jsonify({'error': 'Profile incomplete. Please complete your profile first.'}), 403
+    fields = ['id', 'campaign_id', 'campaign_name', 'requirements', 'payment_amount', 'status',
+              'negotiated_payment_amount', 'influencer_name', 'sponsor_name']
 
     # Fetch private ad requests sent to this influencer
-    ad_requests = AdRequest.query.join(Campaign).filter(
+    ad_requests = ad_request_query(fields).filter(
         AdRequest.influencer_id == user_id,
         Campaign.visibility == 'private'  # Ensure only private campaigns are fetched
-    ).all()
-
-    ad_request_list = [{
-        'id': ad_request.id,
-        'campaign_id': ad_request.campaign.id,  # Include campaign ID
-        'campaign_name': ad_request.campaign.name,
-        'requirements': ad_request.requirements,
-        'payment_amount': ad_request.payment_amount,
-        'status': ad_request.status,
-        'negotiated_payment_amount' : ad_request.negotiated_payment_amount,
-        'influencer_name': ad_request.influencer.user.username,
-        'sponsor_name': ad_request.campaign.sponsor.user.username,
-        'requirements' : ad_request.requirements
-    } for ad_request in ad_requests]
+    )
 
-    return jsonify(ad_request_list), 200
+    return list_response(
+        ad_requests, [AdRequest.created_at, AdRequest.id],
+        key=lambda ad_request: [ad_request.created_at, ad_request.id],
+        serialize=ad_request_serializer(fields)
+    ), 200
 
 
 
@@ -223,10 +230,8 @@ def get_private_ad_requests():
 # API to view the details of a specific campaign
 @influencer_bp.route('/campaign/<int:campaign_id>', methods=['GET'])
 @jwt_required()
+@role_required('Influencer')
 def view_campaign(campaign_id):
-    if not is_influencer():
-        return jsonify({'error': 'Access forbidden: Influencers only!'}), 403
-
     campaign = Campaign.query.get(campaign_id)
 
     if not campaign:
@@ -249,10 +254,8 @@ def view_campaign(campaign_id):
 # API to update ad request status (Accept or Reject)
 @influencer_bp.route('/ad-request/<int:ad_request_id>/status', methods=['PUT'])
 @jwt_required()
+@role_required('Influencer')
 def update_ad_request_status(ad_request_id):
-    if not is_influencer():
-        return jsonify({'error': 'Access forbidden: Influencers only!'}), 403
-
     data = request.json
     new_status = data.get('status')
 
@@ -264,7 +267,9 @@ def update_ad_request_status(ad_request_id):
         return jsonify({'error': 'Ad request not found.'}), 404
 
     ad_request.status = new_status
+    tags = ad_request_tags(ad_request)
     db.session.commit()
+    invalidate_tags(*tags)
 
     return jsonify({'message': f'Ad request status updated to {new_status}.'}), 200
 
@@ -289,19 +294,38 @@ def negotiate_ad_request(ad_request_id):
     # Update the ad request with the negotiation message and new payment amount
     ad_request.is_negotiated = True
     ad_request.negotiated_payment_amount = negotiated_payment  # This line should update the negotiated amount
-    ad_request.messages = (ad_request.messages or '') + f'\nInfluencer: {negotiation_message}'
 
+    # Append to the thread and refresh the summary shown in list views
+    db.session.add(NegotiationMessage(ad_request_id=ad_request.id, sender='Influencer', body=negotiation_message))
+    ad_request.last_message = negotiation_message
+    ad_request.message_count = AdRequest.message_count + 1
+
+    tags = ad_request_tags(ad_request)
     db.session.commit()
+    invalidate_tags(*tags)
 
     return jsonify({'message': 'Negotiation submitted successfully!'}), 200
 
 
+# Negotiation thread of one of the influencer's ad requests, oldest first
+@influencer_bp.route('/ad-request/<int:ad_request_id>/messages', methods=['GET'])
+@jwt_required()
+@role_required('Influencer')
+def get_negotiation_messages(ad_request_id):
+    ad_request = AdRequest.query.get(ad_request_id)
+    if not ad_request or ad_request.influencer_id != current_user_id():
+        return jsonify({'error': 'Ad Request not found.'}), 404
+
+    return list_response(
+        negotiation_thread_query(ad_request_id), [NegotiationMessage.id],
+        key=lambda message: [message.id], serialize=serialize_message
+    ), 200
+
+
 @influencer_bp.route('/apply', methods=['POST'])
 @jwt_required()
+@role_required('Influencer')
 def apply_for_campaign():
-    if not is_influencer():
-        return jsonify({'error': 'Access forbidden: Influencers only!'}), 403
-
     data = request.json
     campaign_id = data.get('campaign_id')
 
@@ -314,30 +338,30 @@ def apply_for_campaign():
     if campaign.visibility != 'public':
         return jsonify({'error': 'Only public campaigns can be applied for.'}), 403
 
-    # Check if an AdRequest exists and is accepted for this campaign
-    existing_ad_request = AdRequest.query.filter_by(campaign_id=campaign.id, status='Accepted').first()
-    if existing_ad_request:
+    # Check if an AdRequest has already been accepted for this campaign
+    if not campaign.is_open:
         return jsonify({'error': 'This campaign has already been accepted by another influencer.'}), 403
 
     # Get the current influencer
-    influencer_id = get_jwt_identity()
-    influencer = Influencer.query.get(influencer_id)
+    influencer_id = current_user_id()
 
     # Check if the current influencer already has an AdRequest for this campaign
-    existing_influencer_request = AdRequest.query.filter_by(campaign_id=campaign.id, influencer_id=influencer.id).first()
+    existing_influencer_request = AdRequest.query.filter_by(campaign_id=campaign.id, influencer_id=influencer_id).first()
     if existing_influencer_request:
         return jsonify({'error': 'You have already applied for this campaign.'}), 400
 
     # Create a new AdRequest for the application
     new_ad_request = AdRequest(
         campaign_id=campaign.id,
-        influencer_id=influencer.id,
+        influencer_id=influencer_id,
         payment_amount=campaign.budget,  # The initial offer is the campaign's budget
         status='Pending',  # Set status to pending until sponsor accepts/rejects
         created_at=datetime.utcnow()
     )
 
     db.session.add(new_ad_request)
+    tags = ad_request_tags(new_ad_request, campaign)
     db.session.commit()
+    invalidate_tags(*tags)
 
     return jsonify({'message': 'Application submitted successfully!'}), 201
\ No newline at end of file
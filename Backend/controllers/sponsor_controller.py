@@ -1,35 +1,31 @@
 from flask import Blueprint, jsonify, request
-from models import User, Sponsor, Campaign , AdRequest , Influencer
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import User, Campaign , AdRequest , Influencer, NegotiationMessage
+from flask_jwt_extended import jwt_required
 from db import db
 from datetime import datetime
-from cache import cache
-import csv
-from io import StringIO
-from flask import make_response
+from sqlalchemy import func, insert
+from cache import cached_view, invalidate_tags, campaign_tags, ad_request_tags
+from flask import send_file
+from tasks import export_data, refresh_campaign_recommendations
+from exports import EXPORT_DATASETS, csv_response, create_job, load_job, export_path
+from pagination import list_response
+from read_models import (ad_request_query, ad_request_serializer, negotiation_thread_query, serialize_message,
+                         campaign_summary_query, serialize_campaign_summary)
+from recommendations import recommendations_for, forget_recommendations
+from search import search_terms, match_subquery
+from stats import adjust_counters, counters_enabled
+from identity import role_required, current_user, current_user_id, current_profile, invalidate_identity
 # from app import export_cache as cache
 
 
 # Create the Blueprint for sponsor-related routes
 sponsor_bp = Blueprint('sponsor', __name__)
 
-# Function to check if the current user is a sponsor
-def is_sponsor():
-    user_id = get_jwt_identity()  
-    user = User.query.get(user_id) 
-    return user and user.role == 'Sponsor'  # Check if the user is a sponsor
-
-# Function to check if the sponsor's profile is complete
-def is_profile_complete(sponsor):
-    return sponsor and sponsor.industry and sponsor.sponsor_type
-
 # Sponsor Profile Completion API
 @sponsor_bp.route('/complete-profile', methods=['POST'])
 @jwt_required()
+@role_required('Sponsor')
 def complete_profile():
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
-
     data = request.json
     industry = data.get('industry')
     sponsor_type = data.get('sponsor_type')
@@ -38,14 +34,14 @@ def complete_profile():
     if not industry or not sponsor_type:
         return jsonify({'error': 'Industry and sponsor type are required.'}), 400
 
-    user_id = get_jwt_identity()
-    sponsor = Sponsor.query.get(user_id)
+    sponsor = current_profile()
 
     # If the sponsor exists, update their profile
     if sponsor:
         sponsor.sponsor_type = sponsor_type
         sponsor.industry = industry
         db.session.commit()
+        invalidate_identity(sponsor.id)
         return jsonify({'message': 'Profile completed successfully!'}), 200
     else:
         return jsonify({'error': 'Sponsor not found.'}), 404
@@ -53,49 +49,44 @@ def complete_profile():
 # Sponsor Dashboard - View Campaigns
 @sponsor_bp.route('/campaigns', methods=['GET'])
 @jwt_required()
-@cache.cached(timeout=10, key_prefix='sponsor_campaigns')
+@role_required('Sponsor', profile_complete=True)
+@cached_view(timeout=300, tags=['sponsor:{identity}'])
 def view_campaigns():
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
-
-    user_id = get_jwt_identity()
-    sponsor = Sponsor.query.get(user_id)
-
-    # Check if the profile is complete
-    if not is_profile_complete(sponsor):
-        return jsonify({'error': 'Profile incomplete. Please complete your profile first.'}), 403
-    
-
-    # If the sponsor exists, return their campaigns
-    campaigns = Campaign.query.filter_by(sponsor_id=sponsor.id,flagged='Active').all()
-    campaign_list = [{
-        'id': campaign.id,
-        'name': campaign.name,
-        'description': campaign.description,
-        'start_date': campaign.start_date,
-        'end_date': campaign.end_date,
-        'budget': campaign.budget,
-        'visibility': campaign.visibility,
-        'goals': campaign.goals,
-        'flagged': campaign.flagged,
-        'category': campaign.category
-    } for campaign in campaigns]
-
-    return jsonify(campaign_list), 200
+    user_id = current_user_id()
+
+    # Return the sponsor's campaigns (paged, streamed or columnar on request)
+    campaigns = Campaign.query.filter_by(sponsor_id=user_id,flagged='Active')
+    return list_response(
+        campaigns, [Campaign.id], key=lambda campaign: [campaign.id],
+        serialize=lambda campaign: {
+            'id': campaign.id,
+            'name': campaign.name,
+            'description': campaign.description,
+            'start_date': campaign.start_date,
+            'end_date': campaign.end_date,
+            'budget': campaign.budget,
+            'visibility': campaign.visibility,
+            'goals': campaign.goals,
+            'flagged': campaign.flagged,
+            'category': campaign.category
+        }
+    ), 200
+
+# Sponsor Dashboard - per-campaign request counts and spend, in one grouped query
+@sponsor_bp.route('/campaigns/summary', methods=['GET'])
+@jwt_required()
+@role_required('Sponsor', profile_complete=True)
+@cached_view(timeout=300, tags=['sponsor:{identity}'])  # Every ad-request write bumps this tag
+def view_campaign_summaries():
+    summaries = campaign_summary_query(current_user_id()).all()
+    return jsonify([serialize_campaign_summary(row) for row in summaries]), 200
 
 # Sponsor - Add a Campaign
 @sponsor_bp.route('/campaigns', methods=['POST'])
 @jwt_required()
+@role_required('Sponsor', profile_complete=True)
 def add_campaign():
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
-
-    user_id = get_jwt_identity()
-    sponsor = Sponsor.query.get(user_id)
-
-    # Check if the profile is complete
-    if not is_profile_complete(sponsor):
-        return jsonify({'error': 'Profile incomplete. Please complete your profile first.'}), 403
+    user_id = current_user_id()
 
     data = request.json
     name = data.get('name')
@@ -111,7 +102,7 @@ def add_campaign():
     if not name or not budget or not visibility:
         return jsonify({'error': 'Name, budget, and visibility are required.'}), 400
 
-    # If the sponsor exists, create a new campaign
+    # Create a new campaign for the sponsor
     new_campaign = Campaign(
         name=name,
         description=description,
@@ -120,33 +111,26 @@ def add_campaign():
         budget=budget,
         visibility=visibility,
         goals=goals,
-        sponsor_id=sponsor.id,
+        sponsor_id=user_id,
         category= category
     )
     db.session.add(new_campaign)
     db.session.commit()
-    invalidate_campaign_cache()  # Invalidate cache
+    invalidate_tags(*campaign_tags(new_campaign))  # Invalidate cache
     return jsonify({'message': 'Campaign added successfully!'}), 201
 
 # Sponsor - Update a Campaign
 @sponsor_bp.route('/campaigns/<int:campaign_id>', methods=['PUT'])
 @jwt_required()
+@role_required('Sponsor', profile_complete=True)
 def update_campaign(campaign_id):
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
-
-    user_id = get_jwt_identity()
-    sponsor = Sponsor.query.get(user_id)
+    user_id = current_user_id()
 
-    # Check if the profile is complete
-    if not is_profile_complete(sponsor):
-        return jsonify({'error': 'Profile incomplete. Please complete your profile first.'}), 403
-
-    # If the sponsor exists, allow them to update their campaign
+    # Allow the sponsor to update their campaign
     campaign = Campaign.query.get(campaign_id)
 
     # Ensure the campaign belongs to the sponsor
-    if campaign and campaign.sponsor_id == sponsor.id:
+    if campaign and campaign.sponsor_id == user_id:
         data = request.json
         campaign.name = data.get('name', campaign.name)
         campaign.description = data.get('description', campaign.description)
@@ -156,32 +140,44 @@ def update_campaign(campaign_id):
         campaign.visibility = data.get('visibility', campaign.visibility)
         campaign.goals = data.get('goals', campaign.goals)
 
+        tags = campaign_tags(campaign)
         db.session.commit()
+        invalidate_tags(*tags)
+        forget_recommendations(campaign_id)  # Rescored in the background on next view
         return jsonify({'message': 'Campaign updated successfully!'}), 200
     else:
         return jsonify({'error': 'Campaign not found or you do not own this campaign.'}), 404
 
+# Sponsor - Best matching influencers for a campaign (precomputed by tasks.precompute_recommendations)
+@sponsor_bp.route('/campaigns/<int:campaign_id>/recommendations', methods=['GET'])
+@jwt_required()
+@role_required('Sponsor')
+def get_campaign_recommendations(campaign_id):
+    campaign = Campaign.query.get(campaign_id)
+    if not campaign or campaign.sponsor_id != current_user_id():
+        return jsonify({'error': 'Campaign not found or you do not own this campaign.'}), 404
+
+    recommended, needs_rescore = recommendations_for(campaign_id)
+    if needs_rescore:
+        refresh_campaign_recommendations.delay(campaign_id)
+    return jsonify(recommended), 200
+
 # Sponsor - Delete a Campaign
 @sponsor_bp.route('/campaigns/<int:campaign_id>', methods=['DELETE'])
 @jwt_required()
+@role_required('Sponsor', profile_complete=True)
 def delete_campaign(campaign_id):
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
+    user_id = current_user_id()
 
-    user_id = get_jwt_identity()
-    sponsor = Sponsor.query.get(user_id)
-
-    # Check if the profile is complete
-    if not is_profile_complete(sponsor):
-        return jsonify({'error': 'Profile incomplete. Please complete your profile first.'}), 403
-
-    # If the sponsor exists, allow them to delete their campaign
+    # Allow the sponsor to delete their campaign
     campaign = Campaign.query.get(campaign_id)
 
     # Ensure the campaign belongs to the sponsor
-    if campaign and campaign.sponsor_id == sponsor.id:
+    if campaign and campaign.sponsor_id == user_id:
+        tags = campaign_tags(campaign)
         db.session.delete(campaign)
         db.session.commit()
+        invalidate_tags(*tags)
         return jsonify({'message': 'Campaign deleted successfully!'}), 200
     else:
         return jsonify({'error': 'Campaign not found or you do not own this campaign.'}), 404
@@ -190,8 +186,7 @@ def delete_campaign(campaign_id):
 @sponsor_bp.route('/details', methods=['GET'])
 @jwt_required()
 def get_sponsor_details():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = current_user()
 
     if not user:
         return jsonify({'error': 'Sponsor not found.'}), 404
@@ -206,43 +201,44 @@ def get_sponsor_details():
 # Fetch all ad requests for a sponsor's campaigns
 @sponsor_bp.route('/ad-requests', methods=['GET'])
 @jwt_required()
+@role_required('Sponsor')
 def get_ad_requests():
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
+    user_id = current_user_id()
 
-    user_id = get_jwt_identity()
-    sponsor = Sponsor.query.get(user_id)
+    fields = ['id', 'campaign_id', 'requirements', 'payment_amount', 'negotiated_payment_amount',
+              'is_negotiated', 'status', 'last_message', 'message_count', 'influencer_name']
 
-    # Fetch campaigns created by the sponsor
-    campaigns = Campaign.query.filter_by(sponsor_id=sponsor.id).all()
-    campaign_ids = [campaign.id for campaign in campaigns]
+    # Fetch ad requests for the campaigns created by the sponsor
+    ad_requests = ad_request_query(fields).filter(Campaign.sponsor_id == user_id)
 
-    # Fetch ad requests for these campaigns
-    ad_requests = AdRequest.query.filter(AdRequest.campaign_id.in_(campaign_ids)).all()
+    return list_response(
+        ad_requests, [AdRequest.created_at, AdRequest.id],
+        key=lambda ad_request: [ad_request.created_at, ad_request.id],
+        serialize=ad_request_serializer(fields)
+    ), 200
 
-    ad_request_list = [{
-        'id': ad_request.id,
-        'campaign_id': ad_request.campaign_id,
-        'requirements': ad_request.requirements,
-        'payment_amount': ad_request.payment_amount,
-        'negotiated_payment_amount': ad_request.negotiated_payment_amount,  # New field
-        'is_negotiated': ad_request.is_negotiated,  # New field to indicate negotiation status
-        'status': ad_request.status,
-        'messages': ad_request.messages,
-        'influencer_name': ad_request.influencer.user.username
-    } for ad_request in ad_requests]
 
-    return jsonify(ad_request_list), 200
 
+# Negotiation thread of an ad request on one of the sponsor's campaigns, oldest first
+@sponsor_bp.route('/ad-requests/<int:ad_request_id>/messages', methods=['GET'])
+@jwt_required()
+@role_required('Sponsor')
+def get_negotiation_messages(ad_request_id):
+    ad_request = AdRequest.query.get(ad_request_id)
+    if not ad_request or ad_request.campaign.sponsor_id != current_user_id():
+        return jsonify({'error': 'Ad Request not found.'}), 404
+
+    return list_response(
+        negotiation_thread_query(ad_request_id), [NegotiationMessage.id],
+        key=lambda message: [message.id], serialize=serialize_message
+    ), 200
 
 
 # Create a new ad request for a campaign
 @sponsor_bp.route('/ad-requests', methods=['POST'])
 @jwt_required()
+@role_required('Sponsor')
 def create_ad_request():
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
-
     data = request.json
     campaign_id = data.get('campaign_id')
     influencer_id = data.get('influencer_id')
@@ -254,11 +250,10 @@ def create_ad_request():
         return jsonify({'error': 'All fields are required.'}), 400
 
     # Ensure the sponsor owns the campaign
-    user_id = get_jwt_identity()
-    sponsor = Sponsor.query.get(user_id)
+    user_id = current_user_id()
     campaign = Campaign.query.get(campaign_id)
 
-    if campaign.sponsor_id != sponsor.id:
+    if campaign.sponsor_id != user_id:
         return jsonify({'error': 'You do not own this campaign.'}), 403
 
     # Create the ad request
@@ -273,18 +268,93 @@ def create_ad_request():
     )
     
     db.session.add(new_ad_request)
+    tags = ad_request_tags(new_ad_request, campaign)
     db.session.commit()
+    invalidate_tags(*tags)
 
     return jsonify({'message': 'Ad request created successfully!'}), 201
 
 
+# Most ad requests accepted by one bulk call
+MAX_BULK_AD_REQUESTS = 1000
+
+# Create many ad requests at once; valid items are inserted in one transaction
+@sponsor_bp.route('/ad-requests/bulk', methods=['POST'])
+@jwt_required()
+@role_required('Sponsor')
+def create_ad_requests_bulk():
+    items = (request.json or {}).get('ad_requests')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'ad_requests must be a non-empty list.'}), 400
+    if len(items) > MAX_BULK_AD_REQUESTS:
+        return jsonify({'error': f'At most {MAX_BULK_AD_REQUESTS} ad requests per call.'}), 400
+
+    user_id = current_user_id()
+    items = [item if isinstance(item, dict) else {} for item in items]
+
+    # Ownership and existence, checked with one query each for the whole batch
+    campaign_ids = {item.get('campaign_id') for item in items if isinstance(item.get('campaign_id'), int)}
+    influencer_ids = {item.get('influencer_id') for item in items if isinstance(item.get('influencer_id'), int)}
+    owned = {campaign_id for (campaign_id,) in db.session.query(Campaign.id).filter(
+        Campaign.id.in_(campaign_ids), Campaign.sponsor_id == user_id)}
+    influencers = {influencer_id for (influencer_id,) in db.session.query(Influencer.id).filter(
+        Influencer.id.in_(influencer_ids))}
+
+    results = [None] * len(items)
+    rows, row_indexes = [], []
+    now = datetime.utcnow()
+    for index, item in enumerate(items):
+        if not all(item.get(field) for field in ('campaign_id', 'influencer_id', 'requirements', 'payment_amount')):
+            results[index] = {'index': index, 'error': 'All fields are required.'}
+        elif not isinstance(item['campaign_id'], int) or item['campaign_id'] not in owned:
+            results[index] = {'index': index, 'error': 'You do not own this campaign.'}
+        elif not isinstance(item['influencer_id'], int) or item['influencer_id'] not in influencers:
+            results[index] = {'index': index, 'error': 'Influencer not found.'}
+        else:
+            rows.append({
+                'campaign_id': item['campaign_id'],
+                'influencer_id': item['influencer_id'],
+                'requirements': item['requirements'],
+                'payment_amount': item['payment_amount'],
+                'status': 'Pending',
+                'created_at': now
+            })
+            row_indexes.append(index)
+
+    if rows:
+        # Multi-row insert; bypasses the flush, so dashboard counters are adjusted here.
+        # Ordered RETURNING would fall back to one INSERT per row on SQLite, so the
+        # new ids are matched back to items by (campaign, influencer) instead.
+        inserted = db.session.execute(
+            insert(AdRequest).returning(AdRequest.id, AdRequest.campaign_id, AdRequest.influencer_id), rows
+        ).all()
+        if counters_enabled():
+            adjust_counters(db.session, {'total_ad_requests': len(rows), 'pending_ad_requests': len(rows)})
+        db.session.commit()
+
+        ids = {}
+        for ad_request_id, campaign_id, influencer_id in sorted(inserted):
+            ids.setdefault((campaign_id, influencer_id), []).append(ad_request_id)
+        for index, row in zip(row_indexes, rows):
+            results[index] = {'index': index, 'id': ids[(row['campaign_id'], row['influencer_id'])].pop(0)}
+
+        tags = {'campaigns', f'sponsor:{user_id}'}
+        tags.update(f"campaign:{row['campaign_id']}" for row in rows)
+        tags.update(f"influencer:{row['influencer_id']}" for row in rows)
+        invalidate_tags(*tags)
+
+    return jsonify({
+        'created': len(rows),
+        'failed': len(items) - len(rows),
+        'results': results
+    }), 201 if rows else 400
+
+
 # Edit an ad request
 @sponsor_bp.route('/ad-requests/<int:ad_request_id>', methods=['PUT'])
 @jwt_required()
+@role_required('Sponsor')
 def update_ad_request(ad_request_id):
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
-
     data = request.json
     ad_request = AdRequest.query.get(ad_request_id)
 
@@ -292,10 +362,9 @@ def update_ad_request(ad_request_id):
         return jsonify({'error': 'Ad request not found.'}), 404
 
     # Ensure the ad request belongs to the sponsor's campaign
-    user_id = get_jwt_identity()
-    sponsor = Sponsor.query.get(user_id)
+    user_id = current_user_id()
 
-    if ad_request.campaign.sponsor_id != sponsor.id:
+    if ad_request.campaign.sponsor_id != user_id:
         return jsonify({'error': 'You do not own this ad request.'}), 403
 
     # Update ad request details
@@ -303,31 +372,32 @@ def update_ad_request(ad_request_id):
     ad_request.payment_amount = data.get('payment_amount', ad_request.payment_amount)
     ad_request.status = data.get('status', ad_request.status)
 
+    tags = ad_request_tags(ad_request)
     db.session.commit()
+    invalidate_tags(*tags)
 
     return jsonify({'message': 'Ad request updated successfully!'}), 200
 
 # Delete an ad request
 @sponsor_bp.route('/ad-requests/<int:ad_request_id>', methods=['DELETE'])
 @jwt_required()
+@role_required('Sponsor')
 def delete_ad_request(ad_request_id):
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
-
     ad_request = AdRequest.query.get(ad_request_id)
 
     if not ad_request:
         return jsonify({'error': 'Ad request not found.'}), 404
 
     # Ensure the ad request belongs to the sponsor's campaign
-    user_id = get_jwt_identity()
-    sponsor = Sponsor.query.get(user_id)
+    user_id = current_user_id()
 
-    if ad_request.campaign.sponsor_id != sponsor.id:
+    if ad_request.campaign.sponsor_id != user_id:
         return jsonify({'error': 'You do not own this ad request.'}), 403
 
+    tags = ad_request_tags(ad_request)
     db.session.delete(ad_request)
     db.session.commit()
+    invalidate_tags(*tags)
 
     return jsonify({'message': 'Ad request deleted successfully!'}), 200
 
@@ -336,46 +406,72 @@ def delete_ad_request(ad_request_id):
 
 @sponsor_bp.route('/influencers', methods=['GET'])
 @jwt_required()
-@cache.memoize(timeout=10)  # Cache based on query parameters
+@cached_view(timeout=300, tags=['influencers'])  # Keyed on identity and query parameters
 def get_all_influencers():
     category = request.args.get('category')
     expertise = request.args.get('expertise')
     reach = request.args.get('reach', type=int)
 
-    query = Influencer.query
+    # Plain rows with the username joined in, so serializing never lazy-loads a user
+    query = (
+        db.session.query(Influencer.id, User.username, Influencer.category, Influencer.expertise, Influencer.reach)
+        .join(User, User.id == Influencer.id)
+    )
 
     if category:
-        query = query.filter_by(category=category)
-    if expertise:
-        query = query.filter(Influencer.expertise.ilike(f"%{expertise}%"))
+        query = query.filter(Influencer.category == category)
+    if expertise and search_terms(expertise):
+        # Served from the full-text index (prefix match on each word of the expertise column)
+        match = match_subquery(Influencer, search_terms(expertise), column_name='expertise')
+        query = query.filter(Influencer.id.in_(db.session.query(match.c.id)))
     if reach:
         query = query.filter(Influencer.reach >= reach)
 
-    influencers = query.all()
-
-    influencer_list = [{
-        'id': influencer.id,
-        'username': influencer.user.username,
-        'category': influencer.category,
-        'expertise': influencer.expertise,
-        'reach': influencer.reach
-    } for influencer in influencers]
-
-    return jsonify(influencer_list), 200
-
-# Add cache invalidation when campaign is created/updated
-def invalidate_campaign_cache():
-    cache.delete('sponsor_campaigns')
-
+    return list_response(
+        query, [Influencer.id], key=lambda influencer: [influencer.id],
+        serialize=lambda influencer: {
+            'id': influencer.id,
+            'username': influencer.username,
+            'category': influencer.category,
+            'expertise': influencer.expertise,
+            'reach': influencer.reach
+        }
+    ), 200
+
+@sponsor_bp.route('/search/influencers', methods=['GET'])
+@jwt_required()
+@role_required('Sponsor')
+@cached_view(timeout=300, tags=['influencers'])  # Keyed on identity and query parameters
+def search_influencers():
+    terms = search_terms(request.args.get('q'))
+    if not terms:
+        return jsonify({'error': 'Search query is required.'}), 400
+
+    # Influencers whose expertise/category match every term (prefix match), best match first
+    match = match_subquery(Influencer, terms)
+    query = (
+        db.session.query(Influencer.id, User.username, Influencer.category,
+                         Influencer.expertise, Influencer.reach, match.c.rank)
+        .join(match, match.c.id == Influencer.id)
+        .join(User, User.id == Influencer.id)
+    )
 
+    return list_response(
+        query, [match.c.rank, Influencer.id], key=lambda influencer: [influencer.rank, influencer.id],
+        serialize=lambda influencer: {
+            'id': influencer.id,
+            'username': influencer.username,
+            'category': influencer.category,
+            'expertise': influencer.expertise,
+            'reach': influencer.reach
+        }
+    ), 200
 
 # Endpoint to accept a negotiation
 @sponsor_bp.route('/ad-requests/<int:ad_request_id>/accept', methods=['PUT'])
 @jwt_required()
+@role_required('Sponsor')
 def accept_negotiation(ad_request_id):
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
-
     ad_request = AdRequest.query.get(ad_request_id)
     if not ad_request:
         return jsonify({'error': 'Ad Request not found.'}), 404
@@ -387,7 +483,9 @@ def accept_negotiation(ad_request_id):
         # Clear the negotiated payment after acceptance
         ad_request.is_negotiated = False
         
+        tags = ad_request_tags(ad_request)
         db.session.commit()
+        invalidate_tags(*tags)
         return jsonify({'message': 'Ad Request accepted and payment updated to negotiated amount.'}), 200
     else:
         return jsonify({'error': 'No negotiated amount found for this request.'}), 400
@@ -396,10 +494,8 @@ def accept_negotiation(ad_request_id):
 # Endpoint to reject a negotiation
 @sponsor_bp.route('/ad-requests/<int:ad_request_id>/reject', methods=['PUT'])
 @jwt_required()
+@role_required('Sponsor')
 def reject_negotiation(ad_request_id):
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
-
     ad_request = AdRequest.query.get(ad_request_id)
     if not ad_request:
         return jsonify({'error': 'Ad Request not found.'}), 404
@@ -408,71 +504,60 @@ def reject_negotiation(ad_request_id):
     ad_request.negotiated_payment_amount = ad_request.payment_amount
     ad_request.is_negotiated = False
 
+    tags = ad_request_tags(ad_request)
     db.session.commit()
+    invalidate_tags(*tags)
 
     return jsonify({'message': 'Negotiation rejected. Payment remains unchanged.'}), 200
 
 
 
+# Sort options for incoming requests: keyset columns and how to read them off a row
+INCOMING_SORT_KEYS = {
+    'created': ([AdRequest.created_at, AdRequest.id], lambda row: [row.created_at, row.id]),
+    'payment': ([AdRequest.payment_amount, AdRequest.id], lambda row: [row.payment_amount, row.id]),
+    'reach': ([func.coalesce(Influencer.reach, 0), AdRequest.id], lambda row: [row.reach or 0, row.id]),
+}
+
 # Route to fetch incoming ad requests from influencers who applied to sponsor's campaigns (public)
 @sponsor_bp.route('/incoming-requests', methods=['GET'])
 @jwt_required()
+@role_required('Sponsor')
 def get_incoming_requests():
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
+    user_id = current_user_id()
 
-    user_id = get_jwt_identity()
-    sponsor = Sponsor.query.get(user_id)
+    sort = request.args.get('sort', 'created')
+    order = request.args.get('order', 'asc' if sort == 'created' else 'desc')
+    if sort not in INCOMING_SORT_KEYS or order not in ('asc', 'desc'):
+        return jsonify({'error': f'Invalid sort. Sort by one of: {", ".join(INCOMING_SORT_KEYS)} (order asc or desc).'}), 400
 
-    # Get all public campaigns created by the sponsor
-    campaigns = Campaign.query.filter_by(sponsor_id=sponsor.id, visibility='public').all()
-    campaign_ids = [campaign.id for campaign in campaigns]
+    fields = ['id', 'campaign_name', 'influencer_name', 'payment_amount', 'category', 'reach', 'status', 'is_public']
 
-    # Filter out public campaigns that already have an accepted request
+    # Pending requests on the sponsor's public campaigns that are still open
     ad_requests = (
-        db.session.query(AdRequest)
-        .filter(AdRequest.campaign_id.in_(campaign_ids), AdRequest.status == 'Pending')
-        .all()
+        ad_request_query(fields)
+        .filter(Campaign.sponsor_id == user_id, Campaign.visibility == 'public',
+                AdRequest.status == 'Pending', Campaign.is_open)
     )
 
-    # Filter out campaigns that already have an accepted request
-    filtered_ad_requests = []
-    for ad_request in ad_requests:
-        # Check if there is already an accepted request for this campaign
-        accepted_request_exists = AdRequest.query.filter_by(campaign_id=ad_request.campaign_id, status='Accepted').first()
-        if not accepted_request_exists:
-            filtered_ad_requests.append(ad_request)
-
-    # Prepare the response
-    ad_request_list = [{
-        'id': ad_request.id,
-        'campaign_name': ad_request.campaign.name,
-        'influencer_name': ad_request.influencer.user.username,
-        'payment_amount': ad_request.payment_amount,
-        'category': ad_request.influencer.category,
-        'reach': ad_request.influencer.reach,
-        'status': ad_request.status,
-        'is_public': ad_request.campaign.visibility == 'public'
-    } for ad_request in filtered_ad_requests]
-
-    return jsonify(ad_request_list), 200
-
-
+    keys, key = INCOMING_SORT_KEYS[sort]
+    return list_response(ad_requests, keys, key=key, serialize=ad_request_serializer(fields),
+                         descending=(order == 'desc')), 200
 
 
 # Endpoint to accept an incoming request
 @sponsor_bp.route('/incoming-requests/<int:ad_request_id>/accept', methods=['PUT'])
 @jwt_required()
+@role_required('Sponsor')
 def accept_incoming_request(ad_request_id):
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
-
     ad_request = AdRequest.query.get(ad_request_id)
     if not ad_request:
         return jsonify({'error': 'Ad Request not found.'}), 404
 
     ad_request.status = 'Accepted'
+    tags = ad_request_tags(ad_request)
     db.session.commit()
+    invalidate_tags(*tags)
 
     return jsonify({'message': 'Ad Request has been accepted.'}), 200
 
@@ -480,16 +565,16 @@ def accept_incoming_request(ad_request_id):
 # Endpoint to reject an incoming request
 @sponsor_bp.route('/incoming-requests/<int:ad_request_id>/reject', methods=['PUT'])
 @jwt_required()
+@role_required('Sponsor')
 def reject_incoming_request(ad_request_id):
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
-
     ad_request = AdRequest.query.get(ad_request_id)
     if not ad_request:
         return jsonify({'error': 'Ad Request not found.'}), 404
 
     ad_request.status = 'Rejected'
+    tags = ad_request_tags(ad_request)
     db.session.commit()
+    invalidate_tags(*tags)
 
     return jsonify({'message': 'Ad Request has been rejected.'}), 200
 
@@ -497,44 +582,63 @@ def reject_incoming_request(ad_request_id):
 
 @sponsor_bp.route('/export-campaigns', methods=['GET'])
 @jwt_required()
+@role_required('Sponsor', profile_complete=True)
 def export_campaigns():
-    if not is_sponsor():
-        return jsonify({'error': 'Access forbidden: Sponsors only!'}), 403
-
-    user_id = get_jwt_identity()
-    sponsor = Sponsor.query.get(user_id)
-
-    # Check if the profile is complete
-    if not is_profile_complete(sponsor):
-        return jsonify({'error': 'Profile incomplete. Please complete your profile first.'}), 403
-
-    # Get all campaigns for the sponsor
-    campaigns = Campaign.query.filter_by(sponsor_id=sponsor.id, flagged='Active').all()
-
-    # Create a StringIO object to write CSV data
-    si = StringIO()
-    writer = csv.writer(si)
-
-    # Write headers
-    writer.writerow(['Campaign Name', 'Description', 'Start Date', 'End Date', 
-                    'Budget', 'Visibility', 'Goals', 'Category', 'Status'])
-
-    # Write campaign data
-    for campaign in campaigns:
-        writer.writerow([
-            campaign.name,
-            campaign.description,
-            campaign.start_date,
-            campaign.end_date,
-            campaign.budget,
-            campaign.visibility,
-            campaign.goals,
-            campaign.category,
-            campaign.flagged
-        ])
-
-    # Create the response
-    output = make_response(si.getvalue())
-    output.headers["Content-Disposition"] = "attachment; filename=campaign_report.csv"
-    output.headers["Content-type"] = "text/csv"
-    return output
+    # Stream the sponsor's active campaigns as CSV
+    return csv_response('campaigns', current_user_id(), 'campaign_report.csv')
+
+
+# Stream any export dataset (campaigns, ad-requests, payments) as CSV
+@sponsor_bp.route('/export/<dataset>', methods=['GET'])
+@jwt_required()
+@role_required('Sponsor', profile_complete=True)
+def export_dataset(dataset):
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({'error': f'Unknown export. Available exports are: {", ".join(EXPORT_DATASETS)}'}), 404
+
+    return csv_response(dataset, current_user_id(), f'{dataset}_report.csv')
+
+
+# Queue a large export to run in the background
+@sponsor_bp.route('/export/<dataset>/async', methods=['POST'])
+@jwt_required()
+@role_required('Sponsor', profile_complete=True)
+def start_export(dataset):
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({'error': f'Unknown export. Available exports are: {", ".join(EXPORT_DATASETS)}'}), 404
+
+    job = create_job(dataset, current_user_id())
+    export_data.delay(job['id'])
+    return jsonify({'job_id': job['id'], 'status': job['status']}), 202
+
+
+# Check the status of a background export
+@sponsor_bp.route('/exports/<job_id>', methods=['GET'])
+@jwt_required()
+@role_required('Sponsor')
+def get_export_status(job_id):
+    job = load_job(job_id)
+    if not job or job['sponsor_id'] != current_user_id():
+        return jsonify({'error': 'Export not found.'}), 404
+
+    return jsonify({
+        'job_id': job['id'],
+        'dataset': job['dataset'],
+        'status': job['status'],
+        'error': job.get('error')
+    }), 200
+
+
+# Download a finished background export (gzip-compressed CSV)
+@sponsor_bp.route('/exports/<job_id>/download', methods=['GET'])
+@jwt_required()
+@role_required('Sponsor')
+def download_export(job_id):
+    job = load_job(job_id)
+    if not job or job['sponsor_id'] != current_user_id():
+        return jsonify({'error': 'Export not found.'}), 404
+    if job['status'] != 'done':
+        return jsonify({'error': f"Export is not ready (status: {job['status']})."}), 409
+
+    return send_file(export_path(job_id), mimetype='application/gzip', as_attachment=True,
+                     download_name=f"{job['dataset']}_report.csv.gz")
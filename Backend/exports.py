@@ -0,0 +1,164 @@
+# exports.py
+import csv
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime
+from io import StringIO
+
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import func
+
+from db import db
+from models import User, Campaign, AdRequest
+
+# Rows fetched per database round-trip, and rows per streamed chunk
+EXPORT_BATCH_SIZE = 1000
+
+
+def _campaigns(sponsor_id):
+    return (
+        db.session.query(
+            Campaign.name, Campaign.description, Campaign.start_date, Campaign.end_date,
+            Campaign.budget, Campaign.visibility, Campaign.goals, Campaign.category, Campaign.flagged
+        )
+        .filter(Campaign.sponsor_id == sponsor_id, Campaign.flagged == 'Active')
+        .order_by(Campaign.id)
+    )
+
+
+def _ad_requests(sponsor_id):
+    return (
+        db.session.query(
+            AdRequest.id, Campaign.name, User.username, AdRequest.requirements,
+            AdRequest.payment_amount, AdRequest.negotiated_payment_amount,
+            AdRequest.status, AdRequest.created_at
+        )
+        .join(Campaign, Campaign.id == AdRequest.campaign_id)
+        .join(User, User.id == AdRequest.influencer_id)
+        .filter(Campaign.sponsor_id == sponsor_id)
+        .order_by(AdRequest.id)
+    )
+
+
+def _payments(sponsor_id):
+    return (
+        db.session.query(
+            AdRequest.id, Campaign.name, User.username,
+            func.coalesce(AdRequest.negotiated_payment_amount, AdRequest.payment_amount),
+            AdRequest.completed, AdRequest.created_at
+        )
+        .join(Campaign, Campaign.id == AdRequest.campaign_id)
+        .join(User, User.id == AdRequest.influencer_id)
+        .filter(Campaign.sponsor_id == sponsor_id, AdRequest.status == 'Accepted')
+        .order_by(AdRequest.id)
+    )
+
+
+# dataset name -> (CSV headers, query factory taking the sponsor id)
+EXPORT_DATASETS = {
+    'campaigns': (
+        ['Campaign Name', 'Description', 'Start Date', 'End Date',
+         'Budget', 'Visibility', 'Goals', 'Category', 'Status'],
+        _campaigns,
+    ),
+    'ad-requests': (
+        ['Ad Request ID', 'Campaign Name', 'Influencer', 'Requirements', 'Payment Amount',
+         'Negotiated Payment Amount', 'Status', 'Created At'],
+        _ad_requests,
+    ),
+    'payments': (
+        ['Ad Request ID', 'Campaign Name', 'Influencer', 'Amount', 'Completed', 'Created At'],
+        _payments,
+    ),
+}
+
+
+def iter_csv(dataset, sponsor_id):
+    """Yield the CSV export of `dataset` in chunks of EXPORT_BATCH_SIZE rows.
+
+    Rows come from a server-side cursor, so memory stays bounded by one
+    batch whatever the size of the export.
+    """
+    headers, query = EXPORT_DATASETS[dataset]
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+
+    rows = query(sponsor_id).execution_options(stream_results=True).yield_per(EXPORT_BATCH_SIZE)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def csv_response(dataset, sponsor_id, filename):
+    response = Response(stream_with_context(iter_csv(dataset, sponsor_id)), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+# Async exports: gzip files plus a JSON status record per job in EXPORT_DIR
+def export_dir():
+    path = current_app.config.get('EXPORT_DIR') or os.path.join(current_app.instance_path, 'exports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def export_path(job_id):
+    return os.path.join(export_dir(), f'{job_id}.csv.gz')
+
+
+def _job_path(job_id):
+    return os.path.join(export_dir(), f'{job_id}.json')
+
+
+def save_job(job):
+    job['updated_at'] = datetime.utcnow().isoformat()
+    tmp_path = _job_path(job['id']) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(job, f)
+    os.replace(tmp_path, _job_path(job['id']))
+
+
+def load_job(job_id):
+    try:
+        uuid.UUID(job_id)
+        with open(_job_path(job_id)) as f:
+            return json.load(f)
+    except (ValueError, FileNotFoundError):
+        return None
+
+
+def create_job(dataset, sponsor_id):
+    job = {'id': str(uuid.uuid4()), 'dataset': dataset, 'sponsor_id': sponsor_id, 'status': 'queued'}
+    save_job(job)
+    return job
+
+
+def run_job(job_id):
+    """Write the export for `job_id` to its gzip file, tracking progress in the job record.
+
+    Returns the final job record, or None if the job is unknown or its record was cleaned up.
+    """
+    job = load_job(job_id)
+    if job is None:
+        return None
+    job['status'] = 'running'
+    save_job(job)
+    try:
+        tmp_path = export_path(job_id) + '.tmp'
+        with gzip.open(tmp_path, 'wt', newline='') as f:
+            for chunk in iter_csv(job['dataset'], job['sponsor_id']):
+                f.write(chunk)
+        os.replace(tmp_path, export_path(job_id))
+        job['status'] = 'done'
+    except Exception as e:
+        job['status'] = 'failed'
+        job['error'] = str(e)
+    save_job(job)
+    return job
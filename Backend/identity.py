@@ -0,0 +1,117 @@
+# identity.py
+from functools import wraps
+
+from flask import g, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy.orm import joinedload
+
+from cache import cache
+from models import User
+from routing import use_primary
+
+# How long a caller's role/profile snapshot is shared across requests and workers
+IDENTITY_CACHE_TIMEOUT = 60
+
+FORBIDDEN_MESSAGES = {
+    'Admin': 'Access forbidden: Admins only!',
+    'Sponsor': 'Access forbidden: Sponsors only!',
+    'Influencer': 'Access forbidden: Influencers only!',
+}
+PROFILE_INCOMPLETE_MESSAGE = 'Profile incomplete. Please complete your profile first.'
+
+
+def _identity_key(user_id):
+    return f'identity:{user_id}'
+
+
+def current_user_id():
+    return int(get_jwt_identity())
+
+
+def current_user():
+    """The authenticated User, with its sponsor/influencer profile joined in.
+
+    Loaded at most once per request and kept on `flask.g`.
+    """
+    if 'current_user' not in g:
+        g.current_user = (
+            User.query
+            .options(joinedload(User.sponsor), joinedload(User.influencer))
+            .filter(User.id == current_user_id())
+            .first()
+        )
+    return g.current_user
+
+
+def current_profile():
+    """The Sponsor or Influencer row of the authenticated user, if any."""
+    user = current_user()
+    if not user:
+        return None
+    return user.sponsor if user.role == 'Sponsor' else user.influencer
+
+
+def is_profile_complete(user):
+    if user.role == 'Sponsor':
+        sponsor = user.sponsor
+        return bool(sponsor and sponsor.industry and sponsor.sponsor_type)
+    if user.role == 'Influencer':
+        influencer = user.influencer
+        return bool(influencer and influencer.expertise and influencer.category and influencer.reach)
+    return True
+
+
+def current_identity():
+    """Role, flag status and profile completeness of the caller.
+
+    Served from the shared cache when possible so role checks usually cost
+    no query at all; falls back to current_user(), read from the primary,
+    on a miss.
+    """
+    if 'identity' not in g:
+        key = _identity_key(current_user_id())
+        identity = cache.get(key)
+        if identity is None:
+            # Shared for IDENTITY_CACHE_TIMEOUT, so never filled from a lagging replica
+            with use_primary():
+                user = current_user()
+            identity = {
+                'exists': user is not None,
+                'role': user.role if user else None,
+                'flagged': user.flagged if user else None,
+                'profile_complete': is_profile_complete(user) if user else False,
+            }
+            cache.set(key, identity, timeout=IDENTITY_CACHE_TIMEOUT)
+        g.identity = identity
+    return g.identity
+
+
+def invalidate_identity(*user_ids):
+    """Drop the shared snapshots after a profile or flag status change."""
+    cache.delete_many(*[_identity_key(user_id) for user_id in user_ids])
+    g.pop('identity', None)
+
+
+def role_required(role, profile_complete=False):
+    """Reject callers whose token does not carry `role`.
+
+    The role comes from the claim added by `auth_controller.login`; the user
+    row is only consulted (through the shared snapshot) for non-admin roles
+    and profile completeness. Must be applied below `jwt_required()`.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if get_jwt().get('role') != role:
+                return jsonify({'error': FORBIDDEN_MESSAGES[role]}), 403
+
+            if role != 'Admin':
+                identity = current_identity()
+                if not identity['exists'] or identity['role'] != role:
+                    return jsonify({'error': FORBIDDEN_MESSAGES[role]}), 403
+                if profile_complete and not identity['profile_complete']:
+                    return jsonify({'error': PROFILE_INCOMPLETE_MESSAGE}), 403
+
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
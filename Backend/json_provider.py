@@ -0,0 +1,52 @@
+# json_provider.py
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: Flask's stdlib provider is used instead
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Decodes to the same values as the default provider's output: keys are
+    sorted, and datetimes (e.g. `AdRequest.created_at`) are passed through
+    to its fallback, which renders them as HTTP dates, as are decimals,
+    UUIDs and dataclasses. The bytes differ in places: non-ASCII text is
+    written as UTF-8 rather than \\u escapes, floats in orjson's shortest
+    form (1e16 rather than 1e+16), and NaN/Infinity as null. Objects orjson
+    cannot encode at all (integers beyond 64 bits) go to the stdlib encoder.
+    """
+
+    if orjson is not None:
+        options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _encode(self, obj):
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=self.options)
+
+    def dumps(self, obj, **kwargs):
+        if not kwargs:  # indent, separators, ...: only the stdlib encoder takes them
+            try:
+                return self._encode(obj).decode()
+            except orjson.JSONEncodeError:
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)  # Indented for reading
+        try:
+            body = self._encode(self._prepare_response_obj(args, kwargs)) + b'\n'
+        except orjson.JSONEncodeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Switch the app to the orjson provider when enabled and installed."""
+    if orjson is not None and app.config.get('FAST_JSON', True):
+        app.json = OrjsonProvider(app)
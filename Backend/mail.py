@@ -0,0 +1,4 @@
+# mail.py
+from flask_mail import Mail
+
+mail = Mail()
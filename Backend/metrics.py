@@ -0,0 +1,171 @@
+# metrics.py
+import hmac
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from cache import cache_stats
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# Statements kept per request for the slow-request log
+MAX_TRACED_STATEMENTS = 50
+
+_lock = threading.Lock()
+
+
+def _labels(labels):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped))
+
+
+class Counter:
+    def __init__(self, name, help):
+        self.name, self.help = name, help
+        self.values = {}
+
+    def inc(self, labels, amount=1):
+        key = tuple(labels.items())
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for key, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{{{_labels(dict(key))}}} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name, self.help, self.buckets = name, help, buckets
+        self.values = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        key = tuple(labels.items())
+        with _lock:
+            counts = self.values.setdefault(key, [0] * (len(self.buckets) + 2))
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for key, counts in sorted(self.values.items()):
+            labels = dict(key)
+            cumulative = 0
+            for bound, count in zip(list(self.buckets) + ['+Inf'], counts[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{_labels({**labels, "le": bound})}}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{_labels(labels)}}} {counts[-1]}')
+            lines.append(f'{self.name}_count{{{_labels(labels)}}} {cumulative}')
+        return lines
+
+
+# Per worker process, like cache_stats; Prometheus sums them across scrape targets
+REQUESTS = Counter('http_requests_total', 'Requests served, by route, method and status.')
+LATENCY = Histogram('http_request_duration_seconds', 'Request wall time, up to the response (streamed bodies excluded).', LATENCY_BUCKETS)
+SQL_COUNT = Histogram('http_request_sql_statements', 'SQL statements executed per request.', SQL_COUNT_BUCKETS)
+SQL_TIME = Histogram('http_request_sql_duration_seconds', 'Time spent in SQL per request.', LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram('http_response_size_bytes', 'Size of non-streamed response bodies.', SIZE_BUCKETS)
+VIEW_CACHE = Counter('http_view_cache_total', 'cached_view lookups, by route and result.')
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    if has_request_context() and 'sql_count' in g:
+        g.sql_count += 1
+        g.sql_time += elapsed
+        if len(g.sql_trace) < MAX_TRACED_STATEMENTS:
+            g.sql_trace.append((elapsed, statement))
+
+
+@event.listens_for(Engine, 'handle_error')
+def _failed_statement(context):
+    # after_cursor_execute never fires for a failed statement
+    starts = context.connection.info.get('query_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def _start_request():
+    g.request_start = time.perf_counter()
+    g.sql_count, g.sql_time, g.sql_trace = 0, 0.0, []
+
+
+def _record_request(response):
+    if 'request_start' not in g or request.endpoint == 'metrics':
+        return response
+
+    elapsed = time.perf_counter() - g.request_start
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    labels = {'route': route, 'method': request.method}
+
+    REQUESTS.inc({**labels, 'status': response.status_code})
+    LATENCY.observe(labels, elapsed)
+    SQL_COUNT.observe(labels, g.sql_count)
+    SQL_TIME.observe(labels, g.sql_time)
+    if not response.is_streamed:
+        RESPONSE_SIZE.observe(labels, response.calculate_content_length() or 0)
+    if 'view_cache' in g:
+        VIEW_CACHE.inc({'route': route, 'result': g.view_cache})
+
+    threshold = current_app.config.get('SLOW_REQUEST_MS')
+    if threshold is not None and elapsed * 1000 >= threshold:
+        _log_slow_request(route, elapsed)
+    return response
+
+
+def _log_slow_request(route, elapsed):
+    slowest = sorted(g.sql_trace, key=lambda trace: trace[0], reverse=True)[:5]
+    logger.warning(
+        'Slow request %s %s (%s): %.0f ms, %d SQL statements in %.0f ms%s',
+        request.method, request.full_path, route, elapsed * 1000, g.sql_count, g.sql_time * 1000,
+        ''.join(f'\n  {duration * 1000:.1f} ms  {" ".join(statement.split())[:300]}' for duration, statement in slowest)
+    )
+
+
+def metrics_view():
+    expected = f"Bearer {current_app.config['METRICS_TOKEN']}"
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode()):
+        return Response('Unauthorized\n', 401, {'WWW-Authenticate': 'Bearer'}, mimetype='text/plain')
+
+    lines = []
+    for metric in (REQUESTS, LATENCY, SQL_COUNT, SQL_TIME, RESPONSE_SIZE, VIEW_CACHE):
+        lines.extend(metric.render())
+    lines += [
+        '# HELP view_cache_lookups_total cached_view lookups in this process, by result.',
+        '# TYPE view_cache_lookups_total counter',
+        f'view_cache_lookups_total{{result="hit"}} {cache_stats["hits"]}',
+        f'view_cache_lookups_total{{result="miss"}} {cache_stats["misses"]}',
+    ]
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app):
+    """Time every request and serve the collected metrics on /metrics.
+
+    Route names, traffic and SQL timings are not for the public: /metrics
+    is only served with a METRICS_TOKEN configured, to bearers of it.
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    if app.config.get('METRICS_TOKEN'):
+        app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -90,9 +90,17 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # the full-text search tables, triggers and indexes (see search.py) are
+    # maintained by hand-written migrations, so autogenerate must ignore them
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (reflected and name and name.startswith(
+            ('campaign_fts', 'influencer_fts', 'ix_campaign_search', 'ix_influencer_search')))
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
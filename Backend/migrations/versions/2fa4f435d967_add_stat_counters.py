@@ -0,0 +1,29 @@
+"""Add stat counters
+
+Revision ID: 2fa4f435d967
+Revises: 69cf09428440
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2fa4f435d967'
+down_revision = '69cf09428440'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Seeded (and later re-checked) by stats.reconcile_counters
+    op.create_table('stat_counters',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('stat_counters')
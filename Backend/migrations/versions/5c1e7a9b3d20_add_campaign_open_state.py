@@ -0,0 +1,45 @@
+"""Add denormalized open state to campaign
+
+Revision ID: 5c1e7a9b3d20
+Revises: bd94c635ecae
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e7a9b3d20'
+down_revision = 'bd94c635ecae'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('campaign', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('accepted_ad_request_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('is_open', sa.Boolean(), nullable=False, server_default=sa.true()))
+        batch_op.create_index('ix_campaign_is_open_visibility', ['is_open', 'visibility'], unique=False)
+
+    # Backfill from the existing accepted ad requests
+    op.execute(
+        """
+        UPDATE campaign SET
+            accepted_ad_request_id = (
+                SELECT MIN(ad_requests.id) FROM ad_requests
+                WHERE ad_requests.campaign_id = campaign.id AND ad_requests.status = 'Accepted'
+            ),
+            is_open = NOT EXISTS (
+                SELECT 1 FROM ad_requests
+                WHERE ad_requests.campaign_id = campaign.id AND ad_requests.status = 'Accepted'
+            )
+        """
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('campaign', schema=None) as batch_op:
+        batch_op.drop_index('ix_campaign_is_open_visibility')
+        batch_op.drop_column('is_open')
+        batch_op.drop_column('accepted_ad_request_id')
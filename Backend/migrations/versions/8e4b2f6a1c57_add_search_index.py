@@ -0,0 +1,64 @@
+"""Add full-text search index for campaigns and influencers
+
+Revision ID: 8e4b2f6a1c57
+Revises: 5c1e7a9b3d20
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4b2f6a1c57'
+down_revision = '5c1e7a9b3d20'
+branch_labels = None
+depends_on = None
+
+
+# table -> (FTS5 table, indexed columns)
+SEARCH_INDEXES = {
+    'campaign': ('campaign_fts', ['name', 'description', 'goals', 'category']),
+    'influencer': ('influencer_fts', ['expertise', 'category']),
+}
+
+
+def _upgrade_sqlite(table, index, columns):
+    names = ', '.join(columns)
+    new_values = ', '.join(f'new.{c}' for c in columns)
+    assignments = ', '.join(f'{c} = new.{c}' for c in columns)
+
+    op.execute(f"CREATE VIRTUAL TABLE {index} USING fts5({names}, tokenize='unicode61 remove_diacritics 2')")
+    op.execute(f"INSERT INTO {index}(rowid, {names}) SELECT id, {names} FROM {table}")
+
+    # Keep the index in sync with every write, ORM or not
+    op.execute(f"CREATE TRIGGER {index}_ai AFTER INSERT ON {table} BEGIN "
+               f"INSERT INTO {index}(rowid, {names}) VALUES (new.id, {new_values}); END")
+    op.execute(f"CREATE TRIGGER {index}_au AFTER UPDATE OF {names} ON {table} BEGIN "
+               f"UPDATE {index} SET {assignments} WHERE rowid = old.id; END")
+    op.execute(f"CREATE TRIGGER {index}_ad AFTER DELETE ON {table} BEGIN "
+               f"DELETE FROM {index} WHERE rowid = old.id; END")
+
+
+def _upgrade_postgres(table, columns):
+    document = " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+    op.execute(f"CREATE INDEX ix_{table}_search ON {table} USING gin (to_tsvector('simple', {document}))")
+
+
+def upgrade():
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+    for table, (index, columns) in SEARCH_INDEXES.items():
+        if is_postgres:
+            _upgrade_postgres(table, columns)
+        else:
+            _upgrade_sqlite(table, index, columns)
+
+
+def downgrade():
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+    for table, (index, columns) in SEARCH_INDEXES.items():
+        if is_postgres:
+            op.execute(f'DROP INDEX ix_{table}_search')
+            continue
+        for suffix in ('ai', 'au', 'ad'):
+            op.execute(f'DROP TRIGGER {index}_{suffix}')
+        op.execute(f'DROP TABLE {index}')
@@ -0,0 +1,38 @@
+"""Add indexes for hot filter columns
+
+Revision ID: bd94c635ecae
+Revises: 2fa4f435d967
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'bd94c635ecae'
+down_revision = '2fa4f435d967'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_user_role_flagged', 'user', ['role', 'flagged']),
+    ('ix_influencer_category_reach', 'influencer', ['category', 'reach']),
+    ('ix_campaign_sponsor_id_visibility', 'campaign', ['sponsor_id', 'visibility']),
+    ('ix_campaign_visibility_flagged_category_budget', 'campaign', ['visibility', 'flagged', 'category', 'budget']),
+    ('ix_campaign_flagged', 'campaign', ['flagged']),
+    ('ix_ad_requests_campaign_id_status', 'ad_requests', ['campaign_id', 'status']),
+    ('ix_ad_requests_influencer_id_status', 'ad_requests', ['influencer_id', 'status']),
+    ('ix_ad_requests_status_influencer_id', 'ad_requests', ['status', 'influencer_id']),
+    ('ix_ad_requests_created_at', 'ad_requests', ['created_at']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
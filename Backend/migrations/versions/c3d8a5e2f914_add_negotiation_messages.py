@@ -0,0 +1,108 @@
+"""Move negotiation history to negotiation_messages
+
+Revision ID: c3d8a5e2f914
+Revises: 8e4b2f6a1c57
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d8a5e2f914'
+down_revision = '8e4b2f6a1c57'
+branch_labels = None
+depends_on = None
+
+
+SENDERS = ('Influencer', 'Sponsor')
+
+
+def split_history(history):
+    """Split a concatenated '\\nSender: text' history into (sender, body) pairs.
+
+    Lines without a known sender prefix continue the previous message.
+    """
+    messages = []
+    for line in (history or '').split('\n'):
+        sender, sep, body = line.partition(': ')
+        if sep and sender in SENDERS:
+            messages.append([sender, body])
+        elif messages:
+            messages[-1][1] += '\n' + line
+        elif line.strip():
+            messages.append(['Influencer', line])  # Only influencers wrote messages so far
+    return messages
+
+
+def upgrade():
+    op.create_table('negotiation_messages',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('ad_request_id', sa.Integer(), nullable=False),
+    sa.Column('sender', sa.String(), nullable=False),
+    sa.Column('body', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['ad_request_id'], ['ad_requests.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_negotiation_messages_ad_request_id_id', 'negotiation_messages', ['ad_request_id', 'id'], unique=False)
+
+    with op.batch_alter_table('ad_requests', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_message', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('message_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Split each concatenated history into rows and fill in the summary
+    connection = op.get_bind()
+    ad_requests = sa.table('ad_requests', sa.column('id'), sa.column('messages'), sa.column('created_at'),
+                           sa.column('last_message'), sa.column('message_count'))
+    negotiation_messages = sa.table('negotiation_messages', sa.column('ad_request_id'), sa.column('sender'),
+                                    sa.column('body'), sa.column('created_at'))
+
+    histories = connection.execute(
+        sa.select(ad_requests.c.id, ad_requests.c.messages, ad_requests.c.created_at)
+        .where(ad_requests.c.messages.isnot(None))
+        .order_by(ad_requests.c.id)
+    ).all()
+    for ad_request_id, history, created_at in histories:
+        messages = split_history(history)
+        if not messages:
+            continue
+        connection.execute(negotiation_messages.insert(), [
+            {'ad_request_id': ad_request_id, 'sender': sender, 'body': body, 'created_at': created_at}
+            for sender, body in messages
+        ])
+        connection.execute(
+            ad_requests.update().where(ad_requests.c.id == ad_request_id)
+            .values(last_message=messages[-1][1], message_count=len(messages))
+        )
+
+    with op.batch_alter_table('ad_requests', schema=None) as batch_op:
+        batch_op.drop_column('messages')
+
+
+def downgrade():
+    with op.batch_alter_table('ad_requests', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('messages', sa.String(), nullable=True))
+
+    # Concatenate the threads back into the old '\nSender: text' format
+    connection = op.get_bind()
+    ad_requests = sa.table('ad_requests', sa.column('id'), sa.column('messages'))
+    negotiation_messages = sa.table('negotiation_messages', sa.column('id'), sa.column('ad_request_id'),
+                                    sa.column('sender'), sa.column('body'))
+
+    histories = {}
+    for ad_request_id, sender, body in connection.execute(
+        sa.select(negotiation_messages.c.ad_request_id, negotiation_messages.c.sender, negotiation_messages.c.body)
+        .order_by(negotiation_messages.c.ad_request_id, negotiation_messages.c.id)
+    ):
+        histories[ad_request_id] = histories.get(ad_request_id, '') + f'\n{sender}: {body}'
+    for ad_request_id, history in histories.items():
+        connection.execute(ad_requests.update().where(ad_requests.c.id == ad_request_id).values(messages=history))
+
+    with op.batch_alter_table('ad_requests', schema=None) as batch_op:
+        batch_op.drop_column('message_count')
+        batch_op.drop_column('last_message')
+
+    op.drop_index('ix_negotiation_messages_ad_request_id_id', table_name='negotiation_messages')
+    op.drop_table('negotiation_messages')
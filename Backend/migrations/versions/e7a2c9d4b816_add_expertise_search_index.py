@@ -0,0 +1,27 @@
+"""Add expertise-only full-text index for influencers (Postgres)
+
+Revision ID: e7a2c9d4b816
+Revises: c3d8a5e2f914
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2c9d4b816'
+down_revision = 'c3d8a5e2f914'
+branch_labels = None
+depends_on = None
+
+
+# SQLite filters the existing FTS5 table by column instead; nothing to create there
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE INDEX ix_influencer_search_expertise ON influencer "
+                   "USING gin (to_tsvector('simple', coalesce(expertise, '')))")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX ix_influencer_search_expertise')
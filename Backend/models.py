@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import CheckConstraint
+from sqlalchemy import CheckConstraint, true as sa_true
 from db import db
 
 # User Model
@@ -18,6 +18,7 @@ class User(db.Model):
 
     __table_args__ = (
         CheckConstraint("role IN ('Admin', 'Sponsor', 'Influencer')", name='check_role'),
+        db.Index('ix_user_role_flagged', 'role', 'flagged'),
     )
 
     # Relationships
@@ -50,6 +51,10 @@ class Influencer(db.Model):
     expertise = db.Column(db.String) 
     reach = db.Column(db.Integer) 
 
+    __table_args__ = (
+        db.Index('ix_influencer_category_reach', 'category', 'reach'),
+    )
+
     # Relationships
     user = db.relationship('User', back_populates='influencer')  # Linking back to the User
     ad_requests = db.relationship('AdRequest', backref='influencer')
@@ -80,9 +85,16 @@ class Campaign(db.Model):
     sponsor_id = db.Column(db.Integer, db.ForeignKey('sponsor.id'), nullable=False) 
     flagged = db.Column(db.String, default="Active")  # Campaign status (Active/Flagged)
     category = db.Column(db.String) 
+    # Denormalized from ad_requests by campaign_state.py; no FK to avoid a campaign <-> ad_requests cycle
+    accepted_ad_request_id = db.Column(db.Integer)
+    is_open = db.Column(db.Boolean, nullable=False, default=True, server_default=sa_true())
 
     __table_args__ = (
         CheckConstraint("visibility IN ('public', 'private')", name='check_visibility'),
+        db.Index('ix_campaign_is_open_visibility', 'is_open', 'visibility'),
+        db.Index('ix_campaign_sponsor_id_visibility', 'sponsor_id', 'visibility'),
+        db.Index('ix_campaign_visibility_flagged_category_budget', 'visibility', 'flagged', 'category', 'budget'),
+        db.Index('ix_campaign_flagged', 'flagged'),
     )
 
     # Relationships
@@ -107,8 +119,9 @@ class AdRequest(db.Model):
     requirements = db.Column(db.String, nullable=True) 
     payment_amount = db.Column(db.Float, nullable=False)
     
-    # Communication between the sponsor and influencer
-    messages = db.Column(db.String)  
+    # Summary of the negotiation thread (full history in NegotiationMessage)
+    last_message = db.Column(db.String)
+    message_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     status = db.Column(db.String, default='Pending')  # Pending, Accepted, Rejected
     
@@ -123,7 +136,42 @@ class AdRequest(db.Model):
 
     __table_args__ = (
         CheckConstraint("status IN ('Pending', 'Accepted', 'Rejected')", name='check_status'),
+        db.Index('ix_ad_requests_campaign_id_status', 'campaign_id', 'status'),
+        db.Index('ix_ad_requests_influencer_id_status', 'influencer_id', 'status'),
+        db.Index('ix_ad_requests_status_influencer_id', 'status', 'influencer_id'),
+        db.Index('ix_ad_requests_created_at', 'created_at'),
     )
 
+    # Relationships
+    negotiation_messages = db.relationship('NegotiationMessage', backref='ad_request',
+                                           cascade='all, delete-orphan', order_by='NegotiationMessage.id')
+
     def __repr__(self):
         return f'<AdRequest {self.id} - {self.status}>'
+
+
+# Append-only negotiation thread of an ad request
+class NegotiationMessage(db.Model):
+    __tablename__ = 'negotiation_messages'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    ad_request_id = db.Column(db.Integer, db.ForeignKey('ad_requests.id'), nullable=False)
+    sender = db.Column(db.String, nullable=False)  # 'Influencer', 'Sponsor'
+    body = db.Column(db.String, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_negotiation_messages_ad_request_id_id', 'ad_request_id', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<NegotiationMessage {self.id} - {self.sender}>'
+
+
+# Incrementally maintained dashboard counters (see stats.py)
+class StatCounter(db.Model):
+    __tablename__ = 'stat_counters'
+    name = db.Column(db.String, primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<StatCounter {self.name}={self.value}>'
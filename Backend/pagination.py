@@ -0,0 +1,153 @@
+# pagination.py
+import base64
+import json
+from datetime import datetime
+
+from flask import Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import DateTime, tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    """Turn the keyset values of the last row into an opaque cursor."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, keys):
+    """Reverse encode_cursor, restoring datetimes from the key column types."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise CursorError('Invalid cursor.')
+
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise CursorError('Invalid cursor.')
+
+    decoded = []
+    for key, value in zip(keys, values):
+        if value is not None and isinstance(key.type, DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise CursorError('Invalid cursor.')
+        decoded.append(value)
+    return decoded
+
+
+def page_args():
+    """Read the `limit`/`after` query parameters, clamping the page size.
+
+    Pagination is opt-in: without either parameter the limit is None and
+    the whole list is returned, as clients that do not follow
+    X-Next-Cursor expect.
+    """
+    after = request.args.get('after')
+    if 'limit' not in request.args and not after:
+        return None, None
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return limit, after
+
+
+def wants_ndjson():
+    return (request.args.get('format') == 'ndjson'
+            or request.accept_mimetypes.best == 'application/x-ndjson')
+
+
+def _after_cursor(query, keys, after, descending):
+    bound = tuple_(*decode_cursor(after, keys))
+    if descending:
+        return query.filter(tuple_(*keys) < bound)
+    return query.filter(tuple_(*keys) > bound)
+
+
+def _ordered(query, keys, descending):
+    return query.order_by(*[k.desc() if descending else k.asc() for k in keys])
+
+
+def paginate(query, keys, key, descending=False):
+    """Fetch one keyset page of `query`.
+
+    `keys` are the columns the page is ordered by (the last one must be
+    unique, usually the primary key) and `key(row)` returns their values for
+    a fetched row. Returns the rows and the cursor for the next page, or
+    None when this is the last one (or pagination was not requested).
+    """
+    limit, after = page_args()
+
+    if after:
+        query = _after_cursor(query, keys, after, descending)
+
+    if limit is None:
+        return _ordered(query, keys, descending).all(), None
+
+    rows = _ordered(query, keys, descending).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(key(rows[-1]))
+    return rows, next_cursor
+
+
+def wants_columnar():
+    return request.args.get('format') == 'columnar'
+
+
+def columnar(items):
+    """Turn a list of same-shaped dicts into {columns: [...], rows: [[...], ...]}."""
+    columns = list(items[0]) if items else []
+    return {'columns': columns, 'rows': [[item[name] for name in columns] for item in items]}
+
+
+def page_response(items, next_cursor):
+    """JSON list response carrying the next-page cursor in its headers.
+
+    With `format=columnar` the items are sent as one column list plus a
+    row array each, instead of repeating every key in every object.
+    """
+    response = jsonify(columnar(items) if wants_columnar() else items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+def stream_ndjson(query, keys, serialize, descending=False):
+    """Stream `query` as newline-delimited JSON without materializing it.
+
+    Rows are pulled from the database in batches of STREAM_BATCH_SIZE. The
+    `after` cursor is honoured; the page size only applies when `limit` is
+    passed explicitly.
+    """
+    after = request.args.get('after')
+    if after:
+        query = _after_cursor(query, keys, after, descending)
+
+    query = _ordered(query, keys, descending)
+    if 'limit' in request.args:
+        query = query.limit(page_args()[0])
+
+    def generate():
+        for row in query.yield_per(STREAM_BATCH_SIZE):
+            yield current_app.json.dumps(serialize(row)) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def list_response(query, keys, key, serialize, descending=False):
+    """Serve a list endpoint as a keyset page, or as NDJSON when requested."""
+    if wants_ndjson():
+        return stream_ndjson(query, keys, serialize, descending)
+
+    rows, next_cursor = paginate(query, keys, key, descending)
+    return page_response([serialize(row) for row in rows], next_cursor)
@@ -0,0 +1,104 @@
+# passwords.py
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Jobs allowed in flight (running or queued) per worker process
+QUEUE_PER_WORKER = 4
+
+
+class HashingBusy(RuntimeError):
+    """Every hashing slot stayed taken for PASSWORD_HASH_TIMEOUT seconds."""
+
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    """Process pool shared by this worker, started on first use (after any fork)."""
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            workers = current_app.config['PASSWORD_HASH_WORKERS']
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _slots = threading.BoundedSemaphore(workers * QUEUE_PER_WORKER)
+            atexit.register(_pool.shutdown, wait=False)
+    return _pool, _slots
+
+
+def _run(fn, *args):
+    """Run a CPU-bound hash off the request thread.
+
+    The calling thread only waits on the result (without the GIL), so other
+    requests served by this process keep running. With
+    PASSWORD_HASH_WORKERS = 0 the hash runs inline.
+    """
+    if not current_app.config.get('PASSWORD_HASH_WORKERS'):
+        return fn(*args)
+
+    pool, slots = _executor()
+    timeout = current_app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+    if not slots.acquire(timeout=timeout):
+        raise HashingBusy('Too many password checks in progress.')
+    try:
+        return pool.submit(fn, *args).result()
+    finally:
+        slots.release()
+
+
+def hash_password(password):
+    """Hash `password` with the configured method (e.g. 'pbkdf2:sha256:600000', 'scrypt:32768:8:1')."""
+    return _run(generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def verify_password(stored_hash, password):
+    return _run(check_password_hash, stored_hash, password)
+
+
+def _method_parameters(method):
+    """(algorithm, cost parameters) of a werkzeug method string, with werkzeug's defaults filled in."""
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        return (name, args[0] if args else 'sha256'), (int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS,)
+    if name == 'scrypt':
+        return (name,), tuple(int(arg) for arg in args) + (2 ** 15, 8, 1)[len(args):]
+    return tuple(method.split(':')), ()
+
+
+def needs_rehash(stored_hash):
+    """Whether `stored_hash` uses another algorithm than the configured method, or a lower cost.
+
+    Hashes made with a higher cost than configured are kept: lowering the
+    setting must never weaken stored hashes.
+    """
+    stored, stored_cost = _method_parameters(stored_hash.split('$', 1)[0])
+    configured, configured_cost = _method_parameters(current_app.config['PASSWORD_HASH_METHOD'])
+    if stored != configured:
+        return True
+    return any(have < want for have, want in zip(stored_cost, configured_cost))
+
+
+def hash_passwords(passwords):
+    """Hash many passwords at once, spread over the pool (bulk imports).
+
+    The batch is split into one chunk per worker instead of one job per
+    password, so it only holds a single hashing slot while it runs.
+    """
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS')
+    if not workers or len(passwords) < 2:
+        return [generate_password_hash(password, method) for password in passwords]
+
+    pool, slots = _executor()
+    if not slots.acquire(timeout=current_app.config.get('PASSWORD_HASH_TIMEOUT', 10)):
+        raise HashingBusy('Too many password checks in progress.')
+    try:
+        chunksize = -(-len(passwords) // workers)
+        return list(pool.map(generate_password_hash, passwords, [method] * len(passwords), chunksize=chunksize))
+    finally:
+        slots.release()
@@ -0,0 +1,119 @@
+# read_models.py
+from sqlalchemy import case, func
+from sqlalchemy.orm import aliased
+
+from db import db
+from models import User, Influencer, Campaign, AdRequest, NegotiationMessage
+
+# The same User table plays two roles in an ad-request row
+InfluencerUser = aliased(User, name='influencer_user')
+SponsorUser = aliased(User, name='sponsor_user')
+
+# Serialized field name -> column it is read from
+AD_REQUEST_FIELDS = {
+    'id': AdRequest.id,
+    'campaign_id': AdRequest.campaign_id,
+    'campaign_name': Campaign.name,
+    'requirements': AdRequest.requirements,
+    'payment_amount': AdRequest.payment_amount,
+    'negotiated_payment_amount': AdRequest.negotiated_payment_amount,
+    'is_negotiated': AdRequest.is_negotiated,
+    'status': AdRequest.status,
+    'last_message': AdRequest.last_message,
+    'message_count': AdRequest.message_count,
+    'created_at': AdRequest.created_at,
+    'influencer_name': InfluencerUser.username,
+    'sponsor_name': SponsorUser.username,
+    'category': Influencer.category,
+    'reach': Influencer.reach,
+    'is_public': Campaign.visibility == 'public',
+}
+
+# Always selected so list endpoints can build keyset cursors
+KEY_FIELDS = ('id', 'created_at')
+
+
+def ad_request_query(fields):
+    """Query projecting `fields` of each ad request as plain row tuples.
+
+    Campaign, influencer profile, influencer user and sponsor user are
+    joined up front, so rendering a row never triggers a lazy load.
+    """
+    names = list(fields) + [name for name in KEY_FIELDS if name not in fields]
+    return (
+        db.session.query(*[AD_REQUEST_FIELDS[name].label(name) for name in names])
+        .select_from(AdRequest)
+        .join(Campaign, Campaign.id == AdRequest.campaign_id)
+        .join(Influencer, Influencer.id == AdRequest.influencer_id)
+        .join(InfluencerUser, InfluencerUser.id == AdRequest.influencer_id)
+        .join(SponsorUser, SponsorUser.id == Campaign.sponsor_id)
+    )
+
+
+def ad_request_serializer(fields):
+    """Build a row -> dict function emitting exactly `fields`."""
+    fields = list(fields)
+    return lambda row: {name: getattr(row, name) for name in fields}
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def campaign_summary_query(sponsor_id):
+    """One row per active campaign of the sponsor with its ad-request totals.
+
+    A single grouped LEFT JOIN, read from the (campaign_id, status) index,
+    instead of shipping every ad request to the client to aggregate.
+    """
+    accepted = AdRequest.status == 'Accepted'
+    spent = func.coalesce(func.sum(case(
+        (accepted, func.coalesce(AdRequest.negotiated_payment_amount, AdRequest.payment_amount)), else_=0
+    )), 0)
+    return (
+        db.session.query(
+            Campaign.id, Campaign.name, Campaign.budget, Campaign.visibility, Campaign.is_open,
+            func.count(AdRequest.id).label('total_requests'),
+            _count_if(AdRequest.status == 'Pending').label('pending'),
+            _count_if(accepted).label('accepted'),
+            _count_if(AdRequest.status == 'Rejected').label('rejected'),
+            _count_if((AdRequest.status == 'Pending') & AdRequest.is_negotiated).label('negotiating'),
+            spent.label('spent'),
+        )
+        .outerjoin(AdRequest, AdRequest.campaign_id == Campaign.id)
+        .filter(Campaign.sponsor_id == sponsor_id, Campaign.flagged == 'Active')
+        .group_by(Campaign.id)
+        .order_by(Campaign.id)
+    )
+
+
+def serialize_campaign_summary(row):
+    return {
+        'id': row.id,
+        'name': row.name,
+        'visibility': row.visibility,
+        'is_open': row.is_open,
+        'budget': row.budget,
+        'spent': row.spent,
+        'remaining_budget': row.budget - row.spent if row.budget is not None else None,
+        'requests': {
+            'total': row.total_requests,
+            'pending': row.pending,
+            'accepted': row.accepted,
+            'rejected': row.rejected,
+            'negotiating': row.negotiating,
+        },
+    }
+
+
+def negotiation_thread_query(ad_request_id):
+    """Messages of one ad request's negotiation, served from the (ad_request_id, id) index."""
+    return (
+        db.session.query(NegotiationMessage.id, NegotiationMessage.sender,
+                         NegotiationMessage.body, NegotiationMessage.created_at)
+        .filter(NegotiationMessage.ad_request_id == ad_request_id)
+    )
+
+
+def serialize_message(row):
+    return {'id': row.id, 'sender': row.sender, 'body': row.body, 'created_at': row.created_at}
@@ -0,0 +1,236 @@
+# recommendations.py
+import re
+
+import numpy as np
+from sqlalchemy import case, func
+
+from cache import cache
+from db import db
+from models import User, Influencer, Campaign, AdRequest
+
+# Matches kept per campaign
+TOP_K = 20
+# Campaigns scored per matrix operation: each score matrix is CAMPAIGN_CHUNK x influencers
+# float32, about 25 MB at 100k influencers
+CAMPAIGN_CHUNK = 64
+# Precomputed lists outlive the hourly job with some margin
+RECOMMENDATION_TIMEOUT = 2 * 60 * 60
+# One rescoring task per campaign is queued in this window, however many views miss
+RESCORE_QUEUE_TIMEOUT = 5 * 60
+
+WEIGHTS = {'category': 0.4, 'expertise': 0.3, 'fit': 0.2, 'acceptance': 0.1}
+
+TOKEN = re.compile(r'\w{3,}')
+
+
+def _recommendation_key(campaign_id):
+    return f'recommendations:{campaign_id}'
+
+
+def _stale_key(campaign_id):
+    return f'recommendations:{campaign_id}:stale'
+
+
+def _queued_key(campaign_id):
+    return f'recommendations:{campaign_id}:queued'
+
+
+def _tokens(*texts):
+    return set(TOKEN.findall(' '.join(text for text in texts if text).lower()))
+
+
+def load_influencers():
+    """Feature arrays for every active influencer, plus the rows they came from.
+
+    Expertise is kept sparse, as (token id, influencer index) pairs sorted
+    by token, so memory grows with the number of tokens written rather than
+    influencers x vocabulary.
+    """
+    history = (
+        db.session.query(
+            AdRequest.influencer_id,
+            func.sum(case((AdRequest.status == 'Accepted', 1), else_=0)).label('accepted'),
+            func.sum(case((AdRequest.status.in_(['Accepted', 'Rejected']), 1), else_=0)).label('decided'),
+        )
+        .group_by(AdRequest.influencer_id)
+        .subquery()
+    )
+    rows = (
+        db.session.query(
+            Influencer.id, User.username, Influencer.category, Influencer.expertise, Influencer.reach,
+            func.coalesce(history.c.accepted, 0), func.coalesce(history.c.decided, 0)
+        )
+        .join(User, User.id == Influencer.id)
+        .outerjoin(history, history.c.influencer_id == Influencer.id)
+        .filter(func.coalesce(User.flagged, 'Active') != 'Flagged')
+        .order_by(Influencer.id)
+        .all()
+    )
+
+    vocabulary = {}
+    pairs = [(vocabulary.setdefault(token, len(vocabulary)), i)
+             for i, row in enumerate(rows) for token in _tokens(row.expertise)]
+    pairs.sort()
+    owners = np.array([i for _, i in pairs], dtype=np.int32)
+
+    accepted = np.array([row[5] for row in rows], dtype=np.float64)
+    decided = np.array([row[6] for row in rows], dtype=np.float64)
+    return {
+        'rows': rows,
+        'vocabulary': vocabulary,
+        'category': [row.category for row in rows],
+        'expertise_tokens': np.array([token for token, _ in pairs], dtype=np.int32),
+        'expertise_owners': owners,
+        'expertise_norm': np.sqrt(np.bincount(owners, minlength=len(rows))).astype(np.float32),
+        'reach': np.array([row.reach or 0 for row in rows], dtype=np.float64),
+        # Smoothed so influencers without history start at 0.5
+        'acceptance': ((accepted + 1) / (decided + 2)).astype(np.float32),
+    }
+
+
+def _expertise_overlap(chunk, influencers):
+    """Shared expertise tokens of each campaign in `chunk` with each influencer, and the campaigns' token counts."""
+    vocabulary, tokens, owners = influencers['vocabulary'], influencers['expertise_tokens'], influencers['expertise_owners']
+    overlap = np.zeros((len(chunk), len(influencers['rows'])), dtype=np.float32)
+    terms = np.zeros(len(chunk), dtype=np.float32)
+    for i, c in enumerate(chunk):
+        ids = np.array(sorted({vocabulary[token] for token in _tokens(c.name, c.description, c.goals, c.category)
+                               if token in vocabulary}), dtype=np.int32)
+        terms[i] = len(ids)
+        if len(ids):
+            starts, ends = np.searchsorted(tokens, ids, side='left'), np.searchsorted(tokens, ids, side='right')
+            matched = np.concatenate([owners[start:end] for start, end in zip(starts, ends)])
+            overlap[i] = np.bincount(matched, minlength=overlap.shape[1])
+    return overlap, terms
+
+
+def _percentile(sorted_values, values):
+    """Position of each value within `sorted_values`, scaled to [0, 1]."""
+    if len(sorted_values) < 2:
+        return np.zeros(len(values))
+    return np.searchsorted(sorted_values, values, side='left') / (len(sorted_values) - 1)
+
+
+def score_campaigns(campaigns, influencers, budgets):
+    """Yield (campaign_id, [(influencer index, score), ...]) with the TOP_K matches of each campaign.
+
+    `campaigns` are rows of (id, name, description, goals, category, budget)
+    and `budgets` every campaign budget, so budget percentiles do not depend
+    on which campaigns are being scored.
+    """
+    if not influencers['rows']:
+        for campaign in campaigns:
+            yield campaign.id, []
+        return
+
+    codes = {}
+    influencer_category = np.array([codes.setdefault(c, len(codes)) if c else -1
+                                    for c in influencers['category']])
+    reach_rank = _percentile(np.sort(influencers['reach']), influencers['reach'])
+    budgets = np.sort(np.asarray(budgets, dtype=np.float64))
+    k = min(TOP_K, len(influencers['rows']))
+
+    for start in range(0, len(campaigns), CAMPAIGN_CHUNK):
+        chunk = campaigns[start:start + CAMPAIGN_CHUNK]
+
+        # Category match: campaigns x influencers boolean matrix
+        campaign_category = np.array([codes.get(c.category, -2) if c.category else -2 for c in chunk])
+        category = (campaign_category[:, None] == influencer_category[None, :]).astype(np.float32)
+
+        # Expertise overlap: cosine similarity of binary token vectors
+        overlap, terms = _expertise_overlap(chunk, influencers)
+        norms = np.sqrt(terms)[:, None] * influencers['expertise_norm'][None, :]
+        expertise = np.divide(overlap, norms, out=np.zeros_like(overlap), where=norms > 0)
+
+        # Reach vs budget fit: bigger budgets pair with bigger audiences
+        budget_rank = _percentile(budgets, np.array([c.budget or 0 for c in chunk], dtype=np.float64))
+        fit = (1 - np.abs(budget_rank[:, None] - reach_rank[None, :])).astype(np.float32)
+
+        scores = (WEIGHTS['category'] * category
+                  + WEIGHTS['expertise'] * expertise
+                  + WEIGHTS['fit'] * fit
+                  + WEIGHTS['acceptance'] * influencers['acceptance'][None, :])
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for i, c in enumerate(chunk):
+            best = top[i][np.argsort(-scores[i, top[i]])]
+            yield c.id, [(int(j), float(scores[i, j])) for j in best]
+
+
+def _payload(influencers, matches):
+    rows = influencers['rows']
+    return [
+        {
+            'id': rows[j].id,
+            'username': rows[j].username,
+            'category': rows[j].category,
+            'expertise': rows[j].expertise,
+            'reach': rows[j].reach,
+            'score': round(score, 4),
+        }
+        for j, score in matches
+    ]
+
+
+def _campaign_rows(*criteria):
+    return (
+        db.session.query(Campaign.id, Campaign.name, Campaign.description, Campaign.goals,
+                         Campaign.category, Campaign.budget)
+        .filter(Campaign.flagged == 'Active', *criteria)
+        .order_by(Campaign.id)
+        .all()
+    )
+
+
+def precompute_recommendations():
+    """Score every active campaign against every influencer and cache the top matches."""
+    influencers = load_influencers()
+    campaigns = _campaign_rows()
+    budgets = [c.budget or 0 for c in campaigns]
+
+    batch = {}
+    for campaign_id, matches in score_campaigns(campaigns, influencers, budgets):
+        batch[_recommendation_key(campaign_id)] = _payload(influencers, matches)
+        if len(batch) >= CAMPAIGN_CHUNK:
+            _store(batch)
+            batch = {}
+    if batch:
+        _store(batch)
+    return len(campaigns)
+
+
+def _store(batch):
+    cache.set_many(batch, timeout=RECOMMENDATION_TIMEOUT)
+    cache.delete_many(*[f'{key}:stale' for key in batch])
+
+
+def score_campaign(campaign_id):
+    """Score one campaign the hourly job has not covered yet (new or edited) and cache its matches."""
+    campaigns = _campaign_rows(Campaign.id == campaign_id)
+    budgets = [budget or 0 for (budget,) in db.session.query(Campaign.budget).filter(Campaign.flagged == 'Active')]
+    influencers = load_influencers()
+    recommended = []
+    for _, matches in score_campaigns(campaigns, influencers, budgets):
+        recommended = _payload(influencers, matches)
+    _store({_recommendation_key(campaign_id): recommended})
+    cache.delete(_queued_key(campaign_id))
+    return recommended
+
+
+def forget_recommendations(campaign_id):
+    """Mark a campaign's matches for rescoring; they are still served until then."""
+    cache.set(_stale_key(campaign_id), True, timeout=RECOMMENDATION_TIMEOUT)
+
+
+def recommendations_for(campaign_id):
+    """Cached top matches for one campaign, and whether it should be queued for rescoring.
+
+    Never scores in the request: a campaign not scored yet has no matches,
+    an edited one keeps its previous matches until rescored. Only the first
+    caller in RESCORE_QUEUE_TIMEOUT is told to queue.
+    """
+    recommended, stale = cache.get_many(_recommendation_key(campaign_id), _stale_key(campaign_id))
+    needs_rescore = recommended is None or bool(stale)
+    if needs_rescore:
+        needs_rescore = cache.add(_queued_key(campaign_id), True, timeout=RESCORE_QUEUE_TIMEOUT)
+    return recommended or [], needs_rescore
@@ -0,0 +1,121 @@
+# routing.py
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+
+from cache import cache
+
+# Requests that may read from a replica; everything else uses the primary
+READ_METHODS = ('GET', 'HEAD')
+
+# Set inside `read_replica()` blocks (Celery reporting tasks)
+_replica_scope = ContextVar('replica_scope', default=False)
+# Set inside `use_primary()` blocks; wins over everything else
+_primary_scope = ContextVar('primary_scope', default=False)
+
+
+def _pin_key(user_id):
+    return f'primary-pin:{user_id}'
+
+
+def _caller_id():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:  # No token verified for this request
+        return None
+
+
+def pin_to_primary(response):
+    """After a successful write, route the caller's reads to the primary for a while.
+
+    Gives read-your-writes consistency while replicas catch up. Registered
+    as an `after_request` hook by create_app.
+    """
+    if request.method not in READ_METHODS and response.status_code < 400:
+        user_id = _caller_id()
+        timeout = current_app.config.get('REPLICA_STICKY_SECONDS', 0)
+        if user_id is not None and timeout and current_app.config.get('REPLICA_BINDS'):
+            cache.set(_pin_key(user_id), 1, timeout=timeout)
+    return response
+
+
+def _pinned_to_primary():
+    if '_primary_pinned' not in g:
+        user_id = _caller_id()
+        if user_id is None:
+            return False
+        g._primary_pinned = cache.get(_pin_key(user_id)) is not None
+    return g._primary_pinned
+
+
+def _use_replica():
+    if _primary_scope.get():
+        return False
+    if _replica_scope.get():
+        return True
+    return (has_request_context() and request.method in READ_METHODS
+            and not _pinned_to_primary())
+
+
+def _replica_engine(engines):
+    """The replica this request/task reads from, chosen once and kept for consistency."""
+    if '_replica_bind' not in g:
+        binds = current_app.config.get('REPLICA_BINDS') or []
+        g._replica_bind = random.choice(binds) if binds else None
+    return engines.get(g._replica_bind) if g._replica_bind else None
+
+
+class RoutingSession(Session):
+    """Session that sends plain SELECTs to a read replica when it is safe to.
+
+    Writes, flushes, raw SQL and anything outside a GET request or a
+    `read_replica()` block keep using the primary (default bind).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and clause is not None and clause.is_select
+                and has_app_context() and _use_replica()):
+            engine = _replica_engine(self._db.engines)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def read_replica():
+    """Route the SELECTs issued inside the block to a replica (for read-only reporting jobs)."""
+    token = _replica_scope.set(True)
+    try:
+        yield
+    finally:
+        _replica_scope.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Route the SELECTs issued inside the block to the primary, even in a GET request.
+
+    For reads whose results outlive the request (view cache entries,
+    identity snapshots) or feed a write (counter reconciliation): a
+    lagging replica would otherwise have its stale rows cached under
+    the tag versions the triggering write just rotated.
+    """
+    token = _primary_scope.set(True)
+    try:
+        yield
+    finally:
+        _primary_scope.reset(token)
+
+
+def reads_from_replica(f):
+    """Run `f` inside `read_replica()`. Apply below `@celery.task`."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with read_replica():
+            return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,120 @@
+# search.py
+import re
+
+from sqlalchemy import column, func, literal_column, select, table, text
+
+from db import db
+
+# Each word of a query must match (as a prefix); extra words are ignored
+SEARCH_TERM = re.compile(r'\w+')
+MAX_SEARCH_TERMS = 8
+
+# Searchable table -> (SQLite FTS5 table, indexed columns)
+SEARCH_INDEXES = {
+    'campaign': ('campaign_fts', ['name', 'description', 'goals', 'category']),
+    'influencer': ('influencer_fts', ['expertise', 'category']),
+}
+# Columns also searched on their own (e.g. the expertise filter); Postgres needs an index each
+COLUMN_SEARCHES = {
+    'influencer': ['expertise'],
+}
+
+
+def search_terms(q):
+    return SEARCH_TERM.findall(q or '')[:MAX_SEARCH_TERMS]
+
+
+def _is_postgres(bind=None):
+    return (bind or db.engine).dialect.name == 'postgresql'
+
+
+def _pg_document(model, columns):
+    """The tsvector a Postgres row is searched by.
+
+    Rendered with inline literals so it matches the GIN expression index.
+    """
+    empty, space = literal_column("''"), literal_column("' '")
+    document = func.coalesce(getattr(model, columns[0]), empty)
+    for name in columns[1:]:
+        document = document.op('||')(space).op('||')(func.coalesce(getattr(model, name), empty))
+    return func.to_tsvector(literal_column("'simple'"), document)
+
+
+def match_subquery(model, terms, column_name=None):
+    """Subquery of (id, rank) for the `model` rows matching every term as a prefix.
+
+    With `column_name` (one of COLUMN_SEARCHES) only that column is searched.
+    A lower rank is a better match, on both backends: FTS5 bm25() on SQLite,
+    negated ts_rank() on Postgres.
+    """
+    index, columns = SEARCH_INDEXES[model.__tablename__]
+    if column_name is not None:
+        if column_name not in COLUMN_SEARCHES.get(model.__tablename__, []):
+            raise ValueError(f'{model.__tablename__}.{column_name} has no search index')
+        columns = [column_name]
+
+    if _is_postgres():
+        document = _pg_document(model, columns)
+        query = func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+        return (
+            select(model.id.label('id'), (-func.ts_rank(document, query)).label('rank'))
+            .where(document.op('@@')(query))
+            .subquery()
+        )
+
+    fts = table(index, column('rowid'), column('rank'))
+    match = ' '.join(f'"{term}"*' for term in terms)
+    if column_name is not None:
+        match = f'{column_name} : ({match})'  # FTS5 column filter
+    return (
+        select(fts.c.rowid.label('id'), fts.c.rank.label('rank'))
+        .where(literal_column(index).op('MATCH')(match))
+        .subquery()
+    )
+
+
+def _sqlite_ddl(name, columns):
+    index, _ = SEARCH_INDEXES[name]
+    names = ', '.join(columns)
+    new_values = ', '.join(f'new.{c}' for c in columns)
+    assignments = ', '.join(f'{c} = new.{c}' for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5({names}, tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON {name} BEGIN "
+        f"INSERT INTO {index}(rowid, {names}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF {names} ON {name} BEGIN "
+        f"UPDATE {index} SET {assignments} WHERE rowid = old.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON {name} BEGIN "
+        f"DELETE FROM {index} WHERE rowid = old.id; END",
+    ]
+
+
+def _postgres_ddl(name, columns):
+    document = " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+    return [f"CREATE INDEX IF NOT EXISTS ix_{name}_search ON {name} "
+            f"USING gin (to_tsvector('simple', {document}))"] + [
+        f"CREATE INDEX IF NOT EXISTS ix_{name}_search_{c} ON {name} "
+        f"USING gin (to_tsvector('simple', coalesce({c}, '')))"
+        for c in COLUMN_SEARCHES.get(name, [])
+    ]
+
+
+def create_search_index(connection):
+    """Create the search index and its sync triggers if missing (for `db.create_all()` setups).
+
+    The Alembic migration creates the same objects on migrated databases.
+    """
+    for name, (_, columns) in SEARCH_INDEXES.items():
+        ddl = _postgres_ddl if _is_postgres(connection) else _sqlite_ddl
+        for statement in ddl(name, columns):
+            connection.execute(text(statement))
+
+
+def rebuild_search_index(connection):
+    """Refill the SQLite FTS tables from their source tables (Postgres indexes need no rebuild)."""
+    if _is_postgres(connection):
+        return
+    for name, (index, columns) in SEARCH_INDEXES.items():
+        names = ', '.join(columns)
+        connection.execute(text(f'DELETE FROM {index}'))
+        connection.execute(text(f'INSERT INTO {index}(rowid, {names}) SELECT id, {names} FROM {name}'))
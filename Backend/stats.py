@@ -0,0 +1,176 @@
+# stats.py
+from flask import current_app, has_app_context
+from sqlalchemy import case, event, func, inspect, update
+from sqlalchemy.orm import Session
+
+from db import db
+from models import User, Campaign, AdRequest, StatCounter
+from routing import use_primary
+
+COUNTER_NAMES = [
+    'total_sponsors', 'flagged_sponsors',
+    'total_influencers', 'flagged_influencers',
+    'total_campaigns', 'public_campaigns', 'private_campaigns', 'flagged_campaigns',
+    'total_ad_requests', 'pending_ad_requests', 'accepted_ad_requests', 'rejected_ad_requests',
+]
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def compute_stats():
+    """Compute every dashboard statistic from scratch, one grouped query per table."""
+    users = db.session.query(
+        _count_if(User.role == 'Sponsor'),
+        _count_if((User.role == 'Sponsor') & (User.flagged == 'Flagged')),
+        _count_if(User.role == 'Influencer'),
+        _count_if((User.role == 'Influencer') & (User.flagged == 'Flagged')),
+    ).one()
+
+    campaigns = db.session.query(
+        func.count(Campaign.id),
+        _count_if(Campaign.visibility == 'public'),
+        _count_if(Campaign.visibility == 'private'),
+        _count_if(Campaign.flagged == 'Flagged'),
+    ).one()
+
+    ad_requests = db.session.query(
+        func.count(AdRequest.id),
+        _count_if(AdRequest.status == 'Pending'),
+        _count_if(AdRequest.status == 'Accepted'),
+        _count_if(AdRequest.status == 'Rejected'),
+    ).one()
+
+    return dict(zip(COUNTER_NAMES, [int(value) for value in (*users, *campaigns, *ad_requests)]))
+
+
+def read_counters():
+    """The incrementally maintained counters, or None if they were never seeded."""
+    counters = dict(db.session.query(StatCounter.name, StatCounter.value).all())
+    if any(name not in counters for name in COUNTER_NAMES):
+        return None
+    return {name: counters[name] for name in COUNTER_NAMES}
+
+
+def counters_enabled():
+    return has_app_context() and current_app.config.get('STATS_COUNTERS_ENABLED', False)
+
+
+def dashboard_stats():
+    """Dashboard statistics, from the counters table when it is enabled."""
+    if not counters_enabled():
+        return compute_stats()
+
+    counters = read_counters()
+    if counters is None:
+        counters = reconcile_counters()['stats']
+    return counters
+
+
+def reconcile_counters():
+    """Recompute the counters from scratch, correct them and report the drift.
+
+    Reads from the primary with the counter rows locked (FOR UPDATE; SQLite
+    already serializes writers), and applies each correction as a delta
+    rather than overwriting, so an increment committed between the read and
+    the write is kept.
+    """
+    with use_primary():
+        stored = dict(db.session.query(StatCounter.name, StatCounter.value).with_for_update().all())
+        stats = compute_stats()
+
+    drift = {}
+    for name, value in stats.items():
+        if name not in stored:
+            db.session.add(StatCounter(name=name, value=value))
+        elif stored[name] != value:
+            drift[name] = value - stored[name]
+            db.session.execute(
+                update(StatCounter).where(StatCounter.name == name).values(value=StatCounter.value + drift[name])
+            )
+    db.session.commit()
+
+    return {'stats': stats, 'drift': drift}
+
+
+def adjust_counters(session, deltas):
+    """Apply counter deltas in the caller's transaction (for writes that bypass the ORM unit of work)."""
+    for name, delta in deltas.items():
+        if delta:
+            session.execute(
+                update(StatCounter).where(StatCounter.name == name).values(value=StatCounter.value + delta)
+            )
+
+
+# Which counters a row contributes to, given its column values
+def _user_counters(values):
+    role = values['role']
+    if role not in ('Sponsor', 'Influencer'):
+        return []
+    prefix = role.lower() + 's'
+    names = [f'total_{prefix}']
+    if values['flagged'] == 'Flagged':
+        names.append(f'flagged_{prefix}')
+    return names
+
+
+def _campaign_counters(values):
+    names = ['total_campaigns']
+    if values['visibility'] in ('public', 'private'):
+        names.append(f"{values['visibility']}_campaigns")
+    if values['flagged'] == 'Flagged':
+        names.append('flagged_campaigns')
+    return names
+
+
+def _ad_request_counters(values):
+    status = values['status'] or 'Pending'  # column default
+    return ['total_ad_requests', f'{status.lower()}_ad_requests']
+
+
+TRACKED = {
+    User: (('role', 'flagged'), _user_counters),
+    Campaign: (('visibility', 'flagged'), _campaign_counters),
+    AdRequest: (('status',), _ad_request_counters),
+}
+
+
+def _values(obj, columns, old=False):
+    state = inspect(obj)
+    values = {}
+    for column in columns:
+        if old:
+            history = state.attrs[column].load_history()
+            if history.deleted:
+                values[column] = history.deleted[0]
+                continue
+        values[column] = getattr(obj, column)
+    return values
+
+
+def _add(deltas, names, sign):
+    for name in names:
+        deltas[name] = deltas.get(name, 0) + sign
+
+
+@event.listens_for(Session, 'before_flush')
+def maintain_counters(session, flush_context, instances):
+    if not counters_enabled():
+        return
+
+    deltas = {}
+    for obj in session.new:
+        if type(obj) in TRACKED:
+            columns, counters = TRACKED[type(obj)]
+            _add(deltas, counters(_values(obj, columns)), 1)
+    for obj in session.deleted:
+        if type(obj) in TRACKED:
+            columns, counters = TRACKED[type(obj)]
+            _add(deltas, counters(_values(obj, columns, old=True)), -1)
+    for obj in session.dirty:
+        if type(obj) in TRACKED and session.is_modified(obj):
+            columns, counters = TRACKED[type(obj)]
+            _add(deltas, counters(_values(obj, columns, old=True)), -1)
+            _add(deltas, counters(_values(obj, columns)), 1)
+    adjust_counters(session, deltas)
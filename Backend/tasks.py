@@ -2,13 +2,17 @@
 from celery import Celery
 from celery.schedules import crontab
 from datetime import datetime, timedelta
-import csv
-import io
-from models import Campaign, Influencer, AdRequest, User, Sponsor
+from models import Campaign, AdRequest, User, Sponsor
 from db import db
+from sqlalchemy import and_, case, func
+from itertools import groupby
+# Already loaded by db (RoutingSession); the decorator is needed at definition time
+from routing import reads_from_replica
 
-from app import application, mail
+from app import create_worker_app
+from mail import mail
 
+from flask import current_app, has_app_context
 from flask_mail import Message
 
 # Initialize Celery
@@ -29,130 +33,210 @@ celery.conf.update(
             'task': 'tasks.generate_monthly_reports',
             'schedule': 60.0,
             #'schedule': crontab(0, 0, day_of_month='1')  # 1st of every month
+        },
+        'reconcile-stat-counters': {
+            'task': 'tasks.reconcile_stat_counters',
+            'schedule': crontab(hour=3, minute=0)  # 3 AM daily
+        },
+        'check-campaign-open-state': {
+            'task': 'tasks.check_campaign_open_state',
+            'schedule': crontab(hour=3, minute=30)  # 3:30 AM daily
+        },
+        'precompute-recommendations': {
+            'task': 'tasks.refresh_recommendations',
+            'schedule': crontab(minute=15)  # Hourly
         }
     }
 )
 
+_worker_app = None
+
+def worker_app():
+    """The Flask app tasks run in, built on first use so importing tasks stays cheap."""
+    global _worker_app
+    if _worker_app is None:
+        _worker_app = create_worker_app()
+    return _worker_app
+
 def init_celery():
-    celery.conf.update(application.config)
     TaskBase = celery.Task
     class ContextTask(TaskBase):
         def __call__(self, *args, **kwargs):
-            with application.app_context():
+            # Eagerly run tasks reuse the calling request's app
+            if has_app_context():
+                return TaskBase.__call__(self, *args, **kwargs)
+            with worker_app().app_context():
                 return TaskBase.__call__(self, *args, **kwargs)
     celery.Task = ContextTask
     return celery
 
 celery = init_celery()
 
+# Influencers per reminder subtask (and per pooled SMTP connection)
+REMINDER_BATCH_SIZE = 500
+
 @celery.task
+@reads_from_replica
 def send_daily_reminders():
+    """Queue reminder batches for every influencer with pending ad requests."""
     print(f"Task started at: {datetime.now()}")
     try:
-        current_time = datetime.utcnow()
-        
-        # Query influencers with pending requests
-        influencers = Influencer.query.join(User).all()
-        print("Found influencers:", influencers) 
-        
-        for influencer in influencers:
-            # Check for pending requests
-            pending_requests = AdRequest.query.filter_by(
-                influencer_id=influencer.id,
-                status='Pending'
-            ).count()
-            
-            if pending_requests > 0:
-                msg = Message(
-                    'Pending Ad Requests Reminder',
-                    sender=application.config['MAIL_USERNAME'],
-                    recipients=[influencer.user.email]
-                )
-                msg.body = f"""
-                Hello {influencer.user.username},
-                
-                You have {pending_requests} pending ad request(s) waiting for your response.
-                Please login to your dashboard to review them.
-                
-                Best regards,
-                The Team
-                """
-                mail.send(msg)
+        # One grouped query: pending request count per influencer, with their email
+        pending_counts = (
+            db.session.query(User.email, User.username, func.count(AdRequest.id))
+            .join(AdRequest, AdRequest.influencer_id == User.id)
+            .filter(AdRequest.status == 'Pending')
+            .group_by(User.id, User.email, User.username)
+            .order_by(User.id)
+            .yield_per(REMINDER_BATCH_SIZE)
+        )
+
+        batch = []
+        for email, username, pending_requests in pending_counts:
+            batch.append((email, username, pending_requests))
+            if len(batch) == REMINDER_BATCH_SIZE:
+                send_reminder_batch.delay(batch)
+                batch = []
+        if batch:
+            send_reminder_batch.delay(batch)
     except Exception as e:
         print(f"Error in send_daily_reminders: {str(e)}")
 
 @celery.task
-def generate_monthly_reports():
-    """Generate and send monthly activity reports for sponsors."""
-    # from app import app, mail
-    # from flask_mail import Message
-    
-    with application.app_context():
-        current_date = datetime.utcnow()
-        month_year = current_date.strftime("%B %Y")
-        
-        sponsors = Sponsor.query.join(User).all()
-        for sponsor in sponsors:
-            # Get campaign statistics
-            campaigns = Campaign.query.filter_by(sponsor_id=sponsor.id).all()
-            report_data = []
-            
-            for campaign in campaigns:
-                campaign_stats = {
-                    'name': campaign.name,
-                    'total_requests': len(campaign.ad_requests),
-                    'accepted_requests': sum(1 for r in campaign.ad_requests if r.status == 'Accepted'),
-                    'budget_used': sum(r.payment_amount for r in campaign.ad_requests if r.status == 'Accepted')
-                }
-                report_data.append(campaign_stats)
-            
-            # Create email content
-            html_content = create_monthly_report_html(sponsor, report_data, month_year)
-            
+def send_reminder_batch(reminders):
+    """Send one batch of reminders over a single SMTP connection."""
+    with mail.connect() as connection:
+        for email, username, pending_requests in reminders:
             msg = Message(
-                f'Monthly Campaign Report - {month_year}',
-                sender=application.config['MAIL_USERNAME'],
-                recipients=[sponsor.user.email],
-                html=html_content
+                'Pending Ad Requests Reminder',
+                sender=current_app.config['MAIL_USERNAME'],
+                recipients=[email]
             )
-            mail.send(msg)
-
-# @celery.task
-# def export_campaign_data(sponsor_id):
-#     """Export campaign data as CSV."""
-#     # from app import app
-    
-#     with application.app_context():
-#         # Get all campaigns for the sponsor
-#         campaigns = Campaign.query.filter_by(sponsor_id=sponsor_id).all()
-        
-#         # Create CSV in memory
-#         output = io.StringIO()
-#         writer = csv.writer(output)
-        
-#         # Write headers
-#         writer.writerow([
-#             'Campaign Name', 'Description', 'Start Date', 'End Date',
-#             'Budget', 'Visibility', 'Goals', 'Category', 'Status'
-#         ])
-        
-#         # Write campaign data
-#         for campaign in campaigns:
-#             writer.writerow([
-#                 campaign.name,
-#                 campaign.description,
-#                 campaign.start_date,
-#                 campaign.end_date,
-#                 campaign.budget,
-#                 campaign.visibility,
-#                 campaign.goals,
-#                 campaign.category,
-#                 campaign.flagged
-#             ])
-        
-#         return output.getvalue()
-
-def create_monthly_report_html(sponsor, report_data, month_year):
+            msg.body = f"""
+            Hello {username},
+            
+            You have {pending_requests} pending ad request(s) waiting for your response.
+            Please login to your dashboard to review them.
+            
+            Best regards,
+            The Team
+            """
+            connection.send(msg)
+
+def reporting_month(today=None):
+    """Start and end (exclusive) of the last full calendar month."""
+    today = today or datetime.utcnow()
+    month_end = datetime(today.year, today.month, 1)
+    month_start = (month_end - timedelta(days=1)).replace(day=1)
+    return month_start, month_end
+
+def monthly_campaign_stats(month_start, month_end):
+    """Per-campaign request stats for every sponsor, in one aggregated query.
+
+    Only ad requests created within [month_start, month_end) are counted;
+    sponsors without campaigns come back as a single row with no campaign.
+    """
+    accepted = AdRequest.status == 'Accepted'
+    return (
+        db.session.query(
+            Sponsor.id, User.email, User.username, Campaign.name,
+            func.count(AdRequest.id),
+            func.coalesce(func.sum(case((accepted, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((accepted, AdRequest.payment_amount), else_=0)), 0)
+        )
+        .join(User, User.id == Sponsor.id)
+        .outerjoin(Campaign, Campaign.sponsor_id == Sponsor.id)
+        .outerjoin(AdRequest, and_(
+            AdRequest.campaign_id == Campaign.id,
+            AdRequest.created_at >= month_start,
+            AdRequest.created_at < month_end
+        ))
+        .group_by(Sponsor.id, User.email, User.username, Campaign.id, Campaign.name)
+        .order_by(Sponsor.id, Campaign.id)
+        .all()
+    )
+
+@celery.task
+@reads_from_replica
+def generate_monthly_reports():
+    """Generate monthly activity reports and queue one email send per sponsor."""
+    month_start, month_end = reporting_month()
+    month_year = month_start.strftime("%B %Y")
+
+    rows = monthly_campaign_stats(month_start, month_end)
+    for sponsor_id, sponsor_rows in groupby(rows, key=lambda row: row[0]):
+        sponsor_rows = list(sponsor_rows)
+        _, email, username = sponsor_rows[0][:3]
+        report_data = [{
+            'name': name,
+            'total_requests': total_requests,
+            'accepted_requests': accepted_requests,
+            'budget_used': budget_used
+        } for _, _, _, name, total_requests, accepted_requests, budget_used in sponsor_rows if name is not None]
+
+        send_monthly_report.delay(email, username, report_data, month_year)
+
+@celery.task
+def send_monthly_report(email, username, report_data, month_year):
+    """Render and send one sponsor's monthly report."""
+    msg = Message(
+        f'Monthly Campaign Report - {month_year}',
+        sender=current_app.config['MAIL_USERNAME'],
+        recipients=[email],
+        html=create_monthly_report_html(username, report_data, month_year)
+    )
+    mail.send(msg)
+
+@celery.task
+def reconcile_stat_counters():
+    """Recompute the admin dashboard counters from scratch and report drift."""
+    from stats import reconcile_counters
+
+    result = reconcile_counters()
+    if result['drift']:
+        print(f"Stat counter drift corrected: {result['drift']}")
+    return result['drift']
+
+@celery.task
+def check_campaign_open_state():
+    """Repair campaigns whose is_open/accepted_ad_request_id disagree with their ad requests."""
+    from campaign_state import check_open_state
+
+    stale = check_open_state()
+    if stale:
+        print(f"Campaign open state corrected for campaigns: {stale}")
+    return stale
+
+@celery.task
+@reads_from_replica
+def refresh_recommendations():
+    """Rescore campaign/influencer matches and cache the top matches per campaign."""
+    from recommendations import precompute_recommendations  # numpy: only workers that score load it
+
+    return precompute_recommendations()
+
+@celery.task
+def refresh_campaign_recommendations(campaign_id):
+    """Score one new or edited campaign between hourly runs (on the primary: it may be seconds old)."""
+    from recommendations import score_campaign
+
+    return len(score_campaign(campaign_id))
+
+@celery.task
+@reads_from_replica
+def export_data(job_id):
+    """Write a sponsor's CSV export to the gzip file store (see exports.py)."""
+    from exports import run_job
+
+    job = run_job(job_id)
+    if job is None:
+        print(f"Error in export_data {job_id}: job not found")
+        return 'missing'
+    if job['status'] == 'failed':
+        print(f"Error in export_data {job_id}: {job['error']}")
+    return job['status']
+
+def create_monthly_report_html(sponsor_name, report_data, month_year):
     """Helper function to create HTML report."""
     return f"""
     <html>
@@ -167,7 +251,7 @@ def create_monthly_report_html(sponsor, report_data, month_year):
         <body>
             <div class="header">
                 <h2>Monthly Campaign Report - {month_year}</h2>
-                <p>Dear {sponsor.user.username},</p>
+                <p>Dear {sponsor_name},</p>
             </div>
             
             <div class="content">
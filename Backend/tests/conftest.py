@@ -0,0 +1,226 @@
+# Shared fixtures: an app on a throwaway SQLite file, tokens, seed data and a SQL statement counter
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from cache import TAG_VERSION_TIMEOUT, cache
+from config import Config
+from db import db
+from models import User, Sponsor, Influencer, Campaign, AdRequest
+from search import create_search_index
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLALCHEMY_BINDS = {}
+    REPLICA_BINDS = []
+    JWT_SECRET_KEY = 'test-secret-key-that-is-long-enough-for-hs256'
+    CACHE_TYPE = 'SimpleCache'
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    PASSWORD_HASH_WORKERS = 0
+    SLOW_REQUEST_MS = None
+
+
+def make_app(tmp_path, **overrides):
+    config = type('Config', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path}/primary.db', **overrides
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all(bind_key=None)  # A bind registered by an earlier app (replica tests) stays on `db`
+        create_search_index(db.session.connection())
+        db.session.commit()
+    return app
+
+
+def make_replica_app(tmp_path, **overrides):
+    """App with one (empty, never synced) SQLite replica: models worst-case replication lag."""
+    app = make_app(tmp_path, SQLALCHEMY_BINDS={'replica_0': f'sqlite:///{tmp_path}/replica.db'},
+                   REPLICA_BINDS=['replica_0'], **overrides)
+    with app.app_context():
+        db.metadata.create_all(db.engines['replica_0'])
+    return app
+
+
+def settle_tags(app, *tags):
+    """Mark `tags` as last written an hour ago, well past REPLICA_STICKY_SECONDS."""
+    with app.app_context():
+        cache.set_many({f'tag-version:{tag}': f'{time.time() - 3600}:settled' for tag in tags},
+                       timeout=TAG_VERSION_TIMEOUT)
+
+
+def dispose(app):
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+# No app context is held across a test: requests must each get their own `g`
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    yield app
+    dispose(app)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth(app):
+    """auth(user_id, role) -> Authorization header for a token like the ones login issues."""
+    return lambda user_id, role: auth_headers(app, user_id, role)
+
+
+def auth_headers(app, user_id, role):
+    with app.app_context():
+        token = create_access_token(identity=str(user_id), additional_claims={'role': role})
+    return {'Authorization': f'Bearer {token}'}
+
+
+class Seed:
+    """Builds users, profiles, campaigns and ad requests directly through the session; returns ids."""
+
+    password = generate_password_hash('pw', method='pbkdf2:sha256:1000')
+
+    def __init__(self, app):
+        self.app = app
+        self.counter = 0
+
+    def _add(self, *rows):
+        with self.app.app_context():
+            for row in rows:
+                db.session.add(row)
+                db.session.flush()
+            ids = [row.id for row in rows]
+            db.session.commit()
+        return ids[0]
+
+    def _user(self, role, flagged='Active'):
+        self.counter += 1
+        name = f'{role.lower()}{self.counter}'
+        return User(username=name, email=f'{name}@example.com', password=self.password, role=role, flagged=flagged)
+
+    def admin(self):
+        return self._add(self._user('Admin'))
+
+    def sponsor(self, flagged='Active'):
+        user = self._user('Sponsor', flagged)
+        user.sponsor = Sponsor(industry='tech', sponsor_type='brand')
+        return self._add(user)
+
+    def influencer(self, category='fashion', expertise='shoes bags', reach=1000, flagged='Active'):
+        user = self._user('Influencer', flagged)
+        user.influencer = Influencer(category=category, expertise=expertise, reach=reach)
+        return self._add(user)
+
+    def campaign(self, sponsor_id, visibility='public', category='fashion', budget=500.0, name=None):
+        self.counter += 1
+        return self._add(Campaign(name=name or f'campaign {self.counter}', description='desc', goals='goals',
+                                  budget=budget, visibility=visibility, category=category,
+                                  sponsor_id=sponsor_id, flagged='Active'))
+
+    def ad_request(self, campaign_id, influencer_id, status='Pending', payment_amount=100.0, **columns):
+        self.counter += 1
+        columns.setdefault('created_at', datetime(2024, 1, 1) + timedelta(seconds=self.counter))
+        return self._add(AdRequest(campaign_id=campaign_id, influencer_id=influencer_id, status=status,
+                                   payment_amount=payment_amount, **columns))
+
+
+@pytest.fixture
+def seed(app):
+    return Seed(app)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager yielding a QueryCounter that records every statement run inside it.
+
+    On any engine by default, or only on the given `engine` (e.g. a replica bind).
+    """
+    @contextmanager
+    def counting(engine=Engine):
+        counter = QueryCounter()
+        event.listen(engine, 'before_cursor_execute', counter)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, 'before_cursor_execute', counter)
+    return counting
+
+
+class FakeSMTP:
+    """Stand-in for smtplib.SMTP that records connections and the messages sent over them."""
+
+    connections = []
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.messages = []
+        FakeSMTP.connections.append(self)
+
+    def set_debuglevel(self, level):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        pass
+
+    def sendmail(self, sender, recipients, message, mail_options=(), rcpt_options=()):
+        self.messages.append((sender, recipients, message.decode()))
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    """Patch smtplib.SMTP with FakeSMTP; yields the list of opened connections."""
+    monkeypatch.setattr(FakeSMTP, 'connections', [])
+    monkeypatch.setattr('smtplib.SMTP', FakeSMTP)
+    return FakeSMTP.connections
+
+
+@contextmanager
+def eager_tasks():
+    """Run Celery tasks inline on .delay(), with an in-process broker and result store instead of Redis."""
+    from tasks import celery
+
+    celery.conf.update(task_always_eager=True, broker_url='memory://', result_backend='cache+memory://')
+    try:
+        yield
+    finally:
+        celery.conf.task_always_eager = False
+
+
+@pytest.fixture
+def mail_app(tmp_path):
+    """App that really sends mail (through the smtp fixture), with Celery tasks run inline."""
+    app = make_app(tmp_path, MAIL_SUPPRESS_SEND=False, MAIL_USERNAME='noreply@example.com')
+    with eager_tasks():
+        yield app
+    dispose(app)
@@ -0,0 +1,35 @@
+# Statement counts of the ad-request list endpoints must not grow with the number of rows
+import pytest
+
+ENDPOINTS = [
+    ('/sponsor/ad-requests', 'Sponsor'),
+    ('/sponsor/incoming-requests', 'Sponsor'),
+    ('/influencer/ad-requests', 'Influencer'),
+    ('/admin/recent-ad-requests', 'Admin'),
+]
+
+
+def _populate(seed, sponsor_id, influencer_id, campaigns):
+    for _ in range(campaigns):
+        for visibility in ('public', 'private'):
+            campaign_id = seed.campaign(sponsor_id, visibility=visibility)
+            seed.ad_request(campaign_id, influencer_id)
+            seed.ad_request(campaign_id, seed.influencer())
+
+
+@pytest.mark.parametrize('url, role', ENDPOINTS)
+def test_statement_count_is_independent_of_row_count(client, seed, auth, count_queries, url, role):
+    users = {'Admin': seed.admin(), 'Sponsor': seed.sponsor(), 'Influencer': seed.influencer()}
+    headers = auth(users[role], role)
+
+    counts = []
+    for campaigns in (1, 5):
+        _populate(seed, users['Sponsor'], users['Influencer'], campaigns)
+        client.get(url, headers=headers)  # Warm the identity snapshot
+        with count_queries() as queries:
+            response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert response.json
+        counts.append(queries.count)
+
+    assert counts[0] == counts[1]
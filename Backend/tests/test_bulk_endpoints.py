@@ -0,0 +1,91 @@
+# Bulk ad requests and bulk user status: statements per call do not grow with the batch
+from models import AdRequest, User
+
+
+def _bulk(client, headers, items):
+    return client.post('/sponsor/ad-requests/bulk', headers=headers, json={'ad_requests': items})
+
+
+def test_bulk_ad_requests_statement_count(client, seed, auth, count_queries):
+    sponsor = seed.sponsor()
+    campaign = seed.campaign(sponsor)
+    influencers = [seed.influencer() for _ in range(50)]
+    headers = auth(sponsor, 'Sponsor')
+    _bulk(client, headers, [{'campaign_id': campaign, 'influencer_id': influencers[0],
+                             'requirements': 'post', 'payment_amount': 10}])  # Warm the identity snapshot
+
+    counts = []
+    for batch in (influencers[:2], influencers):
+        with count_queries() as queries:
+            response = _bulk(client, headers, [{'campaign_id': campaign, 'influencer_id': influencer,
+                                                'requirements': 'post', 'payment_amount': 10}
+                                               for influencer in batch])
+        assert response.status_code == 201
+        assert response.json['created'] == len(batch)
+        counts.append(queries.count)
+    assert counts[0] == counts[1]
+
+
+def test_bulk_ad_requests_report_each_item(app, client, seed, auth):
+    sponsor, other = seed.sponsor(), seed.sponsor()
+    campaign, foreign = seed.campaign(sponsor), seed.campaign(other)
+    influencer = seed.influencer()
+
+    response = _bulk(client, auth(sponsor, 'Sponsor'), [
+        {'campaign_id': campaign, 'influencer_id': influencer, 'requirements': 'post', 'payment_amount': 10},
+        {'campaign_id': campaign, 'influencer_id': influencer},
+        {'campaign_id': foreign, 'influencer_id': influencer, 'requirements': 'post', 'payment_amount': 10},
+        {'campaign_id': campaign, 'influencer_id': 9999, 'requirements': 'post', 'payment_amount': 10},
+        'not an object',
+    ])
+
+    assert response.status_code == 201
+    assert (response.json['created'], response.json['failed']) == (1, 4)
+    results = response.json['results']
+    assert [result['index'] for result in results] == [0, 1, 2, 3, 4]
+    assert [result.get('error') for result in results] == [
+        None, 'All fields are required.', 'You do not own this campaign.', 'Influencer not found.',
+        'All fields are required.']
+    with app.app_context():
+        assert [ad_request.id for ad_request in AdRequest.query.all()] == [results[0]['id']]
+
+    assert _bulk(client, auth(sponsor, 'Sponsor'), [{'campaign_id': foreign}]).status_code == 400
+
+
+def test_bulk_user_status(app, client, seed, auth, count_queries):
+    admin = seed.admin()
+    headers = auth(admin, 'Admin')
+    client.get('/admin/dashboard', headers=headers)  # Warm the identity snapshot and counters
+
+    counts = []
+    for size in (2, 40):
+        users = [seed.sponsor() for _ in range(size // 2)] + [seed.influencer() for _ in range(size // 2)]
+        with count_queries() as queries:
+            response = client.put('/admin/users/status', headers=headers,
+                                  json={'user_ids': users + [admin, 9999], 'status': 'Flagged'})
+        assert response.status_code == 200
+        assert (response.json['updated'], response.json['failed']) == (size, 2)
+        assert response.json['results'][-1] == {'id': 9999, 'error': 'User not found or invalid'}
+        counts.append(queries.count)
+    assert counts[0] == counts[1]
+
+    with app.app_context():
+        assert User.query.filter_by(flagged='Flagged').count() == 42
+    dashboard = client.get('/admin/dashboard', headers=headers).json
+    assert dashboard['flagged_sponsors'] == 21
+    assert dashboard['flagged_influencers'] == 21
+
+
+def test_bulk_ad_request_ids_match_their_items(app, client, seed, auth):
+    sponsor = seed.sponsor()
+    campaigns = [seed.campaign(sponsor) for _ in range(2)]
+    influencers = [seed.influencer() for _ in range(2)]
+    items = [{'campaign_id': campaign, 'influencer_id': influencer, 'requirements': f'post {i}', 'payment_amount': 10}
+             for i, (campaign, influencer) in enumerate([(campaigns[1], influencers[0]), (campaigns[0], influencers[1]),
+                                                         (campaigns[1], influencers[0]), (campaigns[0], influencers[0])])]
+
+    results = _bulk(client, auth(sponsor, 'Sponsor'), items).json['results']
+
+    with app.app_context():
+        stored = {ad_request.id: ad_request.requirements for ad_request in AdRequest.query.all()}
+    assert [stored[result['id']] for result in results] == [item['requirements'] for item in items]
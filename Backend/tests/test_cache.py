@@ -0,0 +1,27 @@
+# Tag version keys expire, but only long after the views built on them
+import time
+
+from cache import TAG_VERSION_TIMEOUT, cache, invalidate_tags, tag_versions
+
+
+def _expires_in(key):
+    expires, _ = cache.cache._cache[key]  # SimpleCache keeps (expiry timestamp, value); 0 means never
+    return expires - time.time()
+
+
+def test_tag_versions_get_a_finite_timeout_longer_than_any_view(app):
+    with app.app_context():
+        first, = tag_versions(['campaigns'])
+        assert 0 < _expires_in('tag-version:campaigns') <= TAG_VERSION_TIMEOUT
+
+        invalidate_tags('campaigns', 'stats')
+        assert tag_versions(['campaigns']) != [first]
+        for key in ('tag-version:campaigns', 'tag-version:stats'):
+            assert app.config['CACHE_DEFAULT_TIMEOUT'] < _expires_in(key) <= TAG_VERSION_TIMEOUT
+
+
+def test_expired_version_is_replaced_by_a_new_token(app):
+    with app.app_context():
+        first, = tag_versions(['campaigns'])
+        cache.delete('tag-version:campaigns')  # As if it had expired
+        assert tag_versions(['campaigns']) != [first]
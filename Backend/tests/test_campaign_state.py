@@ -0,0 +1,66 @@
+# Campaign.is_open / accepted_ad_request_id follow ad-request status, and check_open_state repairs drift
+from sqlalchemy import update
+
+from campaign_state import check_open_state
+from db import db
+from models import AdRequest, Campaign
+
+
+def _state(app, campaign_id):
+    with app.app_context():
+        campaign = db.session.get(Campaign, campaign_id)
+        return campaign.is_open, campaign.accepted_ad_request_id
+
+
+def test_accept_closes_and_reject_or_delete_reopens(app, client, seed, auth):
+    sponsor = seed.sponsor()
+    campaign = seed.campaign(sponsor)
+    first, second = seed.influencer(), seed.influencer()
+    accepted, other = seed.ad_request(campaign, first), seed.ad_request(campaign, second)
+    assert _state(app, campaign) == (True, None)
+
+    assert client.put(f'/influencer/ad-request/{accepted}/status', headers=auth(first, 'Influencer'),
+                      json={'status': 'Accepted'}).status_code == 200
+    assert _state(app, campaign) == (False, accepted)
+
+    assert client.put(f'/influencer/ad-request/{accepted}/status', headers=auth(first, 'Influencer'),
+                      json={'status': 'Rejected'}).status_code == 200
+    assert _state(app, campaign) == (True, None)
+
+    assert client.put(f'/sponsor/incoming-requests/{other}/accept', headers=auth(sponsor, 'Sponsor')).status_code == 200
+    assert _state(app, campaign) == (False, other)
+    assert client.delete(f'/sponsor/ad-requests/{other}', headers=auth(sponsor, 'Sponsor')).status_code == 200
+    assert _state(app, campaign) == (True, None)
+
+
+def test_loaded_campaign_sees_the_new_state_in_the_same_session(app, seed):
+    campaign = seed.campaign(seed.sponsor())
+    ad_request = seed.ad_request(campaign, seed.influencer())
+    with app.app_context():
+        loaded = db.session.get(Campaign, campaign)
+        assert loaded.is_open
+        db.session.get(AdRequest, ad_request).status = 'Accepted'
+        db.session.flush()
+        assert (loaded.is_open, loaded.accepted_ad_request_id) == (False, ad_request)
+        db.session.rollback()
+
+
+def test_check_open_state_repairs_corrupted_rows(app, seed):
+    sponsor = seed.sponsor()
+    open_campaign, taken = seed.campaign(sponsor), seed.campaign(sponsor)
+    influencer = seed.influencer()
+    seed.ad_request(open_campaign, influencer)
+    accepted = seed.ad_request(taken, influencer, status='Accepted')
+    with app.app_context():
+        assert check_open_state() == []
+        # Written behind the ORM's back, e.g. by a manual fix or an older release
+        db.session.execute(update(Campaign).where(Campaign.id == open_campaign)
+                           .values(is_open=False, accepted_ad_request_id=accepted))
+        db.session.execute(update(Campaign).where(Campaign.id == taken).values(is_open=True, accepted_ad_request_id=None))
+        db.session.commit()
+
+        assert sorted(check_open_state(fix=False)) == [open_campaign, taken]
+        assert sorted(check_open_state()) == [open_campaign, taken]
+        assert check_open_state() == []
+    assert _state(app, open_campaign) == (True, None)
+    assert _state(app, taken) == (False, accepted)
@@ -0,0 +1,51 @@
+# Sponsor campaign summaries: per-status counts and spend from one grouped query
+def _summaries(client, headers):
+    response = client.get('/sponsor/campaigns/summary', headers=headers)
+    assert response.status_code == 200
+    return {summary['name']: summary for summary in response.json}
+
+
+def test_counts_spend_and_open_state(client, seed, auth):
+    sponsor = seed.sponsor()
+    launch = seed.campaign(sponsor, name='launch', budget=1000.0)
+    seed.campaign(sponsor, name='quiet', budget=300.0)
+    seed.campaign(seed.sponsor(), name='theirs')
+    influencers = [seed.influencer() for _ in range(4)]
+    seed.ad_request(launch, influencers[0])
+    seed.ad_request(launch, influencers[1], status='Rejected')
+    seed.ad_request(launch, influencers[2])
+    negotiated = seed.ad_request(launch, influencers[3], payment_amount=100.0)
+    headers = auth(sponsor, 'Sponsor')
+
+    client.put(f'/influencer/ad-request/{negotiated}/negotiate', headers=auth(influencers[3], 'Influencer'),
+               json={'payment_amount': 150, 'message': '150?'})
+    before = _summaries(client, headers)
+    assert set(before) == {'launch', 'quiet'}
+    assert before['launch']['requests'] == {'total': 4, 'pending': 3, 'accepted': 0, 'rejected': 1, 'negotiating': 1}
+    assert (before['launch']['spent'], before['launch']['remaining_budget'], before['launch']['is_open']) == (0, 1000.0, True)
+
+    assert client.put(f'/sponsor/ad-requests/{negotiated}/accept', headers=headers).status_code == 200
+    after = _summaries(client, headers)  # The accept rotated the sponsor tag: not served from cache
+    assert after['launch']['requests'] == {'total': 4, 'pending': 2, 'accepted': 1, 'rejected': 1, 'negotiating': 0}
+    assert after['launch']['spent'] == 150.0  # The negotiated amount, not the original 100
+    assert after['launch']['remaining_budget'] == 850.0
+    assert after['launch']['is_open'] is False
+    assert after['quiet'] == {'id': after['quiet']['id'], 'name': 'quiet', 'visibility': 'public', 'is_open': True,
+                              'budget': 300.0, 'spent': 0, 'remaining_budget': 300.0,
+                              'requests': {'total': 0, 'pending': 0, 'accepted': 0, 'rejected': 0, 'negotiating': 0}}
+
+
+def test_one_query_however_many_campaigns(client, seed, auth, count_queries):
+    sponsor = seed.sponsor()
+    headers = auth(sponsor, 'Sponsor')
+    influencer = seed.influencer()
+    client.get('/sponsor/campaigns', headers=headers)  # Warm the identity snapshot
+
+    counts = []
+    for campaigns in (1, 30):
+        for _ in range(campaigns):
+            seed.ad_request(seed.campaign(sponsor), influencer)
+        with count_queries() as queries:
+            client.get(f'/sponsor/campaigns/summary?n={campaigns}', headers=headers)  # New key: a cache miss
+        counts.append(queries.count)
+    assert counts[0] == counts[1] == 1
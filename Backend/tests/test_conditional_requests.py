@@ -0,0 +1,114 @@
+# Weak ETags and 304s (cached views and admin lists), and response compression
+import gzip
+
+import pytest
+
+from cache import cache_stats
+from conftest import Seed, auth_headers, dispose, make_replica_app, settle_tags
+from db import db
+
+
+def _revalidate(client, url, headers, response):
+    return client.get(url, headers={**headers, 'If-None-Match': response.headers['ETag']})
+
+
+def test_cached_view_hit_and_304(client, seed, auth, count_queries):
+    sponsor = seed.sponsor()
+    seed.influencer()
+    headers = auth(sponsor, 'Sponsor')
+    first = client.get('/sponsor/influencers', headers=headers)
+    hits = cache_stats['hits']
+
+    with count_queries() as queries:
+        second = client.get('/sponsor/influencers', headers=headers)
+        not_modified = _revalidate(client, '/sponsor/influencers', headers, first)
+    assert queries.count == 0
+    assert cache_stats['hits'] == hits + 2
+    assert second.json == first.json
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert not_modified.status_code == 304
+    assert not_modified.get_data() == b''
+
+    # Seeded rows bypass invalidation; the profile update rotates the 'influencers' tag
+    client.put('/influencer/profile', headers=auth(seed.influencer(), 'Influencer'), json={'reach': 5})
+    changed = _revalidate(client, '/sponsor/influencers', headers, first)
+    assert changed.status_code == 200
+    assert len(changed.json) == 2
+
+
+@pytest.mark.parametrize('url, change', [
+    ('/admin/sponsors', lambda client, headers, ids: client.put(f"/admin/flag-sponsor/{ids['sponsor']}", headers=headers)),
+    ('/admin/influencers', lambda client, headers, ids: client.put(
+        '/influencer/profile', headers=ids['influencer_headers'], json={'username': 'renamed'})),
+    ('/admin/campaigns', lambda client, headers, ids: client.put(f"/admin/flag-campaign/{ids['campaign']}", headers=headers)),
+    ('/admin/flagged-sponsors', lambda client, headers, ids: client.put(
+        '/admin/users/status', headers=headers, json={'user_ids': [ids['sponsor']], 'status': 'Flagged'})),
+])
+def test_admin_list_revalidation(client, seed, auth, count_queries, url, change):
+    sponsor, influencer = seed.sponsor(), seed.influencer()
+    ids = {'sponsor': sponsor, 'campaign': seed.campaign(sponsor),
+           'influencer_headers': auth(influencer, 'Influencer')}
+    headers = auth(seed.admin(), 'Admin')
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    assert first.headers['ETag'].startswith('W/')
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    with count_queries() as queries:
+        not_modified = _revalidate(client, url, headers, first)
+    assert not_modified.status_code == 304
+    assert queries.count == 0  # Neither the list query nor the identity lookup (admin role is in the token)
+    assert client.get(url + '?limit=1', headers=headers).headers['ETag'] != first.headers['ETag']
+
+    assert change(client, headers, ids).status_code == 200
+    changed = _revalidate(client, url, headers, first)
+    assert changed.status_code == 200
+    assert changed.json != first.json
+
+
+def test_large_responses_are_gzipped(client, seed, auth):
+    sponsor = seed.sponsor()
+    for _ in range(30):
+        seed.influencer()
+    headers = auth(sponsor, 'Sponsor')
+
+    plain = client.get('/sponsor/influencers', headers=headers)
+    compressed = client.get('/sponsor/influencers', headers={**headers, 'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
+    assert len(compressed.get_data()) < len(plain.get_data()) / 2
+
+    small = client.get('/sponsor/campaigns', headers={**headers, 'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers  # Under COMPRESS_MIN_SIZE
+
+
+def test_admin_list_misses_read_the_replica_once_writes_have_settled(tmp_path, count_queries):
+    app = make_replica_app(tmp_path)
+    seed, client = Seed(app), app.test_client()
+    sponsor = seed.sponsor()  # On the primary only
+    headers = auth_headers(app, seed.admin(), 'Admin')
+    settle_tags(app, 'stats')
+    with app.app_context():
+        replica = db.engines['replica_0']
+
+    with count_queries(replica) as queries:
+        first = client.get('/admin/sponsors', headers=headers)
+    assert first.json == []
+    assert queries.count == 1
+
+    with count_queries() as queries:
+        assert _revalidate(client, '/admin/sponsors', headers, first).status_code == 304
+    assert queries.count == 0
+
+    # Right after a write (by another admin, so no read-your-writes pin) the list is built
+    # from the primary, under the new ETag
+    other_admin = auth_headers(app, seed.admin(), 'Admin')
+    assert client.put(f'/admin/flag-sponsor/{sponsor}', headers=other_admin).status_code == 200
+    with count_queries(replica) as queries:
+        changed = _revalidate(client, '/admin/sponsors', headers, first)
+    assert [row['id'] for row in changed.json] == [sponsor]
+    assert queries.count == 0
+    dispose(app)
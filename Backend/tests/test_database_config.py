@@ -0,0 +1,104 @@
+# SQLite connections are tuned for concurrent workers; server databases get a sized pool
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import text
+
+import config
+from conftest import dispose, make_app
+from db import db, set_sqlite_pragmas
+
+
+def _pragmas(connection):
+    return {name: connection.execute(text(f'PRAGMA {name}')).scalar()
+            for name in ('journal_mode', 'busy_timeout', 'synchronous')}
+
+
+def test_sqlite_connections_get_the_pragmas(tmp_path):
+    app = make_app(tmp_path, SQLITE_BUSY_TIMEOUT=1234)
+    with app.app_context(), db.engine.connect() as connection:
+        assert _pragmas(connection) == {'journal_mode': 'wal', 'busy_timeout': 1234, 'synchronous': 1}
+    dispose(app)
+
+
+def test_writer_waits_for_the_lock_instead_of_failing(app):
+    locked, released = threading.Event(), 0.3
+
+    def hold_write_lock():
+        with app.app_context(), db.engine.connect() as connection:
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+            locked.set()
+            time.sleep(released)
+            connection.exec_driver_sql('COMMIT')
+
+    holder = threading.Thread(target=hold_write_lock)
+    holder.start()
+    locked.wait()
+    started = time.monotonic()
+    with app.app_context(), db.engine.connect() as connection:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+        connection.exec_driver_sql('COMMIT')
+    holder.join()
+    assert time.monotonic() - started >= released / 2  # Queued behind the lock rather than raising
+
+
+def _concurrent_commits(path, tune, writers=8, commits=50):
+    """Seconds for `writers` threads to each commit `commits` times, every commit also bumping one shared row."""
+    setup = sqlite3.connect(path)
+    setup.executescript('CREATE TABLE rows (id INTEGER PRIMARY KEY, value INTEGER);'
+                        'CREATE TABLE counter (value INTEGER); INSERT INTO counter VALUES (0);')
+    setup.close()
+    errors = []
+
+    def write():
+        connection = sqlite3.connect(path)
+        tune(connection)
+        try:
+            for i in range(commits):
+                connection.execute('INSERT INTO rows (value) VALUES (?)', (i,))
+                connection.execute('UPDATE counter SET value = value + 1')
+                connection.commit()
+        except sqlite3.OperationalError as error:
+            errors.append(error)
+        connection.close()
+
+    threads = [threading.Thread(target=write) for _ in range(writers)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    check = sqlite3.connect(path)
+    assert errors == []
+    assert check.execute('SELECT value FROM counter').fetchone()[0] == writers * commits
+    check.close()
+    return elapsed
+
+
+def test_wal_commits_concurrent_writes_faster(tmp_path):
+    # Before: pysqlite defaults (rollback journal, synchronous=FULL); after: the pragmas from db.py
+    before = _concurrent_commits(str(tmp_path / 'before.db'), lambda connection: None)
+    after = _concurrent_commits(str(tmp_path / 'after.db'), lambda connection: set_sqlite_pragmas(connection, None))
+    assert after < before, (before, after)
+
+
+def test_engine_options_per_backend(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '4')
+    assert config.engine_options('sqlite:///database.db') == {}
+    options = config.engine_options('postgresql://db/app')
+    assert options['pool_size'] == 4
+    assert options['max_overflow'] == 20
+    assert options['pool_pre_ping'] is True
+
+
+def test_database_urls_from_the_environment(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'postgres://user@db/app')
+    monkeypatch.setenv('REPLICA_DATABASE_URLS', 'postgres://user@replica1/app, ,postgresql://user@replica2/app')
+    assert config.database_url() == 'postgresql://user@db/app'
+    assert config.replica_binds() == {'replica_0': 'postgresql://user@replica1/app',
+                                      'replica_1': 'postgresql://user@replica2/app'}
+    monkeypatch.delenv('DATABASE_URL')
+    assert config.database_url() == 'sqlite:///database.db'
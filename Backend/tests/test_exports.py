@@ -0,0 +1,87 @@
+# CSV exports: streamed in batches, or written to a gzip file by a background job
+import csv
+import gzip
+import io
+
+import pytest
+
+import exports
+import tasks
+from conftest import eager_tasks
+
+
+@pytest.fixture
+def sponsor_data(seed):
+    sponsor, other = seed.sponsor(), seed.sponsor()
+    campaigns = [seed.campaign(sponsor, name=f'mine {i}') for i in range(5)]
+    seed.campaign(other, name='theirs')
+    influencer = seed.influencer()
+    seed.ad_request(campaigns[0], influencer, status='Accepted', payment_amount=250)
+    seed.ad_request(campaigns[1], influencer)
+    return sponsor, other
+
+
+def _rows(text):
+    return list(csv.reader(io.StringIO(text)))
+
+
+def test_export_is_streamed_in_batches(app, client, auth, sponsor_data, monkeypatch):
+    monkeypatch.setattr(exports, 'EXPORT_BATCH_SIZE', 2)
+    sponsor, _ = sponsor_data
+
+    response = client.get('/sponsor/export/campaigns', headers=auth(sponsor, 'Sponsor'))
+
+    assert response.is_streamed
+    assert response.headers['Content-Disposition'] == 'attachment; filename=campaigns_report.csv'
+    chunks = list(response.response)
+    assert len(chunks) == 3  # Header + 2 rows, 2 rows, 1 row
+    rows = _rows(b''.join(chunks).decode())
+    assert rows[0][:2] == ['Campaign Name', 'Description']
+    assert [row[0] for row in rows[1:]] == [f'mine {i}' for i in range(5)]
+
+    payments = _rows(client.get('/sponsor/export/payments', headers=auth(sponsor, 'Sponsor')).get_data(as_text=True))
+    assert [(row[1], row[3]) for row in payments[1:]] == [('mine 0', '250.0')]
+    assert client.get('/sponsor/export/secrets', headers=auth(sponsor, 'Sponsor')).status_code == 404
+
+
+def test_async_export_round_trip(app, client, auth, sponsor_data, tmp_path):
+    app.config['EXPORT_DIR'] = str(tmp_path / 'exports')
+    sponsor, other = sponsor_data
+    headers = auth(sponsor, 'Sponsor')
+
+    with eager_tasks():
+        response = client.post('/sponsor/export/ad-requests/async', headers=headers)
+    assert response.status_code == 202
+    job_id = response.json['job_id']
+
+    status = client.get(f'/sponsor/exports/{job_id}', headers=headers).json
+    assert status == {'job_id': job_id, 'dataset': 'ad-requests', 'status': 'done', 'error': None}
+    download = client.get(f'/sponsor/exports/{job_id}/download', headers=headers)
+    assert download.headers['Content-Type'] == 'application/gzip'
+    rows = _rows(gzip.decompress(download.get_data()).decode())
+    assert [row[1] for row in rows[1:]] == ['mine 0', 'mine 1']
+
+    others = auth(other, 'Sponsor')
+    assert client.get(f'/sponsor/exports/{job_id}', headers=others).status_code == 404
+    assert client.get(f'/sponsor/exports/{job_id}/download', headers=others).status_code == 404
+    assert client.get('/sponsor/exports/not-a-job', headers=headers).status_code == 404
+
+
+def test_unfinished_export_is_not_downloadable(app, client, auth, sponsor_data, tmp_path, monkeypatch):
+    app.config['EXPORT_DIR'] = str(tmp_path / 'exports')
+    monkeypatch.setattr(tasks.export_data, 'delay', lambda job_id: None)  # Never picked up
+    sponsor, _ = sponsor_data
+    headers = auth(sponsor, 'Sponsor')
+
+    job_id = client.post('/sponsor/export/campaigns/async', headers=headers).json['job_id']
+
+    assert client.get(f'/sponsor/exports/{job_id}', headers=headers).json['status'] == 'queued'
+    response = client.get(f'/sponsor/exports/{job_id}/download', headers=headers)
+    assert response.status_code == 409
+
+
+def test_unknown_job_is_skipped_by_the_worker(app, tmp_path):
+    app.config['EXPORT_DIR'] = str(tmp_path / 'exports')
+    with app.app_context():
+        assert exports.run_job('3f1c2b3a-0000-4000-8000-000000000000') is None
+        assert tasks.export_data('3f1c2b3a-0000-4000-8000-000000000000') == 'missing'
@@ -0,0 +1,63 @@
+# role_required: token role and the shared identity snapshot both gate a route; writes drop the snapshot
+from cache import cache
+from db import db
+from identity import FORBIDDEN_MESSAGES, PROFILE_INCOMPLETE_MESSAGE, invalidate_identity
+from models import User, Sponsor
+
+
+def test_role_mismatch_is_forbidden(app, client, seed, auth):
+    influencer = seed.influencer()
+    response = client.get('/sponsor/campaigns', headers=auth(influencer, 'Influencer'))
+    assert response.status_code == 403
+    assert response.json == {'error': FORBIDDEN_MESSAGES['Sponsor']}
+
+    # A token claiming a role the user row does not have
+    response = client.get('/sponsor/campaigns', headers=auth(influencer, 'Sponsor'))
+    assert response.status_code == 403
+    assert response.json == {'error': FORBIDDEN_MESSAGES['Sponsor']}
+
+
+def test_incomplete_profile_is_refused_until_completed(app, client, seed, auth):
+    sponsor = seed.sponsor()
+    with app.app_context():
+        db.session.get(Sponsor, sponsor).industry = None
+        db.session.commit()
+    headers = auth(sponsor, 'Sponsor')
+
+    response = client.get('/sponsor/campaigns', headers=headers)
+    assert response.status_code == 403
+    assert response.json == {'error': PROFILE_INCOMPLETE_MESSAGE}
+
+    response = client.post('/sponsor/complete-profile', headers=headers,
+                           json={'industry': 'tech', 'sponsor_type': 'brand'})
+    assert response.status_code == 200
+    assert client.get('/sponsor/campaigns', headers=headers).status_code == 200  # Snapshot dropped, not aged out
+
+
+def test_flagging_replaces_the_cached_snapshot(app, client, seed, auth):
+    sponsor, admin = seed.sponsor(), seed.admin()
+    assert client.get('/sponsor/campaigns', headers=auth(sponsor, 'Sponsor')).status_code == 200
+    with app.app_context():
+        assert cache.get(f'identity:{sponsor}')['flagged'] == 'Active'
+
+    assert client.put(f'/admin/flag-sponsor/{sponsor}', headers=auth(admin, 'Admin')).status_code == 200
+    with app.app_context():
+        assert cache.get(f'identity:{sponsor}') is None
+    client.get('/sponsor/campaigns', headers=auth(sponsor, 'Sponsor'))
+    with app.app_context():
+        assert cache.get(f'identity:{sponsor}')['flagged'] == 'Flagged'
+
+
+def test_role_change_applies_once_the_snapshot_is_invalidated(app, client, seed, auth):
+    sponsor = seed.sponsor()
+    headers = auth(sponsor, 'Sponsor')
+    assert client.get('/sponsor/campaigns', headers=headers).status_code == 200
+
+    with app.test_request_context():
+        db.session.get(User, sponsor).role = 'Influencer'
+        db.session.commit()
+    assert client.get('/sponsor/campaigns', headers=headers).status_code == 200  # Stale snapshot still served
+
+    with app.test_request_context():
+        invalidate_identity(sponsor)
+    assert client.get('/sponsor/campaigns', headers=headers).status_code == 403
@@ -0,0 +1,49 @@
+# Sponsor incoming requests: one query however many applicants, open public campaigns only, sortable
+def _applicants(seed, campaign, count, start=0):
+    return [seed.ad_request(campaign, seed.influencer(reach=1000 * (start + i + 1)), payment_amount=10 * (start + i + 1))
+            for i in range(count)]
+
+
+def test_statement_count_is_independent_of_applicant_count(client, seed, auth, count_queries):
+    sponsor = seed.sponsor()
+    campaign = seed.campaign(sponsor)
+    headers = auth(sponsor, 'Sponsor')
+    client.get('/sponsor/incoming-requests', headers=headers)  # Warm the identity snapshot
+
+    counts = []
+    for total, applicants in ((3, 3), (200, 197)):
+        _applicants(seed, campaign, applicants, start=total - applicants)
+        with count_queries() as queries:
+            response = client.get('/sponsor/incoming-requests', headers=headers)
+        assert len(response.json) == total
+        counts.append(queries.count)
+
+    assert counts[0] == counts[1]
+
+
+def test_only_pending_requests_on_open_public_campaigns(client, seed, auth):
+    sponsor = seed.sponsor()
+    open_campaign, taken, private = seed.campaign(sponsor), seed.campaign(sponsor), seed.campaign(sponsor, visibility='private')
+    wanted = _applicants(seed, open_campaign, 2)
+    seed.ad_request(open_campaign, seed.influencer(), status='Rejected')
+    _applicants(seed, taken, 2)
+    seed.ad_request(taken, seed.influencer(), status='Accepted')
+    _applicants(seed, private, 2)
+
+    response = client.get('/sponsor/incoming-requests', headers=auth(sponsor, 'Sponsor'))
+
+    assert [ad_request['id'] for ad_request in response.json] == wanted
+
+
+def test_sorted_by_payment_and_reach(client, seed, auth):
+    sponsor = seed.sponsor()
+    ids = _applicants(seed, seed.campaign(sponsor), 5)
+    headers = auth(sponsor, 'Sponsor')
+
+    by_payment = client.get('/sponsor/incoming-requests?sort=payment', headers=headers).json
+    by_reach = client.get('/sponsor/incoming-requests?sort=reach&order=asc&limit=2', headers=headers)
+
+    assert [ad_request['id'] for ad_request in by_payment] == ids[::-1]
+    assert [ad_request['id'] for ad_request in by_reach.json] == ids[:2]
+    assert by_reach.headers['X-Next-Cursor']
+    assert client.get('/sponsor/incoming-requests?sort=name', headers=headers).status_code == 400
@@ -0,0 +1,51 @@
+# The influencer dashboard is one query however many campaigns there are
+from cache import invalidate_tags
+from pagination import DEFAULT_PAGE_SIZE
+
+
+def test_statement_count_is_independent_of_campaign_count(app, client, seed, auth, count_queries):
+    sponsor, influencer = seed.sponsor(), seed.influencer()
+    headers = auth(influencer, 'Influencer')
+    client.get('/influencer/dashboard', headers=headers)  # Warm the identity snapshot
+
+    counts = []
+    for campaigns in (5, 50):
+        for i in range(campaigns):
+            campaign = seed.campaign(sponsor)
+            if i % 5 == 0:
+                seed.ad_request(campaign, influencer)
+        with app.app_context():
+            invalidate_tags('campaigns')
+        with count_queries() as queries:
+            response = client.get('/influencer/dashboard', headers=headers)
+        assert response.status_code == 200
+        counts.append(queries.count)
+
+    assert len(response.json) == 55
+    assert counts[0] == counts[1]
+
+
+def test_dashboard_lists_open_public_campaigns_with_own_status(client, seed, auth):
+    sponsor, influencer, other = seed.sponsor(), seed.influencer(), seed.influencer()
+    applied = seed.campaign(sponsor)
+    seed.ad_request(applied, influencer)
+    taken = seed.campaign(sponsor)
+    seed.ad_request(taken, other, status='Accepted')
+    seed.campaign(sponsor, visibility='private')
+    untouched = seed.campaign(sponsor)
+
+    response = client.get('/influencer/dashboard', headers=auth(influencer, 'Influencer'))
+
+    statuses = {campaign['id']: campaign['status'] for campaign in response.json}
+    assert statuses == {applied: 'Pending', untouched: 'Not Applied'}
+    assert response.json[0]['sponsor_name']
+
+
+def test_dashboard_is_not_cut_at_the_default_page_size(client, seed, auth):
+    sponsor, influencer = seed.sponsor(), seed.influencer()
+    for _ in range(DEFAULT_PAGE_SIZE + 1):
+        seed.campaign(sponsor)
+    headers = auth(influencer, 'Influencer')
+
+    assert len(client.get('/influencer/dashboard', headers=headers).json) == DEFAULT_PAGE_SIZE + 1
+    assert len(client.get('/influencer/dashboard?limit=10', headers=headers).json) == 10
@@ -0,0 +1,85 @@
+# The orjson provider against Flask's default one, and the columnar list format
+import json
+import math
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+pytest.importorskip('orjson')
+
+from json_provider import OrjsonProvider  # noqa: E402
+
+PAYLOADS = [
+    {'name': 'Café ☕', 'tags': ['über', '東京']},
+    {'created_at': datetime(2024, 1, 2, 3, 4, 5), 'amount': Decimal('12.50')},
+    {'big': 1e16, 'small': 1e-7, 'plain': 0.1, 'int': 2 ** 63 - 1},
+    {'b': None, 'a': [True, False], 'n': -3},
+]
+
+
+@pytest.fixture
+def providers(app):
+    return DefaultJSONProvider(app), OrjsonProvider(app)
+
+
+@pytest.mark.parametrize('payload', PAYLOADS)
+def test_decodes_to_the_same_values(app, providers, payload):
+    default, fast = providers
+    with app.app_context():
+        assert json.loads(fast.response(payload).data) == json.loads(default.response(payload).data)
+        assert json.loads(fast.dumps(payload)) == json.loads(default.dumps(payload))
+
+
+def test_datetimes_are_http_dates(app, providers):
+    _, fast = providers
+    with app.app_context():
+        assert fast.dumps({'at': datetime(2024, 1, 2, 3, 4, 5)}) == '{"at":"Tue, 02 Jan 2024 03:04:05 GMT"}'
+
+
+def test_integers_beyond_64_bits_fall_back_to_the_stdlib_encoder(app, providers):
+    default, fast = providers
+    payload = {'huge': 2 ** 64 + 1}
+    with app.app_context():
+        assert fast.response(payload).data == default.response(payload).data
+        assert fast.dumps(payload) == default.dumps(payload)
+
+
+def test_nan_is_null(app, providers):
+    # The stdlib writes NaN, which is not JSON; orjson writes null
+    _, fast = providers
+    with app.app_context():
+        assert json.loads(fast.dumps({'x': math.nan})) == {'x': None}
+
+
+def test_unknown_types_still_raise(app, providers):
+    _, fast = providers
+    with app.app_context(), pytest.raises(TypeError):
+        fast.dumps({'x': object()})
+
+
+def test_app_uses_the_orjson_provider(app):
+    assert isinstance(app.json, OrjsonProvider)
+
+
+@pytest.mark.parametrize('url, role', [
+    ('/admin/sponsors', 'Admin'),
+    ('/admin/flagged-sponsors', 'Admin'),
+    ('/admin/active-sponsors', 'Admin'),
+    ('/sponsor/campaigns', 'Sponsor'),
+])
+def test_columnar_list_format(client, seed, auth, url, role):
+    admin, owner = seed.admin(), seed.sponsor()
+    sponsors = [seed.sponsor(flagged='Flagged' if 'flagged' in url else 'Active') for _ in range(3)]
+    campaigns = [seed.campaign(owner) for _ in range(3)]
+    headers = auth(admin, 'Admin') if role == 'Admin' else auth(owner, 'Sponsor')
+    expected = {'/admin/sponsors': [owner, *sponsors], '/admin/active-sponsors': [owner, *sponsors],
+                '/admin/flagged-sponsors': sponsors, '/sponsor/campaigns': campaigns}[url]
+
+    rows = client.get(url, headers=headers).json
+    columnar = client.get(url + '?format=columnar', headers=headers).json
+
+    assert sorted(columnar['columns']) == sorted(rows[0])
+    assert [dict(zip(columnar['columns'], row)) for row in columnar['rows']] == rows
+    assert [row['id'] for row in rows] == expected
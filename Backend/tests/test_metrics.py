@@ -0,0 +1,38 @@
+# /metrics: only served with a token, only to its bearer; request instrumentation
+import pytest
+
+from conftest import Seed, dispose, make_app
+
+
+@pytest.fixture
+def metrics_app(tmp_path):
+    app = make_app(tmp_path, METRICS_TOKEN='scrape-token')
+    yield app
+    dispose(app)
+
+
+def test_metrics_not_served_without_a_token(client):
+    assert client.get('/metrics').status_code == 404
+
+
+def test_metrics_require_the_bearer_token(metrics_app):
+    client = metrics_app.test_client()
+    assert client.get('/metrics').status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer wrong'})
+    assert response.status_code == 401
+    assert response.headers['WWW-Authenticate'] == 'Bearer'
+
+
+def test_metrics_count_requests_and_statements(metrics_app, auth):
+    seed = Seed(metrics_app)
+    sponsor = seed.sponsor()
+    client = metrics_app.test_client()
+    client.get('/sponsor/campaigns', headers=auth(sponsor, 'Sponsor'))
+
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert 'http_requests_total{route="/sponsor/campaigns",method="GET",status="200"}' in body
+    assert 'http_request_sql_statements_count{route="/sponsor/campaigns",method="GET"}' in body
+    assert 'route="/metrics"' not in body
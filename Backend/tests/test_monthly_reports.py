@@ -0,0 +1,49 @@
+# Monthly sponsor reports: one aggregated query for the month, one mail per sponsor
+from datetime import datetime
+
+import tasks
+from conftest import Seed
+
+JANUARY = (datetime(2024, 1, 1), datetime(2024, 2, 1))
+
+
+def test_monthly_campaign_stats_are_scoped_to_the_month(app, seed, count_queries):
+    sponsor, idle_sponsor = seed.sponsor(), seed.sponsor()
+    influencer = seed.influencer()
+    busy, quiet = seed.campaign(sponsor, name='Busy'), seed.campaign(sponsor, name='Quiet')
+    seed.ad_request(busy, influencer, status='Accepted', payment_amount=300)
+    seed.ad_request(busy, influencer, status='Pending', payment_amount=50)
+    seed.ad_request(busy, influencer, status='Accepted', payment_amount=999, created_at=datetime(2024, 2, 3))
+    seed.ad_request(quiet, influencer, status='Rejected', created_at=datetime(2023, 12, 31))
+
+    with app.app_context(), count_queries() as queries:
+        rows = tasks.monthly_campaign_stats(*JANUARY)
+
+    assert queries.count == 1
+    stats = {(row[0], row[3]): tuple(row[4:]) for row in rows}
+    assert stats == {
+        (sponsor, 'Busy'): (2, 1, 300),
+        (sponsor, 'Quiet'): (0, 0, 0),
+        (idle_sponsor, None): (0, 0, 0),
+    }
+
+
+def test_one_report_mail_per_sponsor(mail_app, smtp, count_queries, monkeypatch):
+    monkeypatch.setattr(tasks, 'reporting_month', lambda today=None: JANUARY)
+    seed = Seed(mail_app)
+    sponsors = [seed.sponsor() for _ in range(3)]
+    influencer = seed.influencer()
+    for sponsor in sponsors:
+        seed.ad_request(seed.campaign(sponsor, name=f'Campaign of {sponsor}'), influencer,
+                        status='Accepted', payment_amount=120)
+
+    with mail_app.app_context(), count_queries() as queries:
+        tasks.generate_monthly_reports()
+
+    assert queries.count == 1
+    messages = [message for connection in smtp for message in connection.messages]
+    assert len(messages) == 3
+    for sponsor in sponsors:
+        body = next(body for _, _, body in messages if f'Campaign of {sponsor}' in body)
+        assert 'Monthly Campaign Report - January 2024' in body
+        assert 'Budget Used: $120' in body
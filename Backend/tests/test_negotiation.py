@@ -0,0 +1,90 @@
+# Negotiation threads: one row per message, list summaries, access checks, and the history migration
+import importlib.util
+from datetime import datetime
+from pathlib import Path
+
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, text
+
+from models import AdRequest
+
+MIGRATION = Path(__file__).parent.parent / 'migrations' / 'versions' / 'c3d8a5e2f914_add_negotiation_messages.py'
+
+
+def _migration():
+    spec = importlib.util.spec_from_file_location('negotiation_migration', MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_negotiations_append_to_the_thread(app, client, seed, auth):
+    sponsor, influencer = seed.sponsor(), seed.influencer()
+    ad_request = seed.ad_request(seed.campaign(sponsor), influencer)
+    headers = auth(influencer, 'Influencer')
+
+    for amount, message in ((150, 'Can we do 150?'), (140, 'Or 140, final offer')):
+        response = client.put(f'/influencer/ad-request/{ad_request}/negotiate', headers=headers,
+                              json={'payment_amount': amount, 'message': message})
+        assert response.status_code == 200
+
+    thread = client.get(f'/influencer/ad-request/{ad_request}/messages', headers=headers).json
+    assert [(message['sender'], message['body']) for message in thread] == [
+        ('Influencer', 'Can we do 150?'), ('Influencer', 'Or 140, final offer')]
+    assert client.get(f'/sponsor/ad-requests/{ad_request}/messages', headers=auth(sponsor, 'Sponsor')).json == thread
+
+    listed = client.get('/sponsor/ad-requests', headers=auth(sponsor, 'Sponsor')).json
+    assert [(row['message_count'], row['last_message'], row['negotiated_payment_amount'], row['is_negotiated'])
+            for row in listed] == [(2, 'Or 140, final offer', 140, True)]
+    with app.app_context():
+        assert AdRequest.query.get(ad_request).message_count == 2
+
+
+def test_thread_is_private_to_its_parties(client, seed, auth):
+    sponsor, influencer = seed.sponsor(), seed.influencer()
+    ad_request = seed.ad_request(seed.campaign(sponsor), influencer)
+    client.put(f'/influencer/ad-request/{ad_request}/negotiate', headers=auth(influencer, 'Influencer'),
+               json={'payment_amount': 150, 'message': 'Can we do 150?'})
+
+    assert client.get(f'/influencer/ad-request/{ad_request}/messages',
+                      headers=auth(seed.influencer(), 'Influencer')).status_code == 404
+    assert client.get(f'/sponsor/ad-requests/{ad_request}/messages',
+                      headers=auth(seed.sponsor(), 'Sponsor')).status_code == 404
+    assert client.get('/influencer/ad-request/9999/messages',
+                      headers=auth(influencer, 'Influencer')).status_code == 404
+
+
+def test_split_history():
+    split_history = _migration().split_history
+    assert split_history(None) == []
+    assert split_history('\nInfluencer: 150?\nSponsor: 120\nand a second line\nInfluencer: ok') == [
+        ['Influencer', '150?'], ['Sponsor', '120\nand a second line'], ['Influencer', 'ok']]
+    assert split_history('free text first') == [['Influencer', 'free text first']]
+
+
+def test_migration_moves_histories_into_rows_and_back(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/legacy.db')
+    created = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE ad_requests (id INTEGER PRIMARY KEY, messages VARCHAR, created_at DATETIME)'))
+        connection.execute(text('INSERT INTO ad_requests VALUES (:id, :messages, :created_at)'), [
+            {'id': 1, 'messages': '\nInfluencer: 150?\nSponsor: 120', 'created_at': created},
+            {'id': 2, 'messages': None, 'created_at': created},
+        ])
+        with Operations.context(MigrationContext.configure(connection)):
+            _migration().upgrade()
+
+        rows = connection.execute(text('SELECT ad_request_id, sender, body FROM negotiation_messages ORDER BY id')).all()
+        summaries = connection.execute(text('SELECT id, last_message, message_count FROM ad_requests ORDER BY id')).all()
+        columns = [row[1] for row in connection.execute(text('PRAGMA table_info(ad_requests)'))]
+
+        with Operations.context(MigrationContext.configure(connection)):
+            _migration().downgrade()
+        histories = connection.execute(text('SELECT id, messages FROM ad_requests ORDER BY id')).all()
+
+    assert [tuple(row) for row in rows] == [(1, 'Influencer', '150?'), (1, 'Sponsor', '120')]
+    assert [tuple(row) for row in summaries] == [(1, '120', 2), (2, None, 0)]
+    assert 'messages' not in columns
+    assert [tuple(row) for row in histories] == [(1, '\nInfluencer: 150?\nSponsor: 120'), (2, None)]
+    engine.dispose()
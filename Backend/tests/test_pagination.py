@@ -0,0 +1,87 @@
+# Keyset pagination, NDJSON streaming and constant statement counts of the list endpoints
+import json
+
+import pytest
+
+from cache import invalidate_tags
+from db import db
+from models import NegotiationMessage
+from pagination import DEFAULT_PAGE_SIZE
+
+LIST_ENDPOINTS = [
+    ('/sponsor/influencers', 'Sponsor'),
+    ('/admin/sponsors', 'Admin'),
+    ('/admin/influencers', 'Admin'),
+    ('/admin/campaigns', 'Admin'),
+]
+
+
+@pytest.mark.parametrize('url, role', LIST_ENDPOINTS)
+def test_list_statement_count_is_independent_of_row_count(app, client, seed, auth, count_queries, url, role):
+    users = {'Admin': seed.admin(), 'Sponsor': seed.sponsor()}
+    headers = auth(users[role], role)
+
+    counts = []
+    for rows in (1, 10):
+        for _ in range(rows):
+            seed.sponsor()
+            seed.influencer()
+            seed.campaign(users['Sponsor'])
+        client.get(url, headers=headers)  # Warm the identity snapshot
+        with app.app_context():
+            invalidate_tags('influencers')  # Miss the view cache of /sponsor/influencers
+        with count_queries() as queries:
+            response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        counts.append(queries.count)
+
+    assert counts[0] == counts[1]
+
+
+def test_whole_list_without_pagination_parameters(client, seed, auth):
+    admin = seed.admin()
+    for _ in range(DEFAULT_PAGE_SIZE + 5):
+        seed.sponsor()
+
+    response = client.get('/admin/sponsors', headers=auth(admin, 'Admin'))
+
+    assert len(response.json) == DEFAULT_PAGE_SIZE + 5
+    assert 'X-Next-Cursor' not in response.headers
+
+
+def test_limit_and_after_walk_every_row_once(client, seed, auth):
+    admin = seed.admin()
+    sponsors = [seed.sponsor() for _ in range(7)]
+    headers = auth(admin, 'Admin')
+
+    seen, url = [], '/admin/sponsors?limit=3'
+    while url:
+        response = client.get(url, headers=headers)
+        assert len(response.json) <= 3
+        seen += [sponsor['id'] for sponsor in response.json]
+        cursor = response.headers.get('X-Next-Cursor')
+        url = f'/admin/sponsors?limit=3&after={cursor}' if cursor else None
+
+    assert seen == sponsors
+
+
+def test_invalid_cursor_is_a_client_error(client, seed, auth):
+    response = client.get('/admin/sponsors?after=not-a-cursor', headers=auth(seed.admin(), 'Admin'))
+    assert response.status_code == 400
+
+
+def test_ndjson_rows_match_the_json_rows(app, client, seed, auth):
+    sponsor = seed.sponsor()
+    ad_request = seed.ad_request(seed.campaign(sponsor), seed.influencer())
+    with app.app_context():
+        for body in ('Can you do 80?', 'Deal at 90'):
+            db.session.add(NegotiationMessage(ad_request_id=ad_request, sender='Influencer', body=body))
+        db.session.commit()
+    url, headers = f'/sponsor/ad-requests/{ad_request}/messages', auth(sponsor, 'Sponsor')
+
+    rows = client.get(url, headers=headers).json
+    streamed = client.get(url + '?format=ndjson', headers=headers)
+
+    assert streamed.mimetype == 'application/x-ndjson'
+    assert [json.loads(line) for line in streamed.text.splitlines()] == rows
+    assert rows[0]['created_at'].endswith(' GMT')  # Datetimes as HTTP dates in both formats
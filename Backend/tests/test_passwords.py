@@ -0,0 +1,128 @@
+# Password hashing: off-thread pool, rehash on login after a method change, 503 when saturated
+import os
+
+import pytest
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash
+
+import passwords
+from conftest import Seed, dispose, make_app
+from models import User
+
+
+def _login(client, email, password='pw', role='Sponsor'):
+    return client.post('/auth/login', json={'email': email, 'password': password, 'role': role})
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Reset the per-process pool around a test that starts one."""
+    monkeypatch.setattr(passwords, '_pool', None)
+    monkeypatch.setattr(passwords, '_slots', None)
+    yield
+    if passwords._pool is not None:
+        passwords._pool.shutdown()
+
+
+def test_hashes_round_trip_through_the_pool(tmp_path, pool):
+    app = make_app(tmp_path, PASSWORD_HASH_WORKERS=1)
+    with app.app_context():
+        stored = passwords.hash_password('secret')
+        assert stored.startswith('pbkdf2:sha256:1000$')
+        assert passwords.verify_password(stored, 'secret')
+        assert not passwords.verify_password(stored, 'wrong')
+        hashed = passwords.hash_passwords(['a', 'b', 'c'])
+        assert [passwords.verify_password(h, p) for h, p in zip(hashed, 'abc')] == [True] * 3
+    dispose(app)
+
+
+def test_login_rehashes_after_a_method_change(tmp_path):
+    app = make_app(tmp_path, PASSWORD_HASH_METHOD='pbkdf2:sha256:2000')
+    sponsor = Seed(app).sponsor()  # Stored with pbkdf2:sha256:1000
+    client = app.test_client()
+
+    assert _login(client, 'sponsor1@example.com', 'wrong').status_code == 401
+    with app.app_context():
+        assert User.query.get(sponsor).password.startswith('pbkdf2:sha256:1000$')
+
+    assert _login(client, 'sponsor1@example.com').status_code == 200
+    with app.app_context():
+        upgraded = User.query.get(sponsor).password
+    assert upgraded.startswith('pbkdf2:sha256:2000$')
+
+    assert _login(client, 'sponsor1@example.com').status_code == 200
+    with app.app_context():
+        assert User.query.get(sponsor).password == upgraded  # Not rehashed again
+    dispose(app)
+
+
+def test_saturated_pool_answers_503(tmp_path, pool):
+    app = make_app(tmp_path, PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_TIMEOUT=0)
+    Seed(app).sponsor()
+    with app.app_context():
+        _, slots = passwords._executor()
+    taken = 0
+    while slots.acquire(blocking=False):
+        taken += 1
+    try:
+        response = _login(app.test_client(), 'sponsor1@example.com')
+    finally:
+        for _ in range(taken):
+            slots.release()
+
+    assert taken == passwords.QUEUE_PER_WORKER
+    assert response.status_code == 503
+    assert response.json == {'error': 'Server busy, please try again.'}
+    dispose(app)
+
+
+def test_hashes_run_outside_the_request_process(app, tmp_path, pool):
+    with app.app_context():
+        assert passwords._run(os.getpid) == os.getpid()  # PASSWORD_HASH_WORKERS = 0: inline
+    (tmp_path / 'pooled').mkdir()
+    pooled = make_app(tmp_path / 'pooled', PASSWORD_HASH_WORKERS=1)
+    with pooled.app_context():
+        assert passwords._run(os.getpid) != os.getpid()
+    dispose(pooled)
+
+
+def test_default_method_keeps_existing_hashes(tmp_path):
+    from config import Config
+    assert Config.PASSWORD_HASH_METHOD == f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'
+    app = make_app(tmp_path, PASSWORD_HASH_METHOD=Config.PASSWORD_HASH_METHOD)
+    seed = Seed(app)
+    stored = {
+        'signup': generate_password_hash('pw', 'pbkdf2:sha256'),  # How signup hashed before the pool
+        'older': generate_password_hash('pw', 'pbkdf2:sha256:600000'),
+        'stronger': generate_password_hash('pw', f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS * 2}'),
+    }
+    users = {}
+    for name, password in stored.items():
+        seed.password = password
+        users[name] = seed.sponsor()
+    client = app.test_client()
+
+    with app.app_context():
+        emails = [User.query.get(user_id).email for user_id in users.values()]
+    for email in emails:
+        assert _login(client, email).status_code == 200
+    with app.app_context():
+        after = {name: User.query.get(user_id).password for name, user_id in users.items()}
+    assert after['signup'] == stored['signup']
+    assert after['stronger'] == stored['stronger']  # Never downgraded
+    assert after['older'].startswith(f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}$')
+    dispose(app)
+
+
+def test_plain_werkzeug_hash_is_kept_under_its_own_method(tmp_path):
+    app = make_app(tmp_path, PASSWORD_HASH_METHOD='scrypt')
+    seed = Seed(app)
+    seed.password = generate_password_hash('pw')
+    sponsor = seed.sponsor()
+
+    assert _login(app.test_client(), 'sponsor1@example.com').status_code == 200
+    with app.app_context():
+        assert User.query.get(sponsor).password == seed.password
+        assert passwords.needs_rehash(seed.password) is False
+        assert passwords.needs_rehash(generate_password_hash('pw', 'scrypt:16384:8:1')) is True
+        assert passwords.needs_rehash(generate_password_hash('pw', 'pbkdf2:sha256')) is True
+    dispose(app)
@@ -0,0 +1,48 @@
+# The hot-path filters are served by the secondary indexes (SQLite EXPLAIN QUERY PLAN)
+import re
+
+import pytest
+from sqlalchemy import select, text
+
+from db import db
+from models import User, Influencer, Campaign, AdRequest, NegotiationMessage
+
+HOT_QUERIES = [
+    ('ix_ad_requests_campaign_id_status',
+     select(AdRequest.id).where(AdRequest.campaign_id == 1, AdRequest.status == 'Accepted')),
+    # Equality on both columns: either composite index serves it, SQLite picks by creation order
+    ('ix_ad_requests_influencer_id_status|ix_ad_requests_status_influencer_id',
+     select(AdRequest.id).where(AdRequest.influencer_id == 1, AdRequest.status == 'Pending')),
+    ('ix_ad_requests_status_influencer_id',
+     select(AdRequest.influencer_id).where(AdRequest.status == 'Pending').group_by(AdRequest.influencer_id)),
+    ('ix_ad_requests_created_at',
+     select(AdRequest.id).order_by(AdRequest.created_at.desc()).limit(10)),
+    ('ix_campaign_sponsor_id_visibility',
+     select(Campaign.id).where(Campaign.sponsor_id == 1, Campaign.visibility == 'public')),
+    ('ix_campaign_visibility_flagged_category_budget',
+     select(Campaign.id).where(Campaign.visibility == 'public', Campaign.flagged == 'Active',
+                               Campaign.category == 'fashion', Campaign.budget >= 100)),
+    ('ix_campaign_is_open_visibility',
+     select(Campaign.id).where(Campaign.is_open, Campaign.visibility == 'public')),
+    ('ix_user_role_flagged',
+     select(User.id).where(User.role == 'Sponsor', User.flagged == 'Flagged')),
+    ('ix_influencer_category_reach',
+     select(Influencer.id).where(Influencer.category == 'fashion', Influencer.reach >= 1000)),
+    ('ix_negotiation_messages_ad_request_id_id',
+     select(NegotiationMessage.body).where(NegotiationMessage.ad_request_id == 1).order_by(NegotiationMessage.id)),
+]
+
+
+def query_plan(statement):
+    sql = statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+
+@pytest.mark.parametrize('index, statement', HOT_QUERIES, ids=[index.split('|')[0] for index, _ in HOT_QUERIES])
+def test_hot_query_uses_index(app, index, statement):
+    with app.app_context():
+        plan = query_plan(statement)
+    assert any(re.search(rf'USING (COVERING )?INDEX ({index})\b', step) for step in plan), plan
+    # No full-table scans, no sorting in a temporary b-tree
+    assert not [step for step in plan if step.startswith('SCAN') and 'USING' not in step], plan
+    assert not [step for step in plan if 'TEMP B-TREE' in step], plan
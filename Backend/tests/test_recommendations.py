@@ -0,0 +1,86 @@
+# Recommendations: views never score in the request; misses and edits queue one background rescore
+import numpy as np
+import pytest
+
+import recommendations
+
+import tasks
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tasks.refresh_campaign_recommendations, 'delay', calls.append)
+    return calls
+
+
+def test_miss_queues_a_rescore_and_answers_from_the_cache(app, client, seed, auth, queued, count_queries):
+    sponsor = seed.sponsor()
+    campaign = seed.campaign(sponsor, category='fashion')
+    fashion, travel = seed.influencer(category='fashion'), seed.influencer(category='travel')
+    headers = auth(sponsor, 'Sponsor')
+    url = f'/sponsor/campaigns/{campaign}/recommendations'
+    assert client.get(url, headers=headers).json == []  # Also warms the identity snapshot
+    assert queued == [campaign]
+
+    with count_queries() as queries:
+        response = client.get(url, headers=headers)
+    assert response.json == []
+    assert queries.count == 1  # The ownership check; no influencer load, no scoring
+    assert queued == [campaign]  # Already queued by the first view
+
+    with app.app_context():
+        tasks.refresh_campaign_recommendations(campaign)
+    assert [match['id'] for match in client.get(url, headers=headers).json] == [fashion, travel]
+    assert queued == [campaign]
+
+
+def test_edit_serves_stale_matches_until_rescored(app, client, seed, auth, queued):
+    sponsor = seed.sponsor()
+    campaign = seed.campaign(sponsor, category='fashion')
+    fashion = seed.influencer(category='fashion')
+    headers = auth(sponsor, 'Sponsor')
+    url = f'/sponsor/campaigns/{campaign}/recommendations'
+    with app.app_context():
+        tasks.refresh_campaign_recommendations(campaign)
+
+    response = client.put(f'/sponsor/campaigns/{campaign}', headers=headers, json={'goals': 'travel'})
+    assert response.status_code == 200
+
+    for _ in range(3):
+        assert [match['id'] for match in client.get(url, headers=headers).json] == [fashion]
+    assert queued == [campaign]  # Once, however many views
+
+    with app.app_context():
+        tasks.refresh_campaign_recommendations(campaign)
+    client.get(url, headers=headers)
+    assert queued == [campaign]
+
+
+def test_sparse_expertise_scores_match_dense_cosine(app, seed):
+    sponsor = seed.sponsor()
+    seed.campaign(sponsor, name='summer shoes launch')
+    seed.campaign(sponsor, name='nothing shared')
+    for expertise in ['shoes bags', 'summer travel shoes', 'cooking', None]:
+        seed.influencer(category='travel', expertise=expertise, reach=1000)
+
+    with app.app_context():
+        influencers = recommendations.load_influencers()
+        campaigns = recommendations._campaign_rows()
+        assert not any(isinstance(value, np.ndarray) and value.ndim > 1 for value in influencers.values())
+        overlap, terms = recommendations._expertise_overlap(campaigns, influencers)
+
+    vocabulary = influencers['vocabulary']
+    dense = np.zeros((len(influencers['rows']), len(vocabulary)))
+    for i, row in enumerate(influencers['rows']):
+        for token in recommendations._tokens(row.expertise):
+            dense[i, vocabulary[token]] = 1
+    for i, c in enumerate(campaigns):
+        vector = np.zeros(len(vocabulary))
+        for token in recommendations._tokens(c.name, c.description, c.goals, c.category):
+            if token in vocabulary:
+                vector[vocabulary[token]] = 1
+        assert terms[i] == vector.sum()
+        np.testing.assert_array_equal(overlap[i], dense @ vector)
+    np.testing.assert_allclose(influencers['expertise_norm'], np.sqrt(dense.sum(axis=1)))
+    assert overlap[0].tolist() == [1, 2, 0, 0]  # shoes; summer + shoes
@@ -0,0 +1,32 @@
+# Daily reminders: one grouped query, batched subtasks, one SMTP connection per batch
+import tasks
+from conftest import Seed
+from models import User
+
+
+def test_reminders_are_batched_over_pooled_connections(mail_app, smtp, count_queries, monkeypatch):
+    monkeypatch.setattr(tasks, 'REMINDER_BATCH_SIZE', 2)
+    seed = Seed(mail_app)
+    sponsor = seed.sponsor()
+    campaigns = [seed.campaign(sponsor) for _ in range(3)]
+    pending = [seed.influencer() for _ in range(5)]
+    for i, influencer in enumerate(pending):
+        for campaign in campaigns[:i % 3 + 1]:
+            seed.ad_request(campaign, influencer)
+    seed.ad_request(campaigns[0], seed.influencer(), status='Accepted')  # Nothing pending: no mail
+
+    with mail_app.app_context(), count_queries() as queries:
+        tasks.send_daily_reminders()
+
+    assert queries.count == 1
+    assert [len(connection.messages) for connection in smtp] == [2, 2, 1]
+
+    sent = {recipients[0]: (sender, body) for connection in smtp for sender, recipients, body in connection.messages}
+    with mail_app.app_context():
+        emails = {user.id: user.email for user in User.query.filter(User.id.in_(pending))}
+    assert set(sent) == set(emails.values())
+    for i, influencer in enumerate(pending):
+        sender, body = sent[emails[influencer]]
+        assert sender == 'noreply@example.com'
+        assert 'Subject: Pending Ad Requests Reminder' in body
+        assert f'You have {i % 3 + 1} pending ad request(s)' in body
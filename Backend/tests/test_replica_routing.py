@@ -0,0 +1,79 @@
+# Read-replica routing against two SQLite files; the replica never catches up, so it models worst-case lag
+import pytest
+
+from db import db
+from stats import reconcile_counters
+from conftest import dispose, make_replica_app, settle_tags
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_replica_app(tmp_path)
+    yield app
+    dispose(app)
+
+
+def test_uncached_get_reads_the_replica(client, seed, auth):
+    sponsor, influencer = seed.sponsor(), seed.influencer()
+    seed.ad_request(seed.campaign(sponsor, visibility='private'), influencer)
+
+    response = client.get('/influencer/ad-requests', headers=auth(influencer, 'Influencer'))
+
+    assert response.status_code == 200
+    assert response.json == []  # Only the primary has the row
+
+
+def test_cached_views_and_identity_are_filled_from_the_primary(client, seed, auth):
+    sponsor, influencer = seed.sponsor(), seed.influencer()
+    headers = auth(influencer, 'Influencer')
+    assert client.get('/influencer/dashboard', headers=headers).json == []
+
+    response = client.post('/sponsor/campaigns', headers=auth(sponsor, 'Sponsor'), json={
+        'name': 'Launch', 'description': 'desc', 'start_date': '2024-01-01', 'end_date': '2024-02-01',
+        'budget': 1000, 'visibility': 'public', 'goals': 'reach', 'category': 'fashion'})
+    assert response.status_code == 201
+
+    # Neither the identity snapshot nor the dashboard comes from the (empty) replica
+    response = client.get('/influencer/dashboard', headers=headers)
+    assert [campaign['name'] for campaign in response.json] == ['Launch']
+    etag = response.headers['ETag']
+    assert client.get('/influencer/dashboard', headers={**headers, 'If-None-Match': etag}).status_code == 304
+
+
+def test_counter_reconciliation_reads_the_primary(app, seed):
+    seed.sponsor()
+    with app.app_context():
+        reconcile_counters()  # Counters now exist on the primary only
+
+    # A GET request, so reads would go to the replica, which has no counters to compare against
+    with app.test_request_context('/admin/dashboard', method='GET'):
+        assert reconcile_counters()['drift'] == {}
+
+
+def test_cached_view_miss_reads_the_replica_once_writes_have_settled(app, client, seed, auth, count_queries):
+    sponsor, influencer = seed.sponsor(), seed.influencer()
+    seed.campaign(sponsor)  # On the primary only
+    headers = auth(influencer, 'Influencer')
+    settle_tags(app, 'campaigns', f'influencer:{influencer}')
+    with app.app_context():
+        replica = db.engines['replica_0']
+
+    with count_queries(replica) as queries:
+        assert client.get('/influencer/dashboard', headers=headers).json == []  # Built from the (empty) replica
+    assert any('FROM campaign' in statement for statement in queries.statements)
+    with count_queries(replica) as queries:
+        assert client.get('/influencer/dashboard', headers=headers).json == []  # Cache hit
+    assert queries.count == 0
+
+
+def test_cached_view_miss_right_after_a_write_reads_the_primary(app, client, seed, auth, count_queries):
+    sponsor, influencer = seed.sponsor(), seed.influencer()
+    seed.campaign(sponsor)
+    with app.app_context():
+        replica = db.engines['replica_0']
+
+    with count_queries(replica) as queries:
+        response = client.get('/influencer/dashboard', headers=auth(influencer, 'Influencer'))
+
+    assert [campaign['name'] for campaign in response.json] == ['campaign 3']  # Tags only just created
+    assert not any('FROM campaign' in statement for statement in queries.statements)
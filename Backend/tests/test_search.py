@@ -0,0 +1,45 @@
+# Full-text search: expertise filter matches the expertise column only, search matches either
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from models import Influencer
+import search
+from search import match_subquery
+
+
+def _ids(response):
+    assert response.status_code == 200
+    return sorted(influencer['id'] for influencer in response.json)
+
+
+def test_expertise_filter_ignores_category(client, seed, auth):
+    sponsor = seed.sponsor()
+    expert = seed.influencer(category='travel', expertise='fashion photography')
+    seed.influencer(category='fashion', expertise='cooking')
+    headers = auth(sponsor, 'Sponsor')
+
+    assert _ids(client.get('/sponsor/influencers?expertise=fash', headers=headers)) == [expert]
+    assert _ids(client.get('/sponsor/influencers?expertise=cooking+fashion', headers=headers)) == []
+
+
+def test_search_matches_expertise_and_category(client, seed, auth):
+    sponsor = seed.sponsor()
+    ids = sorted([seed.influencer(category='travel', expertise='fashion photography'),
+                  seed.influencer(category='fashion', expertise='cooking')])
+    seed.influencer(category='food', expertise='baking')
+
+    assert _ids(client.get('/sponsor/search/influencers?q=fashion', headers=auth(sponsor, 'Sponsor'))) == ids
+
+
+def test_postgres_column_search_uses_the_column_index_expression(app, monkeypatch):
+    monkeypatch.setattr(search, '_is_postgres', lambda bind=None: True)
+    with app.app_context():
+        sql = str(match_subquery(Influencer, ['fashion'], column_name='expertise')
+                  .compile(dialect=postgresql.dialect()))
+    assert "to_tsvector('simple', coalesce(influencer.expertise, ''))" in sql
+    assert 'category' not in sql
+
+
+def test_unindexed_column_is_rejected(app):
+    with app.app_context(), pytest.raises(ValueError):
+        match_subquery(Influencer, ['fashion'], column_name='category')
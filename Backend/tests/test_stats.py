@@ -0,0 +1,82 @@
+# Dashboard counters: the before_flush listener moves them with each write, reconcile corrects drift by delta
+import pytest
+from sqlalchemy import update
+
+import stats
+from db import db
+from models import User, Campaign, AdRequest, StatCounter
+
+
+@pytest.fixture
+def counters(app):
+    """counters() -> the stored counters, seeded from the current rows on first use."""
+    with app.app_context():
+        stats.reconcile_counters()
+
+    def read():
+        with app.app_context():
+            return stats.read_counters()
+    return read
+
+
+def _changed(before, after):
+    return {name: after[name] - before[name] for name in after if after[name] != before[name]}
+
+
+def test_register_counts_the_user(seed, counters):
+    before = counters()
+    seed.sponsor()
+    seed.influencer(flagged='Flagged')
+    assert _changed(before, counters()) == {'total_sponsors': 1, 'total_influencers': 1, 'flagged_influencers': 1}
+
+
+def test_flag_and_unflag_move_the_flagged_counter(app, seed, counters):
+    sponsor = seed.sponsor()
+    campaign = seed.campaign(sponsor, visibility='private')
+    before = counters()
+    with app.app_context():
+        db.session.get(User, sponsor).flagged = 'Flagged'
+        db.session.get(Campaign, campaign).flagged = 'Flagged'
+        db.session.commit()
+    assert _changed(before, counters()) == {'flagged_sponsors': 1, 'flagged_campaigns': 1}
+
+    with app.app_context():
+        db.session.get(User, sponsor).flagged = 'Active'
+        db.session.get(Campaign, campaign).visibility = 'public'
+        db.session.commit()
+    assert _changed(before, counters()) == {'flagged_campaigns': 1, 'private_campaigns': -1,
+                                            'public_campaigns': 1}
+
+
+def test_delete_takes_back_the_old_values(app, seed, counters):
+    sponsor = seed.sponsor()
+    campaign = seed.campaign(sponsor)
+    ad_request = seed.ad_request(campaign, seed.influencer(), status='Accepted')
+    before = counters()
+    with app.app_context():
+        request = db.session.get(AdRequest, ad_request)
+        request.status = 'Rejected'  # Deleted in the same flush: the loaded status, not the new one, comes off
+        db.session.delete(request)
+        db.session.commit()
+    assert _changed(before, counters()) == {'total_ad_requests': -1, 'accepted_ad_requests': -1}
+
+
+def test_reconcile_keeps_an_increment_committed_after_its_read(app, seed, counters, monkeypatch):
+    seed.sponsor()
+    with app.app_context():
+        db.session.execute(update(StatCounter).where(StatCounter.name == 'total_sponsors').values(value=10))
+        db.session.commit()
+    compute_stats = stats.compute_stats
+
+    def compute_then_another_sponsor_commits():
+        computed = compute_stats()
+        with db.engine.begin() as connection:
+            connection.execute(update(StatCounter).where(StatCounter.name == 'total_sponsors')
+                               .values(value=StatCounter.value + 1))
+        return computed
+
+    monkeypatch.setattr(stats, 'compute_stats', compute_then_another_sponsor_commits)
+    with app.app_context():
+        report = stats.reconcile_counters()
+    assert report['drift'] == {'total_sponsors': -9}
+    assert counters()['total_sponsors'] == 2  # 10 read, corrected to 1, plus the concurrent 1
@@ -0,0 +1,25 @@
+# Importing tasks (beat, every worker process) must not load numpy, scoring, exports or the web layer
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+DEFERRED = ['numpy', 'recommendations', 'stats', 'campaign_state', 'exports',
+            'controllers.sponsor_controller']
+
+
+def test_importing_tasks_defers_heavy_modules():
+    script = f'import sys, tasks; print([name for name in {DEFERRED!r} if name in sys.modules])'
+    result = subprocess.run([sys.executable, '-c', script], cwd=Path(__file__).parent.parent,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
+
+
+def test_wsgi_entry_point_builds_the_app_on_first_use():
+    script = ('import sys, app; print("controllers.sponsor_controller" in sys.modules); '
+              'print(type(app.application).__name__, app.application is app.application); '
+              'from app import application; print(application is app.application)')
+    env = dict(os.environ, CACHE_TYPE='SimpleCache', DATABASE_URL='sqlite://')
+    result = subprocess.run([sys.executable, '-c', script], cwd=Path(__file__).parent.parent,
+                            capture_output=True, text=True, check=True, env=env)
+    assert result.stdout.split('\n')[:3] == ['False', 'Flask True', 'True']
@@ -0,0 +1,88 @@
+# Signup in one transaction; bulk user import with per-row failures and a fixed statement count per batch
+from models import User, Sponsor, Influencer
+from user_import import import_users
+
+HEADER = 'username,email,password,role,category,expertise,reach\n'
+
+
+def _csv(*rows):
+    return HEADER + ''.join(f'{row}\n' for row in rows)
+
+
+def _influencers(start, count):
+    return [f'inf{i},inf{i}@example.com,pw,Influencer,fashion,shoes,{i}' for i in range(start, start + count)]
+
+
+def test_signup_creates_user_and_profile_together(app, client):
+    for role in ('Sponsor', 'Influencer'):
+        response = client.post('/auth/signup', json={'username': role, 'email': f'{role}@example.com',
+                                                     'password': 'pw', 'role': role})
+        assert response.status_code == 201
+
+    response = client.post('/auth/signup', json={'username': 'Sponsor', 'email': 'other@example.com',
+                                                 'password': 'pw', 'role': 'Influencer'})
+    assert response.status_code == 409
+    with app.app_context():
+        assert User.query.count() == 2
+        assert [sponsor.user.username for sponsor in Sponsor.query] == ['Sponsor']
+        assert [influencer.user.username for influencer in Influencer.query] == ['Influencer']
+
+
+def test_import_reports_failures_per_row(app, client, seed, auth):
+    admin = seed.admin()
+    seed.sponsor()  # sponsor2@example.com
+    body = _csv(
+        'brand,brand@example.com,pw,Sponsor,,,',
+        'inf,inf@example.com,pw,Influencer,fashion,shoes bags,5000',
+        'bad,bad@example.com,pw,Admin,,,',
+        'nopw,nopw@example.com,,Sponsor,,,',
+        'inf,again@example.com,pw,Influencer,,,',
+        'taken,sponsor2@example.com,pw,Sponsor,,,',
+        'reach,reach@example.com,pw,Influencer,fashion,shoes,lots',
+    )
+
+    response = client.post('/admin/users/import', headers={**auth(admin, 'Admin'), 'Content-Type': 'text/csv'},
+                           data=body)
+
+    assert response.status_code == 200
+    assert response.json['imported'] == 2
+    assert response.json['failed'] == 5
+    assert [(error['line'], error['error'].split('.')[0]) for error in response.json['errors']] == [
+        (4, "Invalid role 'Admin'"), (5, 'Missing password'), (6, 'Duplicate username or email in file'),
+        (7, 'User already exists!'), (8, 'reach must be an integer')]
+    with app.app_context():
+        imported = {user.username: user for user in User.query.filter(User.username.in_(['brand', 'inf']))}
+        assert imported['brand'].sponsor is not None
+        assert (imported['inf'].influencer.expertise, imported['inf'].influencer.reach) == ('shoes bags', 5000)
+        assert {user.flagged for user in imported.values()} == {'Flagged'}
+    dashboard = client.get('/admin/dashboard', headers=auth(admin, 'Admin')).json
+    assert dashboard['total_influencers'] == 1
+    assert dashboard['flagged_sponsors'] == 1
+
+
+def test_import_statements_per_batch_do_not_grow(app, count_queries):
+    counts = []
+    for start, count in ((0, 2), (100, 40)):
+        with app.app_context(), count_queries() as queries:
+            report = import_users(_csv(*_influencers(start, count)).splitlines(True), batch_size=count)
+        assert report == {'imported': count, 'failed': 0, 'errors': []}
+        counts.append(queries.count)
+    assert counts[0] == counts[1]
+
+    with app.app_context():
+        ids = {user.username: user.id for user in User.query}
+        assert {influencer.id: influencer.reach for influencer in Influencer.query} == {
+            ids[f'inf{i}']: i for i in list(range(2)) + list(range(100, 140))}
+
+
+def test_import_command(app, tmp_path):
+    path = tmp_path / 'users.csv'
+    path.write_text(_csv(*_influencers(0, 3), 'inf0,dup@example.com,pw,Influencer,,,'))
+
+    result = app.test_cli_runner().invoke(args=['import-users', str(path), '--approve', '--batch-size', '2'])
+
+    assert result.exit_code == 0, result.output
+    assert '"imported": 3' in result.output
+    assert '"line": 5' in result.output
+    with app.app_context():
+        assert {user.flagged for user in User.query} == {'Active'}
@@ -0,0 +1,186 @@
+# user_import.py
+import csv
+import json
+from itertools import islice
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
+
+from cache import invalidate_tags
+from db import db
+from models import User, Sponsor, Influencer
+from passwords import hash_passwords
+from stats import adjust_counters, counters_enabled
+
+# Rows validated, hashed, inserted and committed together
+IMPORT_BATCH_SIZE = 500
+# Failures listed in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_COLUMNS = ['username', 'email', 'password', 'role', 'industry', 'sponsor_type', 'category', 'expertise', 'reach']
+IMPORT_ROLES = ('Sponsor', 'Influencer')
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, line, error):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': error})
+
+    def to_dict(self):
+        return {'imported': self.imported, 'failed': self.failed,
+                'errors': sorted(self.errors, key=lambda error: error['line'])}
+
+
+def _clean(row):
+    """Validated column values for one CSV row, or raise ValueError."""
+    values = {name: (row.get(name) or '').strip() or None for name in IMPORT_COLUMNS}
+    for name in ('username', 'email', 'password', 'role'):
+        if not values[name]:
+            raise ValueError(f'Missing {name}')
+    if values['role'] not in IMPORT_ROLES:
+        raise ValueError(f'Invalid role {values["role"]!r}. Allowed roles are: {", ".join(IMPORT_ROLES)}')
+    if values['reach'] is not None:
+        try:
+            values['reach'] = int(values['reach'])
+        except ValueError:
+            raise ValueError('reach must be an integer')
+    return values
+
+
+def _profile(user_id, values):
+    if values['role'] == 'Sponsor':
+        return Sponsor, {'id': user_id, 'industry': values['industry'], 'sponsor_type': values['sponsor_type']}
+    return Influencer, {'id': user_id, 'category': values['category'], 'expertise': values['expertise'],
+                        'reach': values['reach']}
+
+
+def _insert(rows, flagged):
+    """Insert users and their profiles; returns the counter deltas. Runs in the caller's transaction."""
+    # Ids are matched back by (unique) username: ordered RETURNING would insert row by row on SQLite
+    user_ids = dict(db.session.execute(
+        insert(User).returning(User.username, User.id),
+        [{'username': values['username'], 'email': values['email'], 'password': hashed,
+          'role': values['role'], 'flagged': flagged} for _, values, hashed in rows]
+    ).all())
+
+    profiles = {Sponsor: [], Influencer: []}
+    deltas = {}
+    for _, values, _ in rows:
+        user_id = user_ids[values['username']]
+        model, profile = _profile(user_id, values)
+        profiles[model].append(profile)
+        prefix = values['role'].lower() + 's'
+        for name in [f'total_{prefix}'] + ([f'flagged_{prefix}'] if flagged == 'Flagged' else []):
+            deltas[name] = deltas.get(name, 0) + 1
+    for model, values in profiles.items():
+        if values:
+            db.session.execute(insert(model), values)
+    return deltas
+
+
+def _import_batch(batch, flagged, report):
+    """Validate, deduplicate, hash and insert one batch of (line, row) pairs in one transaction."""
+    rows, seen = [], set()
+    for line, row in batch:
+        try:
+            values = _clean(row)
+        except ValueError as error:
+            report.fail(line, str(error))
+            continue
+        keys = ('username', values['username']), ('email', values['email'])
+        if any(key in seen for key in keys):
+            report.fail(line, 'Duplicate username or email in file')
+            continue
+        seen.update(keys)
+        rows.append((line, values))
+
+    # Existing accounts, in one query per batch
+    if rows:
+        taken = set()
+        for username, email in db.session.query(User.username, User.email).filter(or_(
+                User.username.in_([values['username'] for _, values in rows]),
+                User.email.in_([values['email'] for _, values in rows]))):
+            taken.update((('username', username), ('email', email)))
+        kept = []
+        for line, values in rows:
+            if ('username', values['username']) in taken or ('email', values['email']) in taken:
+                report.fail(line, 'User already exists!')
+            else:
+                kept.append((line, values))
+        rows = kept
+    if not rows:
+        return
+
+    hashed = hash_passwords([values['password'] for _, values in rows])
+    rows = [(line, values, password) for (line, values), password in zip(rows, hashed)]
+
+    try:
+        deltas = _insert(rows, flagged)
+        imported = len(rows)
+    except IntegrityError:
+        # Someone registered one of these meanwhile; retry row by row to find which
+        db.session.rollback()
+        deltas, imported = {}, 0
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    for name, delta in _insert([row], flagged).items():
+                        deltas[name] = deltas.get(name, 0) + delta
+                imported += 1
+            except IntegrityError:
+                report.fail(row[0], 'User already exists!')
+
+    if counters_enabled():
+        adjust_counters(db.session, deltas)
+    db.session.commit()
+    report.imported += imported
+
+
+def import_users(lines, approve=False, batch_size=IMPORT_BATCH_SIZE):
+    """Import sponsors and influencers from CSV text lines (header row first).
+
+    Rows are streamed in batches, each committed on its own, so a large file
+    never sits in memory and one bad row only fails itself. Imported users
+    start 'Flagged' like self-registered ones unless `approve` is set.
+    Returns {'imported', 'failed', 'errors'}, errors carrying the CSV line number.
+    """
+    report = ImportReport()
+    reader = csv.DictReader(lines)
+    missing = [name for name in ('username', 'email', 'password', 'role') if name not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f'Missing CSV columns: {", ".join(missing)}')
+
+    flagged = 'Active' if approve else 'Flagged'
+    rows = ((reader.line_num, row) for row in reader)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        _import_batch(batch, flagged, report)
+
+    if report.imported:
+        invalidate_tags('influencers', 'stats')
+    return report.to_dict()
+
+
+@click.command('import-users')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--approve', is_flag=True, help='Mark imported users Active instead of Flagged.')
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True)
+@with_appcontext
+def import_users_command(path, approve, batch_size):
+    """Import sponsors and influencers from the CSV file at PATH."""
+    with open(path, encoding='utf-8-sig', newline='') as lines:
+        try:
+            report = import_users(lines, approve=approve, batch_size=batch_size)
+        except ValueError as error:
+            raise click.UsageError(str(error))
+    click.echo(json.dumps(report, indent=2))